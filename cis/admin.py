@@ -1,17 +1,232 @@
 # planificacion/admin.py
 from django.contrib import admin
+from django.db.models import Max
 from .models import *
 
+
+class RapidoAdmin(admin.ModelAdmin):
+    """
+    Base para tablas grandes: sin el COUNT(*) total del changelist y con los
+    joins de ``list_select_related`` también en autocompletado y formularios
+    (los ``__str__`` de la jerarquía leen la FK padre).
+    """
+    show_full_result_count = False
+    list_per_page = 50
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if isinstance(self.list_select_related, (list, tuple)) and self.list_select_related:
+            qs = qs.select_related(*self.list_select_related)
+        return qs
+
+
+# --- Filtros livianos (no cargan toda la tabla relacionada en la barra lateral) ---
+
+class AreaOrgFilter(admin.SimpleListFilter):
+    title = "área organizacional"
+    parameter_name = "area_org"
+    campo = "operacion__accion__objetivo__area_org_id"
+
+    def lookups(self, request, model_admin):
+        filas = AreaOrganizacional.objects.values_list("id", "nombre", "entidad__sigla", "entidad__nombre")
+        return [(pk, f"{nombre} ({sigla or entidad})") for pk, nombre, sigla, entidad in filas.order_by("nombre")]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.campo: self.value()})
+        return queryset
+
+
+class ObjetivoFilter(admin.SimpleListFilter):
+    """Solo lista los objetivos del área elegida en ``AreaOrgFilter``."""
+    title = "objetivo estratégico"
+    parameter_name = "objetivo"
+    campo = "operacion__accion__objetivo_id"
+
+    def lookups(self, request, model_admin):
+        area = request.GET.get(AreaOrgFilter.parameter_name)
+        if not area:
+            return []
+        filas = ObjetivoEstrategico.objects.filter(area_org_id=area).values_list("id", "codigo", "descripcion")
+        return [(pk, f"{codigo or ''} {descripcion[:60]}") for pk, codigo, descripcion in filas.order_by("codigo")]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.campo: self.value()})
+        return queryset
+
+
 class SerieInline(admin.TabularInline):
+    """Solo los últimos ``anios`` años del indicador; el resto en su propio changelist."""
     model = SerieIndicador
     extra = 0
+    anios = 6
+    fields = ("anio", "es_programado", "valor", "nota")
+    ordering = ("-anio", "-es_programado")
+
+    def desde(self, obj):
+        ultimo = obj.series.aggregate(m=Max("anio"))["m"] if obj and obj.pk else None
+        return ultimo - self.anios + 1 if ultimo else None
+
 
 @admin.register(Indicador)
-class IndicadorAdmin(admin.ModelAdmin):
+class IndicadorAdmin(RapidoAdmin):
     list_display = ("nombre","tipo","unidad","operacion","anio_linea_base","linea_base","anio_meta","meta_valor")
-    list_filter = ("tipo","unidad","operacion__accion__objetivo","operacion__accion__objetivo__area_org")
+    list_filter = ("tipo","unidad",AreaOrgFilter,ObjetivoFilter)
+    list_select_related = ("operacion",)
+    ordering = ("-id",)
     search_fields = ("nombre","operacion__descripcion","operacion__codigo","codigo")
+    autocomplete_fields = ("operacion","fuentes")
     inlines = [SerieInline]
 
-admin.site.register([Entidad, AreaOrganizacional, AreaEstrategica, ObjetivoEstrategico,
-                     AccionEstrategica, Operacion, FuenteInformacion, SerieIndicador])
+    def get_formset_kwargs(self, request, obj, inline, prefix):
+        kwargs = super().get_formset_kwargs(request, obj, inline, prefix)
+        if isinstance(inline, SerieInline):
+            desde = inline.desde(obj)
+            if desde is not None:
+                kwargs["queryset"] = inline.get_queryset(request).filter(anio__gte=desde)
+        return kwargs
+
+
+@admin.register(Entidad)
+class EntidadAdmin(RapidoAdmin):
+    list_display = ("nombre","sigla")
+    ordering = ("nombre",)
+    search_fields = ("nombre","sigla")
+
+
+@admin.register(AreaOrganizacional)
+class AreaOrganizacionalAdmin(RapidoAdmin):
+    list_display = ("nombre","entidad","responsable")
+    ordering = ("nombre","id")
+    list_select_related = ("entidad",)
+    list_filter = ("entidad",)
+    search_fields = ("nombre","entidad__nombre","entidad__sigla")
+    autocomplete_fields = ("entidad",)
+
+
+@admin.register(AreaEstrategica)
+class AreaEstrategicaAdmin(RapidoAdmin):
+    list_display = ("nombre",)
+    ordering = ("nombre",)
+    search_fields = ("nombre",)
+
+
+@admin.register(ObjetivoEstrategico)
+class ObjetivoEstrategicoAdmin(RapidoAdmin):
+    list_display = ("codigo","descripcion_corta","area_org","area_estrategica")
+    ordering = ("codigo","id")
+    list_select_related = ("area_org__entidad","area_estrategica")
+    list_filter = ("area_estrategica",)
+    search_fields = ("codigo","descripcion")
+    autocomplete_fields = ("area_org","area_estrategica")
+
+    @admin.display(description="Descripción")
+    def descripcion_corta(self, obj):
+        return obj.descripcion[:80]
+
+
+@admin.register(AccionEstrategica)
+class AccionEstrategicaAdmin(RapidoAdmin):
+    list_display = ("codigo","descripcion_corta","objetivo")
+    ordering = ("codigo","id")
+    list_select_related = ("objetivo",)
+    search_fields = ("codigo","descripcion","objetivo__codigo")
+    autocomplete_fields = ("objetivo",)
+
+    @admin.display(description="Descripción")
+    def descripcion_corta(self, obj):
+        return obj.descripcion[:80]
+
+
+@admin.register(Operacion)
+class OperacionAdmin(RapidoAdmin):
+    list_display = ("codigo","descripcion_corta","accion")
+    ordering = ("codigo","id")
+    list_select_related = ("accion",)
+    search_fields = ("codigo","descripcion","accion__codigo")
+    autocomplete_fields = ("accion",)
+
+    @admin.display(description="Descripción")
+    def descripcion_corta(self, obj):
+        return obj.descripcion[:80]
+
+
+@admin.register(FuenteInformacion)
+class FuenteInformacionAdmin(RapidoAdmin):
+    list_display = ("nombre",)
+    ordering = ("nombre",)
+    search_fields = ("nombre",)
+
+
+@admin.register(SerieIndicador)
+class SerieIndicadorAdmin(RapidoAdmin):
+    list_display = ("indicador","anio","es_programado","valor")
+    list_select_related = ("indicador",)
+    list_filter = ("es_programado","anio")
+    search_fields = ("indicador__nombre","indicador__codigo")
+    autocomplete_fields = ("indicador",)
+
+
+@admin.register(Tarea)
+class TareaAdmin(RapidoAdmin):
+    list_display = ("id","tipo","estado","progreso","total","shard","creado","terminada")
+    list_filter = ("estado","tipo")
+    readonly_fields = ("iniciada","terminada")
+
+
+@admin.register(VersionPlan)
+class VersionPlanAdmin(RapidoAdmin):
+    list_display = ("nombre","area_org","base","desplazamiento_anios","creado")
+    list_select_related = ("area_org__entidad","base__area_org__entidad")
+    search_fields = ("nombre","area_org__nombre")
+    autocomplete_fields = ("area_org","base")
+
+
+class SoloLecturaAdmin(RapidoAdmin):
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AnioCerrado)
+class AnioCerradoAdmin(SoloLecturaAdmin):
+    # cerrar/reabrir: manage.py cerrar_anio (regenera o descarta las instantáneas)
+    list_display = ("anio","notas","creado")
+
+
+@admin.register(CierreIndicador)
+class CierreIndicadorAdmin(SoloLecturaAdmin):
+    list_display = ("anio","operacion_codigo","indicador_nombre","area_org_nombre","programado","ejecutado","cumplimiento")
+    list_filter = ("anio",)
+    search_fields = ("indicador_nombre","area_org_nombre")
+    ordering = ("anio","operacion_codigo","indicador_nombre")
+
+
+@admin.register(CierreNivel)
+class CierreNivelAdmin(SoloLecturaAdmin):
+    list_display = ("anio","nivel","nombre","programado","ejecutado","prom_cumplimiento","total_indicadores")
+    list_filter = ("anio","nivel")
+    search_fields = ("nombre",)
+    ordering = ("anio","nivel","nombre")
+
+
+@admin.register(HistorialSerie)
+class HistorialSerieAdmin(SoloLecturaAdmin):
+    # solo-anexar: nada se edita ni se borra desde el admin
+    list_display = ("momento","serie_id","indicador_id","anio","es_programado","valor_centesimos","tipo")
+    list_filter = ("tipo","es_programado")
+    ordering = ("-id",)
+
+
+@admin.register(Eliminado)
+class EliminadoAdmin(SoloLecturaAdmin):
+    # lápidas del feed de cambios (/api/cambios/)
+    list_display = ("momento","modelo","objeto_id")
+    list_filter = ("modelo",)
+    ordering = ("-id",)
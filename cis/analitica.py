@@ -0,0 +1,182 @@
+# planificacion/analitica.py
+"""
+Analítica de avance hacia la meta, vectorizada con numpy.
+
+``calcular(indicadores)`` trae las series de todo el conjunto en una sola
+consulta, arma matrices indicador × año (ejecutado y programado) y calcula
+todas las métricas con operaciones de arreglo, sin bucle por indicador:
+
+- ``ultimo`` / ``anio_ultimo``: último valor ejecutado y su año
+- ``avance_pct``: (último − línea base) / (meta − línea base) × 100
+- ``brecha``: meta − último
+- ``variacion`` / ``variacion_pct``: cambio entre los dos últimos años ejecutados
+- ``pendiente`` / ``intercepto``: tendencia lineal (mínimos cuadrados) de lo ejecutado
+- ``proyeccion``: valor de la tendencia en ``anio_meta``; ``proyeccion_pct`` es su avance
+- ``alcanza``: si la proyección llega a la meta (respetando metas descendentes)
+
+Los valores ausentes quedan como NaN y salen como ``None``.
+"""
+from decimal import Decimal
+
+import numpy as np
+
+from .models import SerieIndicador
+
+COLUMNAS_INDICADOR = ("id", "codigo", "nombre", "unidad", "operacion__codigo",
+                      "anio_linea_base", "linea_base", "anio_meta", "meta_valor")
+METRICAS = ("ultimo", "anio_ultimo", "avance_pct", "brecha", "variacion", "variacion_pct",
+            "pendiente", "intercepto", "proyeccion", "proyeccion_pct", "alcanza", "puntos")
+
+
+def _a_float(valores):
+    return np.array([np.nan if v is None else float(v) for v in valores], dtype=float)
+
+
+def _ultimos_dos(matriz, anios):
+    """Último y penúltimo valor no-NaN por fila (y el año del último)."""
+    n, m = matriz.shape
+    if m == 0:
+        vacio = np.full(n, np.nan)
+        return vacio, vacio.copy(), vacio.copy()
+    validos = ~np.isnan(matriz)
+    # posición del último válido: índice de columna máximo con dato
+    col = np.where(validos, np.arange(m), -1)
+    i_ult = col.max(axis=1)
+    col_prev = np.where(col < i_ult[:, None], col, -1)
+    i_pen = col_prev.max(axis=1)
+    filas = np.arange(n)
+    ult = np.where(i_ult >= 0, matriz[filas, np.clip(i_ult, 0, None)], np.nan)
+    pen = np.where(i_pen >= 0, matriz[filas, np.clip(i_pen, 0, None)], np.nan)
+    anio_ult = np.where(i_ult >= 0, anios[np.clip(i_ult, 0, None)], np.nan)
+    return ult, pen, anio_ult
+
+
+def _tendencia(matriz, anios):
+    """Recta de mínimos cuadrados por fila sobre las celdas con dato."""
+    validos = ~np.isnan(matriz)
+    x = np.where(validos, anios[None, :], 0.0)
+    y = np.where(validos, matriz, 0.0)
+    n = validos.sum(axis=1).astype(float)
+    sx, sy = x.sum(axis=1), y.sum(axis=1)
+    sxx, sxy = (x * x).sum(axis=1), (x * y).sum(axis=1)
+    den = n * sxx - sx * sx
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pendiente = np.where((n >= 2) & (den != 0), (n * sxy - sx * sy) / den, np.nan)
+        intercepto = np.where(n >= 2, (sy - pendiente * sx) / n, np.nan)
+    return pendiente, intercepto, n
+
+
+def calcular(indicadores):
+    """
+    ``indicadores``: queryset de ``Indicador`` ya filtrado. Devuelve un
+    ``Resultado`` con una columna (arreglo) por dato del indicador y por métrica.
+    """
+    cols = list(zip(*indicadores.order_by("id").values_list(*COLUMNAS_INDICADOR))) or [()] * len(COLUMNAS_INDICADOR)
+    datos = dict(zip(COLUMNAS_INDICADOR, cols))
+    ids = np.array(datos["id"], dtype=np.int64)
+
+    # una consulta para todas las series del conjunto
+    series = list(SerieIndicador.objects.filter(indicador__in=indicadores.values("id"))
+                  .values_list("indicador_id", "anio", "es_programado", "valor"))
+    s_ind = np.array([s[0] for s in series], dtype=np.int64)
+    s_anio = np.array([s[1] for s in series], dtype=np.int64)
+    s_prog = np.array([s[2] for s in series], dtype=bool)
+    s_val = _a_float(s[3] for s in series)
+
+    anios = np.unique(s_anio).astype(float)
+    fila = np.searchsorted(ids, s_ind)
+    col = np.searchsorted(anios, s_anio)
+    ejecutado = np.full((len(ids), len(anios)), np.nan)
+    programado = np.full((len(ids), len(anios)), np.nan)
+    ejecutado[fila[~s_prog], col[~s_prog]] = s_val[~s_prog]
+    programado[fila[s_prog], col[s_prog]] = s_val[s_prog]
+
+    base = _a_float(datos["linea_base"])
+    meta = _a_float(datos["meta_valor"])
+    anio_meta = np.array(datos["anio_meta"], dtype=float)
+
+    ultimo, penultimo, anio_ultimo = _ultimos_dos(ejecutado, anios)
+    pendiente, intercepto, puntos = _tendencia(ejecutado, anios)
+    rango = meta - base
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avance_pct = np.where(rango != 0, (ultimo - base) / rango * 100, np.nan)
+        variacion = ultimo - penultimo
+        variacion_pct = np.where(penultimo != 0, variacion / np.abs(penultimo) * 100, np.nan)
+        proyeccion = intercepto + pendiente * anio_meta
+        proyeccion_pct = np.where(rango != 0, (proyeccion - base) / rango * 100, np.nan)
+    descendente = rango < 0
+    alcanza = np.where(np.isnan(proyeccion) | np.isnan(meta), np.nan,
+                       np.where(descendente, proyeccion <= meta, proyeccion >= meta))
+
+    metricas = dict(ultimo=ultimo, anio_ultimo=anio_ultimo, avance_pct=avance_pct, brecha=meta - ultimo,
+                    variacion=variacion, variacion_pct=variacion_pct, pendiente=pendiente, intercepto=intercepto,
+                    proyeccion=proyeccion, proyeccion_pct=proyeccion_pct, alcanza=alcanza, puntos=puntos)
+    return Resultado(datos, metricas, programado, ejecutado, anios)
+
+
+def _py(v):
+    if isinstance(v, Decimal):
+        return float(v)
+    if isinstance(v, (float, np.floating)):
+        return None if np.isnan(v) else round(float(v), 4)
+    if isinstance(v, np.integer):
+        return int(v)
+    return v
+
+
+class Resultado:
+    def __init__(self, datos, metricas, programado, ejecutado, anios):
+        self.datos = datos
+        self.metricas = metricas
+        self.programado = programado
+        self.ejecutado = ejecutado
+        self.anios = anios
+
+    def __len__(self):
+        return len(self.datos["id"])
+
+    def orden(self, metrica, descendente=False):
+        """Índices de fila ordenados por ``metrica`` (NaN al final)."""
+        v = self.metricas[metrica]
+        clave = np.where(np.isnan(v), np.inf, -v if descendente else v)
+        return np.argsort(clave, kind="stable")
+
+    def fila(self, i):
+        """Dict de la fila ``i`` (para plantillas)."""
+        fila = {k: _py(c[i]) for k, c in self.datos.items()}
+        fila.update({k: _py(c[i]) for k, c in self.metricas.items()})
+        fila["alcanza"] = None if fila["alcanza"] is None else bool(fila["alcanza"])
+        return fila
+
+    def filas(self, metrica=None, descendente=False):
+        """Filas ordenadas por ``metrica``; solo se convierten a dict las que se piden (la página)."""
+        return Filas(self, self.orden(metrica, descendente) if metrica else np.arange(len(self)))
+
+    def columnas(self):
+        """Formato columnar para la API: {columna: [valores]}."""
+        salida = {k: [_py(v) for v in c] for k, c in self.datos.items()}
+        salida.update({k: [_py(v) for v in c] for k, c in self.metricas.items()})
+        salida["alcanza"] = [None if v is None else bool(v) for v in salida["alcanza"]]
+        return salida
+
+
+class Filas:
+    """
+    Secuencia perezosa de filas en un orden dado: ``len()`` y el corte que
+    hace el ``Paginator`` son baratos, y ``_py`` solo recorre la página.
+    """
+
+    def __init__(self, resultado, indices):
+        self.resultado = resultado
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.resultado.fila(j) for j in self.indices[i]]
+        return self.resultado.fila(self.indices[i])
+
+    def __iter__(self):
+        return (self.resultado.fila(j) for j in self.indices)
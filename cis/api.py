@@ -0,0 +1,230 @@
+# planificacion/api.py
+"""
+API JSON de solo lectura sobre la jerarquía, los indicadores y sus series.
+
+    GET /api/v1/indicadores/?fields=nombre,unidad&include=operacion,series
+        &fields[series]=anio,valor,es_programado&tipo=EFICACIA&limite=500
+    GET /api/v1/series/?indicador=1,2,3,…&anio=2024   # muchas series en un request
+
+- ``fields=`` / ``fields[<include>]=`` eligen columnas: las consultas son
+  ``values()`` con solo esas columnas (más el id y las FKs que hagan falta).
+- ``include=`` agrega relaciones declaradas en ``Recurso.incluir``; cada una
+  es una sola consulta por bloque (``pk__in`` / ``<fk>__in``), así que un
+  bloque cuesta 1 + len(include) consultas sin importar cuántas filas trae.
+- Paginación por cursor (``id`` > ``cursor``, orden por ``id``): la respuesta
+  trae ``siguiente`` con la URL de la próxima página.
+- La respuesta se arma por bloques de ``BLOQUE`` filas y se va enviando
+  (``StreamingHttpResponse``) serializada con orjson.
+"""
+from decimal import Decimal
+
+import orjson
+from django.db.models import F
+
+from .models import (AccionEstrategica, AreaEstrategica, AreaOrganizacional, Entidad, FuenteInformacion,
+                     Indicador, ObjetivoEstrategico, Operacion, SerieIndicador)
+
+LIMITE = 100
+LIMITE_MAXIMO = 10000
+BLOQUE = 1000
+MAX_VALORES_FILTRO = 1000
+
+
+class ErrorApi(ValueError):
+    pass
+
+
+def _por_defecto(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)  # exacto; el cliente decide si lo pasa a float
+    raise TypeError
+
+
+def a_json(obj):
+    return orjson.dumps(obj, default=_por_defecto)
+
+
+class Recurso:
+    """
+    ``campos``: columnas expuestas (las por defecto si no hay ``fields=``).
+    ``filtros``: {parámetro: (lookup, tipo)}; admiten listas separadas por coma.
+    ``incluir``: {nombre: recurso}, donde ``nombre`` es un campo de relación del modelo.
+    """
+
+    def __init__(self, modelo, campos, filtros=None, incluir=None):
+        self.modelo = modelo
+        self.campos = tuple(campos)
+        self.filtros = {"id": ("id", int), **(filtros or {})}
+        self.incluir = incluir or {}
+
+    def columnas(self, pedidas):
+        if not pedidas:
+            return self.campos
+        desconocidas = [c for c in pedidas if c not in self.campos]
+        if desconocidas:
+            raise ErrorApi(f"Campos desconocidos en {self.modelo._meta.model_name}: {', '.join(desconocidas)}.")
+        return tuple(pedidas)
+
+    def filtrar(self, qs, params):
+        for param, (lookup, tipo) in self.filtros.items():
+            crudos = [v for p in params.getlist(param) for v in p.split(",") if v.strip()]
+            if not crudos:
+                continue
+            if len(crudos) > MAX_VALORES_FILTRO:
+                raise ErrorApi(f"Máximo {MAX_VALORES_FILTRO} valores en '{param}'.")
+            try:
+                valores = [tipo(v.strip()) for v in crudos]
+            except (TypeError, ValueError):
+                raise ErrorApi(f"Valor inválido en '{param}'.") from None
+            qs = qs.filter(**{f"{lookup}__in": valores})
+        return qs
+
+
+def _bool(valor):
+    if valor.lower() in ("1", "true", "si", "sí"):
+        return True
+    if valor.lower() in ("0", "false", "no"):
+        return False
+    raise ValueError(valor)
+
+
+_AREA_DE_IND = "operacion__accion__objetivo__area_org_id"
+
+ENTIDAD = Recurso(Entidad, ("nombre", "sigla", "actualizado"))
+AREA_ESTRATEGICA = Recurso(AreaEstrategica, ("nombre", "descripcion", "actualizado"))
+FUENTE = Recurso(FuenteInformacion, ("nombre", "descripcion", "actualizado"))
+AREA = Recurso(AreaOrganizacional, ("entidad_id", "nombre", "responsable", "actualizado"),
+               filtros={"entidad": ("entidad_id", int)}, incluir={"entidad": ENTIDAD})
+OBJETIVO = Recurso(ObjetivoEstrategico, ("area_org_id", "area_estrategica_id", "codigo", "descripcion", "actualizado"),
+                   filtros={"area": ("area_org_id", int), "codigo": ("codigo", str)},
+                   incluir={"area_org": AREA, "area_estrategica": AREA_ESTRATEGICA})
+ACCION = Recurso(AccionEstrategica, ("objetivo_id", "codigo", "descripcion", "actualizado"),
+                 filtros={"objetivo": ("objetivo_id", int), "area": ("objetivo__area_org_id", int)},
+                 incluir={"objetivo": OBJETIVO})
+OPERACION = Recurso(Operacion, ("accion_id", "codigo", "descripcion", "actualizado"),
+                    filtros={"accion": ("accion_id", int), "area": ("accion__objetivo__area_org_id", int)},
+                    incluir={"accion": ACCION})
+SERIE = Recurso(SerieIndicador, ("indicador_id", "anio", "valor", "es_programado", "nota", "actualizado"),
+                filtros={"indicador": ("indicador_id", int), "anio": ("anio", int),
+                         "es_programado": ("es_programado", _bool), "area": (f"indicador__{_AREA_DE_IND}", int)})
+INDICADOR = Recurso(Indicador, ("operacion_id", "codigo", "nombre", "tipo", "unidad", "formula_texto",
+                                "anio_linea_base", "linea_base", "anio_meta", "meta_valor", "observaciones",
+                                "actualizado"),
+                    filtros={"operacion": ("operacion_id", int), "area": (_AREA_DE_IND, int),
+                             "tipo": ("tipo", str), "unidad": ("unidad", str)},
+                    incluir={"operacion": OPERACION, "series": SERIE, "fuentes": FUENTE})
+# hijos directos, para bajar un nivel de la jerarquía con include=
+AREA.incluir["objetivos"] = OBJETIVO
+OBJETIVO.incluir["acciones"] = ACCION
+ACCION.incluir["operaciones"] = OPERACION
+OPERACION.incluir["indicadores"] = INDICADOR
+SERIE.incluir["indicador"] = INDICADOR
+
+RECURSOS = {
+    "entidades": ENTIDAD,
+    "areas-estrategicas": AREA_ESTRATEGICA,
+    "fuentes": FUENTE,
+    "areas": AREA,
+    "objetivos": OBJETIVO,
+    "acciones": ACCION,
+    "operaciones": OPERACION,
+    "indicadores": INDICADOR,
+    "series": SERIE,
+}
+
+
+def _lista(params, clave):
+    return [c.strip() for c in params.get(clave, "").split(",") if c.strip()]
+
+
+class Consulta:
+    """Una página de un recurso ya validada a partir de los parámetros GET."""
+
+    def __init__(self, recurso, params):
+        self.recurso = recurso
+        self.columnas = recurso.columnas(_lista(params, "fields"))
+        self.incluir = {}
+        for nombre in _lista(params, "include"):
+            if nombre not in recurso.incluir:
+                raise ErrorApi(f"No se puede incluir '{nombre}' (opciones: {', '.join(recurso.incluir)}).")
+            sub = recurso.incluir[nombre]
+            self.incluir[nombre] = (sub, sub.columnas(_lista(params, f"fields[{nombre}]")))
+        try:
+            self.cursor = int(params.get("cursor") or 0)
+            self.limite = max(1, min(int(params.get("limite") or LIMITE), LIMITE_MAXIMO))
+        except ValueError:
+            raise ErrorApi("'cursor' y 'limite' deben ser enteros.") from None
+        self.qs = recurso.filtrar(recurso.modelo._default_manager.all(), params)
+        self.ultimo_id = None
+        self.hay_mas = False
+
+    def _claves_fk(self):
+        """FKs que el bloque necesita traer para los includes hacia el padre."""
+        extra = []
+        for nombre in self.incluir:
+            campo = self.recurso.modelo._meta.get_field(nombre)
+            if campo.many_to_one and campo.attname not in self.columnas:
+                extra.append(campo.attname)
+        return extra
+
+    def bloques(self):
+        """Genera listas de filas (dicts), ``BLOQUE`` a la vez, hasta ``limite``."""
+        extra = self._claves_fk()
+        pendientes, desde = self.limite, self.cursor
+        while pendientes > 0:
+            n = min(BLOQUE, pendientes)
+            ultimo = n == pendientes  # en el último bloque se pide una fila de más para saber si sigue
+            filas = list(self.qs.filter(id__gt=desde).order_by("id")
+                         .values("id", *self.columnas, *extra)[:n + 1 if ultimo else n])
+            if ultimo and len(filas) > n:
+                filas.pop()
+                self.hay_mas = True
+            if not filas:
+                return
+            self._agregar_incluidos(filas, extra)
+            desde = self.ultimo_id = filas[-1]["id"]
+            pendientes -= len(filas)
+            yield filas
+            if len(filas) < n:
+                return
+
+    def _agregar_incluidos(self, filas, extra):
+        ids = [f["id"] for f in filas]
+        for nombre, (sub, columnas) in self.incluir.items():
+            campo = self.recurso.modelo._meta.get_field(nombre)
+            destino = sub.modelo._default_manager
+            if campo.many_to_one:  # FK hacia el padre: una consulta por pk
+                claves = {f[campo.attname] for f in filas} - {None}
+                por_id = {r["id"]: r for r in destino.filter(id__in=claves).values("id", *columnas)}
+                for f in filas:
+                    f[nombre] = por_id.get(f[campo.attname])
+            elif campo.one_to_many:  # hijos: una consulta por la FK inversa
+                fk = campo.field.attname
+                hijos = {i: [] for i in ids}
+                for r in destino.filter(**{f"{fk}__in": ids}).order_by(fk, "id").values("id", fk, *columnas):
+                    hijos[r[fk] if fk in columnas else r.pop(fk)].append(r)
+                for f in filas:
+                    f[nombre] = hijos[f["id"]]
+            else:  # many_to_many: un JOIN con la tabla intermedia
+                inversa = campo.related_query_name()
+                vinculos = {i: [] for i in ids}
+                for r in (destino.filter(**{f"{inversa}__in": ids}).order_by("id")
+                          .values("id", *columnas, _dueno=F(inversa))):
+                    vinculos[r.pop("_dueno")].append(r)
+                for f in filas:
+                    f[nombre] = vinculos[f["id"]]
+        for f in filas:
+            for clave in extra:
+                f.pop(clave, None)
+
+    def generar(self, url_siguiente):
+        """Cuerpo JSON en trozos: ``{"datos": [...], "siguiente": url|null}``."""
+        yield b'{"datos":['
+        primero = True
+        for filas in self.bloques():
+            trozo = a_json(filas)[1:-1]
+            if trozo:
+                yield trozo if primero else b"," + trozo
+                primero = False
+        siguiente = url_siguiente(self.ultimo_id) if self.hay_mas else None
+        yield b'],"siguiente":' + a_json(siguiente) + b"}"
@@ -1,6 +1,29 @@
+import threading
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CisConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cis'
+
+    def ready(self):
+        from django.db.models.signals import post_delete
+        from . import sincronizacion
+        # lápidas del feed de cambios (los borrados masivos las anotan en cis/borrado.py)
+        for modelo in sincronizacion.MODELOS:
+            post_delete.connect(sincronizacion.al_borrar, sender=modelo, dispatch_uid=f"cis_baja_{modelo.__name__}")
+
+        # Calienta el proceso sin bloquear el arranque (plantillas, URLs, cachés)
+        if getattr(settings, "CIS_WARMUP_AL_INICIAR", False):
+            threading.Thread(target=self._warmup, name="cis-warmup", daemon=True).start()
+
+    @staticmethod
+    def _warmup():
+        from django.db import connections
+        from . import warmup
+        try:
+            warmup.ejecutar()
+        finally:
+            connections.close_all()
@@ -0,0 +1,132 @@
+# planificacion/arbol.py
+"""
+Explorador de la jerarquía Entidad → Área → Objetivo → Acción → Operación →
+Indicador que carga un nivel por pedido.
+
+``hijos(nivel, id, anio)`` cuesta dos consultas (más una para saber si el
+año está cerrado) sin importar el tamaño del plan:
+
+1. los hijos directos del nodo por su FK (indexada), con la cantidad de
+   nietos anotada en la misma consulta (``Count`` sobre la relación inversa);
+2. el resumen de cumplimiento de esos hijos en ``anio``: promedio del % de
+   los indicadores con programación debajo de cada uno, agrupado por el id
+   del hijo. En años abiertos sale de ``mapa_calor.programadas()`` (la fórmula
+   de cada indicador en SQL); en años cerrados, de ``CierreIndicador``.
+
+Las descripciones largas se cortan en SQL (``columnas_truncadas``).
+"""
+from django.db.models import Avg, Count, F, OuterRef, Subquery
+
+from . import mapa_calor
+from .listados import columnas_truncadas, nombre_corto
+from .models import (AccionEstrategica, AnioCerrado, AreaOrganizacional, CierreIndicador, Entidad, Indicador,
+                     ObjetivoEstrategico, Operacion)
+
+LIMITE = 200
+LARGO_ETIQUETA = 120
+
+
+class NivelInvalido(ValueError):
+    pass
+
+
+class Nivel:
+    """
+    ``padre``: FK hacia el nivel anterior; ``hijos``: relación inversa hacia el
+    siguiente (``None`` en la hoja); ``desde_serie`` / ``en_cierre``: id del
+    nodo visto desde ``SerieIndicador`` y desde ``CierreIndicador``.
+    """
+
+    def __init__(self, clave, modelo, padre, hijos, campos, texto, desde_serie, en_cierre, url=None):
+        self.clave = clave
+        self.modelo = modelo
+        self.padre = padre
+        self.hijos = hijos
+        self.campos = campos
+        self.texto = texto
+        self.desde_serie = desde_serie
+        self.en_cierre = en_cierre
+        self.url = url
+
+
+_RUTA = "indicador__operacion__accion__objetivo"
+NIVELES = [
+    Nivel("entidad", Entidad, None, "areas", ("sigla", "nombre"), None,
+          f"{_RUTA}__area_org__entidad_id", None),
+    Nivel("area", AreaOrganizacional, "entidad_id", "objetivos", ("nombre",), None,
+          f"{_RUTA}__area_org_id", "area_org_id", "area_org_update"),
+    Nivel("objetivo", ObjetivoEstrategico, "area_org_id", "acciones", ("codigo",), "descripcion",
+          f"{_RUTA}_id", "objetivo_id", "objetivo_update"),
+    Nivel("accion", AccionEstrategica, "objetivo_id", "operaciones", ("codigo",), "descripcion",
+          "indicador__operacion__accion_id", "accion_id", "accion_update"),
+    Nivel("operacion", Operacion, "accion_id", "indicadores", ("codigo",), "descripcion",
+          "indicador__operacion_id", "operacion_id", "operacion_update"),
+    Nivel("indicador", Indicador, "operacion_id", None, ("codigo",), "nombre",
+          "indicador_id", "indicador_id", "indicador_update"),
+]
+POR_CLAVE = {n.clave: n for n in NIVELES}
+
+
+def siguiente(clave):
+    i = NIVELES.index(POR_CLAVE[clave])
+    return NIVELES[i + 1] if i + 1 < len(NIVELES) else None
+
+
+def _resumen(nivel, ids, anio):
+    """{id: (promedio, indicadores)} de los nodos ``ids`` de ``nivel`` en ``anio``."""
+    if not ids or not anio:
+        return {}
+    if AnioCerrado.objects.filter(anio=anio).exists():
+        qs = CierreIndicador.objects.filter(anio=anio, programado__gt=0)
+        if nivel.en_cierre:
+            clave = nivel.en_cierre
+        else:  # el cierre no guarda la entidad: se toma del área
+            qs = qs.annotate(entidad_nodo=Subquery(AreaOrganizacional.objects.filter(pk=OuterRef("area_org_id"))
+                                            .values("entidad_id")[:1]))
+            clave = "entidad_nodo"
+        filas = (qs.filter(**{f"{clave}__in": ids}).values(nodo=F(clave))
+                 .annotate(prom=Avg("cumplimiento"), n=Count("id")).order_by())
+    else:
+        filas = (mapa_calor.programadas().filter(anio=anio, **{f"{nivel.desde_serie}__in": ids})
+                 .values(nodo=F(nivel.desde_serie))
+                 .annotate(prom=Avg("cumplimiento_ind"), n=Count("indicador_id")).order_by())
+    return {r["nodo"]: (r["prom"], r["n"]) for r in filas}
+
+
+def hijos(clave, nodo_id=None, anio=None, desde=0):
+    """
+    Hijos de ``nodo_id`` (del nivel ``clave``), o las entidades si ``clave``
+    es ``None``. Devuelve (nivel de los hijos, filas, hay_mas); cada fila trae
+    ``id``, ``etiqueta``, ``hijos`` (cantidad) y ``cumplimiento`` / ``indicadores``.
+    """
+    if clave is None:
+        nivel, qs = NIVELES[0], NIVELES[0].modelo.objects.all()
+    else:
+        if clave not in POR_CLAVE:
+            raise NivelInvalido(f"Nivel desconocido: {clave}.")
+        nivel = siguiente(clave)
+        if nivel is None:
+            raise NivelInvalido("Los indicadores no tienen hijos.")
+        qs = nivel.modelo.objects.filter(**{nivel.padre: nodo_id})
+    columnas = list(nivel.campos)
+    if nivel.texto:
+        qs = qs.annotate(**columnas_truncadas({nivel.texto: LARGO_ETIQUETA}))
+        columnas.append(nombre_corto(nivel.texto))
+    if nivel.hijos:
+        qs = qs.annotate(n_hijos=Count(nivel.hijos))
+        columnas.append("n_hijos")
+    filas = list(qs.order_by(*nivel.campos, "id").values("id", *columnas)[desde:desde + LIMITE + 1])
+    hay_mas = len(filas) > LIMITE
+    filas = filas[:LIMITE]
+
+    resumen = _resumen(nivel, [f["id"] for f in filas], anio)
+    salida = []
+    for f in filas:
+        partes = [str(f[c]) for c in nivel.campos if f[c]]
+        if nivel.texto:
+            texto = f[nombre_corto(nivel.texto)] or ""
+            partes.append(texto[:LARGO_ETIQUETA] + ("…" if len(texto) > LARGO_ETIQUETA else ""))
+        prom, n = resumen.get(f["id"], (None, 0))
+        salida.append({"id": f["id"], "etiqueta": " — ".join(partes), "hijos": f.get("n_hijos", 0),
+                       "cumplimiento": None if prom is None else round(prom, 1), "indicadores": n})
+    return nivel, salida, hay_mas
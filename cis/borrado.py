@@ -0,0 +1,173 @@
+# planificacion/borrado.py
+"""
+Borrado de nodos de la jerarquía sin pasar por el ``Collector`` de Django.
+
+``Model.delete()`` carga en memoria cada Acción, Operación, Indicador, Serie y
+fila M2M descendiente antes de borrar. Aquí se borra de abajo hacia arriba
+(series → fuentes M2M → indicadores → … → nodo) con DELETEs por lotes de ids,
+así que la memoria queda acotada por ``LOTE`` y cada paso deja la base
+consistente (nunca queda un hijo sin padre).
+
+    conteos(area)            # {"Series": 1200, "Indicadores": 300, ...} con COUNTs
+    borrar(area, progreso=)  # en una transacción, o como tarea "borrar_jerarquia"
+
+Lo único que colgaba de ``post_delete`` son las lápidas del feed de cambios
+(cis/sincronizacion.py); aquí se anotan por lote con ``registrar_bajas``.
+
+Como ``SerieIndicador.delete()`` no se llama, la guarda de años cerrados va
+aparte: ``borrar`` se niega si el nodo tiene series de un ``AnioCerrado``
+(hay que reabrir el año primero).
+"""
+from contextlib import nullcontext
+
+from django.apps import apps
+from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
+from django.shortcuts import redirect
+from django.utils import timezone
+
+from . import historial, sincronizacion
+from .models import (AccionEstrategica, AnioCerrado, AreaOrganizacional, Indicador, ObjetivoEstrategico, Operacion,
+                     SerieIndicador, VersionPlan)
+
+LOTE = 2000
+# por encima de estas filas el borrado se encola en vez de hacerse en el request
+UMBRAL_SEGUNDO_PLANO = 5000
+
+# (modelo, etiqueta, ruta de FKs hasta el área) — de abajo hacia arriba
+NIVELES = [
+    (SerieIndicador, "Series anuales", ("indicador", "operacion", "accion", "objetivo", "area_org")),
+    (Indicador.fuentes.through, "Vínculos con fuentes", ("indicador", "operacion", "accion", "objetivo", "area_org")),
+    (Indicador, "Indicadores", ("operacion", "accion", "objetivo", "area_org")),
+    (Operacion, "Operaciones", ("accion", "objetivo", "area_org")),
+    (AccionEstrategica, "Acciones estratégicas", ("objetivo", "area_org")),
+    (ObjetivoEstrategico, "Objetivos estratégicos", ("area_org",)),
+    (VersionPlan, "Versiones de plan", ("area_org",)),
+    (AreaOrganizacional, "Áreas organizacionales", ()),
+]
+
+# nombre del segmento de ruta que apunta a cada tipo de nodo
+SEGMENTO = {
+    AreaOrganizacional: "area_org",
+    ObjetivoEstrategico: "objetivo",
+    AccionEstrategica: "accion",
+    Operacion: "operacion",
+    Indicador: "indicador",
+}
+
+
+def _niveles(obj):
+    """[(modelo, etiqueta, queryset)] de los descendientes de ``obj`` y el propio nodo."""
+    raiz = type(obj)
+    seg = SEGMENTO[raiz]
+    salida = []
+    for modelo, etiqueta, ruta in NIVELES:
+        if modelo is raiz:
+            salida.append((modelo, etiqueta, modelo._default_manager.filter(pk=obj.pk)))
+            break
+        if seg in ruta:
+            lookup = "__".join(ruta[:ruta.index(seg) + 1])
+            salida.append((modelo, etiqueta, modelo._default_manager.filter(**{lookup: obj.pk})))
+    return salida
+
+
+def conteos(obj):
+    """Filas afectadas por nivel (solo descendientes, sin el nodo)."""
+    return {etiqueta: qs.count() for modelo, etiqueta, qs in _niveles(obj) if modelo is not type(obj)}
+
+
+def anios_cerrados(obj, niveles=None):
+    """Años cerrados que tienen series debajo de ``obj``."""
+    series = next(qs for modelo, _, qs in niveles or _niveles(obj) if modelo is SerieIndicador)
+    return list(series.filter(anio__in=AnioCerrado.objects.values("anio"))
+                .order_by("anio").values_list("anio", flat=True).distinct())
+
+
+def verificar_anios_abiertos(obj, niveles=None):
+    cerrados = anios_cerrados(obj, niveles)
+    if cerrados:
+        raise ValidationError(
+            f"Tiene series de años cerrados ({', '.join(map(str, cerrados))}); reabre esos años "
+            "(manage.py cerrar_anio <año> --reabrir) antes de eliminarlo.")
+
+
+def _borrar_nivel(modelo, qs, lote, avisar):
+    db = router.db_for_write(modelo)
+    borradas = 0
+    while True:
+        ids = list(qs.values_list("pk", flat=True)[:lote])
+        if not ids:
+            return borradas
+        if modelo is SerieIndicador:
+            historial.registrar_bajas(modelo._default_manager.filter(pk__in=ids))
+        # _raw_delete: DELETE ... WHERE id IN (...) sin instanciar ni recolectar
+        modelo._default_manager.filter(pk__in=ids)._raw_delete(db)
+        sincronizacion.registrar_bajas(modelo, ids)
+        borradas += len(ids)
+        avisar(len(ids))
+
+
+def borrar(obj, lote=LOTE, progreso=None, atomico=True):
+    """
+    Borra ``obj`` y sus descendientes de abajo hacia arriba. ``progreso`` recibe
+    (hechas, total, mensaje). Con ``atomico=False`` cada lote se confirma solo
+    (lo que usa la tarea en segundo plano para no bloquear SQLite por minutos).
+    """
+    niveles = _niveles(obj)
+    total = sum(qs.count() for _, _, qs in niveles)
+    hechas = 0
+
+    def avisar(n):
+        nonlocal hechas
+        hechas += n
+        if progreso:
+            progreso(hechas, total)
+
+    db = router.db_for_write(type(obj))
+    with transaction.atomic(using=db) if atomico else nullcontext():
+        verificar_anios_abiertos(obj, niveles)
+        if isinstance(obj, AreaOrganizacional):
+            # versiones derivadas de la que se borra: base → NULL (on_delete=SET_NULL)
+            VersionPlan.objects.filter(base__area_org=obj).update(base=None, actualizado=timezone.now())
+        for modelo, etiqueta, qs in niveles:
+            if progreso:
+                progreso(hechas, total, f"Borrando {etiqueta.lower()}…")
+            _borrar_nivel(modelo, qs, lote, avisar)
+    return hechas
+
+
+def etiqueta_modelo(obj):
+    return obj._meta.label_lower
+
+
+def resolver(modelo, pk):
+    return apps.get_model(modelo)._default_manager.get(pk=pk)
+
+
+class BorradoJerarquicoMixin:
+    """
+    Para los DeleteView de la jerarquía: la confirmación muestra ``conteos`` y
+    el POST borra por lotes; si el nodo arrastra más de ``UMBRAL_SEGUNDO_PLANO``
+    filas se encola la tarea y se redirige a su página de progreso.
+    """
+    mensaje_borrado = "Registro eliminado."
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["conteos"] = conteos(self.object)
+        ctx["conteo_total"] = sum(ctx["conteos"].values())
+        ctx["anios_cerrados"] = anios_cerrados(self.object)
+        return ctx
+
+    def form_valid(self, form):
+        if anios_cerrados(self.object):  # la confirmación vuelve a mostrarse con el aviso
+            return self.render_to_response(self.get_context_data())
+        if sum(conteos(self.object).values()) > UMBRAL_SEGUNDO_PLANO:
+            from . import tareas
+            t = tareas.encolar("borrar_jerarquia", modelo=etiqueta_modelo(self.object), pk=self.object.pk)
+            messages.info(self.request, "El borrado es grande; se hará en segundo plano.")
+            return redirect("tarea_detalle", pk=t.pk)
+        borrar(self.object)
+        messages.success(self.request, self.mensaje_borrado)
+        return redirect(self.get_success_url())
@@ -0,0 +1,93 @@
+# planificacion/cierres.py
+"""
+Cierre de años de planificación.
+
+``cerrar(anio)`` agrega una sola vez (en vivo) el cumplimiento del año y lo
+congela en ``CierreIndicador`` (una fila por indicador) y ``CierreNivel``
+(área, objetivo, acción y operación). Desde ese momento el panel y el reporte
+leen esas filas para ese año y ``SerieIndicador`` rechaza cambios en él.
+``reabrir(anio)`` descarta la instantánea y vuelve al cálculo en vivo.
+"""
+from collections import defaultdict
+
+from django.db import router, transaction
+
+from . import formulas, reportes
+from .models import AnioCerrado, CierreIndicador, CierreNivel, NivelCierre, SerieIndicador
+
+LOTE = 1000
+
+_RUTA = "indicador__operacion__accion__objetivo__area_org"
+
+# nivel -> (campo id en CierreIndicador, lookup del nombre desde la serie)
+NIVELES = {
+    NivelCierre.OBJETIVO: ("objetivo_id", "indicador__operacion__accion__objetivo__codigo"),
+    NivelCierre.ACCION: ("accion_id", "indicador__operacion__accion__codigo"),
+    NivelCierre.OPERACION: ("operacion_id", "indicador__operacion__codigo"),
+}
+
+
+def _filas_indicador(anio):
+    return (SerieIndicador.objects.filter(anio=anio)
+            .values("indicador_id", "indicador__nombre", "indicador__operacion_id", "indicador__operacion__codigo",
+                    "indicador__operacion__accion_id", "indicador__operacion__accion__objetivo_id",
+                    f"{_RUTA}_id", f"{_RUTA}__nombre",
+                    *(lookup for _, lookup in NIVELES.values()), *formulas.CAMPOS_INDICADOR)
+            .annotate(**reportes.suma_prog_ejec())
+            .order_by("indicador_id"))
+
+
+def cerrar(anio, notas=""):
+    """Congela ``anio``. Devuelve (indicadores, nodos) materializados."""
+    db = router.db_for_write(AnioCerrado)
+    with transaction.atomic(using=db):
+        if AnioCerrado.objects.select_for_update().filter(anio=anio).exists():
+            raise ValueError(f"El año {anio} ya está cerrado.")
+
+        indicadores = []
+        nodos = defaultdict(lambda: {"nombre": "", "programado": 0.0, "ejecutado": 0.0, "vals": [], "total": 0})
+        for r in reportes.ConFormula(_filas_indicador(anio)).iterator(chunk_size=LOTE):
+            indicadores.append(CierreIndicador(
+                anio=anio, indicador_id=r["indicador_id"], indicador_nombre=r["indicador__nombre"],
+                operacion_id=r["indicador__operacion_id"], operacion_codigo=r["indicador__operacion__codigo"],
+                accion_id=r["indicador__operacion__accion_id"],
+                objetivo_id=r["indicador__operacion__accion__objetivo_id"],
+                area_org_id=r[f"{_RUTA}_id"], area_org_nombre=r[f"{_RUTA}__nombre"],
+                programado=r["programado"], ejecutado=r["ejecutado"], cumplimiento=r["cumplimiento"]))
+            for nivel, (campo, lookup) in NIVELES.items():
+                nodo = nodos[nivel, getattr(indicadores[-1], campo)]
+                nodo["nombre"] = r[lookup] or ""
+                nodo["programado"] += r["programado"]
+                nodo["ejecutado"] += r["ejecutado"]
+                nodo["total"] += 1
+                if r["programado"] > 0:
+                    nodo["vals"].append(r["cumplimiento"])
+        CierreIndicador.objects.bulk_create(indicadores, batch_size=LOTE)
+
+        niveles = [
+            CierreNivel(anio=anio, nivel=nivel, nodo_id=nodo_id, nombre=n["nombre"][:300],
+                        programado=n["programado"], ejecutado=n["ejecutado"], total_indicadores=n["total"],
+                        prom_cumplimiento=round(sum(n["vals"]) / len(n["vals"]), 2) if n["vals"] else 0.0)
+            for (nivel, nodo_id), n in nodos.items()
+        ]
+        # áreas: exactamente lo que mostraba el panel (incluye áreas sin datos en el año)
+        sumas_area = defaultdict(lambda: [0.0, 0.0])
+        for c in indicadores:
+            sumas_area[c.area_org_id][0] += c.programado
+            sumas_area[c.area_org_id][1] += c.ejecutado
+        for a in reportes.cumplimiento_area_vivo(anio):
+            prog, ejec = sumas_area[a["area_id"]]
+            niveles.append(CierreNivel(anio=anio, nivel=NivelCierre.AREA, nodo_id=a["area_id"], nombre=a["area"],
+                                       programado=prog, ejecutado=ejec, prom_cumplimiento=a["prom_cumplimiento"],
+                                       total_indicadores=a["total_indicadores"]))
+        CierreNivel.objects.bulk_create(niveles, batch_size=LOTE)
+        AnioCerrado.objects.create(anio=anio, notas=notas)
+    return len(indicadores), len(niveles)
+
+
+def reabrir(anio):
+    db = router.db_for_write(AnioCerrado)
+    with transaction.atomic(using=db):
+        CierreIndicador.objects.filter(anio=anio).delete()
+        CierreNivel.objects.filter(anio=anio).delete()
+        return AnioCerrado.objects.filter(anio=anio).delete()[0] > 0
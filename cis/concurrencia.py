@@ -0,0 +1,72 @@
+# planificacion/concurrencia.py
+"""
+Concurrencia optimista para la carga de datos (series e indicadores).
+
+La versión de una fila es su ``actualizado`` (``auto_now``): cambia en cada
+guardado y ya viaja en los formularios como campo oculto ``version``. Al
+guardar, el UPDATE lleva ``WHERE id = … AND actualizado = <versión leída>``
+(ver ``VersionadoModel`` en models.py); si no toca ninguna fila es que otro
+usuario guardó (o borró) antes y se levanta ``Conflicto`` en vez de pisar
+sus cambios en silencio.
+
+En la vista el conflicto vuelve al formulario como error general y el campo
+``version`` pasa a la versión actual: reenviar el mismo formulario, ya
+visto el aviso, sobrescribe a sabiendas.
+"""
+from django import forms
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+class Conflicto(ValidationError):
+    """La fila cambió (``actual`` = su versión vigente) o se borró (``actual`` = None) desde que se leyó."""
+
+    def __init__(self, instancia, actual):
+        self.instancia = instancia
+        self.actual = actual
+        if actual is None:
+            mensaje = "Otro usuario eliminó este registro mientras lo editabas; no se guardaron tus cambios."
+        else:
+            hora = timezone.localtime(actual).strftime("%H:%M:%S")
+            mensaje = (f"Otro usuario modificó este registro mientras lo editabas (a las {hora}). "
+                       "Revisa los valores y vuelve a guardar para sobrescribirlos.")
+        super().__init__(mensaje, code="conflicto")
+
+
+def version_de(instancia):
+    return getattr(instancia, "version_esperada", None)
+
+
+class VersionFormMixin(forms.ModelForm):
+    """Agrega el campo oculto ``version`` a un ModelForm de un ``VersionadoModel``."""
+
+    version = forms.CharField(required=False, widget=forms.HiddenInput)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk and version_de(self.instance):
+            self.initial["version"] = version_de(self.instance).isoformat()
+
+    def clean_version(self):
+        texto = self.cleaned_data.get("version")
+        if not texto:
+            return None
+        version = parse_datetime(texto)
+        if version is None:
+            raise forms.ValidationError("Versión inválida; recarga la página.")
+        return version
+
+    def _post_clean(self):
+        super()._post_clean()
+        # sin versión enviada queda la que se leyó de la base al cargar la instancia
+        version = self.cleaned_data.get("version")
+        if self.instance.pk and version:
+            self.instance.version_esperada = version
+
+    def conflicto(self, exc):
+        """Muestra ``exc`` en el formulario y deja la versión vigente para que el reenvío sobrescriba."""
+        self.add_error(None, exc.messages[0])
+        if exc.actual is not None:
+            self.data = self.data.copy()
+            self.data[self.add_prefix("version")] = exc.actual.isoformat()
@@ -0,0 +1,90 @@
+# planificacion/condicional.py
+"""
+GET condicional (ETag) a partir de ``actualizado``.
+
+La huella de una página es max(actualizado) + count(*) de cada queryset del
+que depende: una edición cambia el máximo y un alta/baja cambia el conteo.
+Se calcula antes de la consulta completa y del render; si el navegador ya
+tiene esa versión se responde 304 sin tocar la plantilla.
+
+No se envía Last-Modified: max(actualizado) en segundos retrocede al borrar
+la fila más nueva y no cambia con dos ediciones en el mismo segundo, así que
+un cliente que solo mande If-Modified-Since recibiría 304 falsos.
+
+Con mensajes pendientes (``django.contrib.messages``: un aviso tras un
+redirect que no cambió ninguna fila) no se responde 304 ni se manda ETag:
+la copia del navegador no tiene el aviso y la página con el aviso no debe
+quedar como versión válida para la próxima visita.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+
+def huella(querysets, *extra):
+    """ETag de una lista de querysets."""
+    partes = [str(e) for e in extra]
+    for qs in querysets:
+        agg = qs.order_by().aggregate(m=Max("actualizado"), n=Count("pk"))
+        partes.append(f"{qs.model._meta.label}:{agg['n']}:{agg['m'].timestamp() if agg['m'] else 0}")
+    etag = hashlib.md5("|".join(partes).encode(), usedforsecurity=False).hexdigest()
+    return quote_etag(etag)
+
+
+def _variantes(request):
+    # lo que cambia el HTML sin cambiar los datos: query string, shard, cookie CSRF
+    return (
+        request.get_full_path(),
+        getattr(request, "shard", None) or "",
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+    )
+
+
+def respuesta_condicional(request, querysets):
+    """
+    Devuelve (respuesta_304_o_None, etag).
+    Si la respuesta no es None, la vista debe devolverla tal cual.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return None, None
+    if len(messages.get_messages(request)):  # len() no los marca como leídos
+        return None, None
+    etag = huella(querysets, *_variantes(request))
+    resp = get_conditional_response(request, etag=etag)
+    if resp is not None:
+        patch_cache_control(resp, private=True, no_cache=True)
+    return resp, etag
+
+
+def marcar(response, etag):
+    if etag and not response.has_header("ETag"):
+        response.headers["ETag"] = etag
+    # el navegador guarda la página pero revalida siempre
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Para ListView/TemplateView: ``get_huella_querysets()`` indica de qué datos
+    depende la página (por defecto el queryset filtrado de la vista).
+    """
+
+    def get_huella_querysets(self):
+        return [self.get_queryset()]
+
+    def respuesta_condicional(self):
+        querysets = self.get_huella_querysets()
+        if querysets is None:  # la vista no puede calcular una huella barata
+            return None, None
+        return respuesta_condicional(self.request, querysets)
+
+    def get(self, request, *args, **kwargs):
+        resp, etag = self.respuesta_condicional()
+        if resp is not None:
+            return resp
+        return marcar(super().get(request, *args, **kwargs), etag)
@@ -0,0 +1,215 @@
+# planificacion/escritura.py
+"""
+Escrituras agrupadas (group commit) para la carga concurrente de series.
+
+En SQLite cada COMMIT es un fsync y un solo escritor a la vez: con varios
+usuarios guardando celdas sueltas, los guardados se encolan detrás del lock
+(o fallan con "database is locked" al subir una transacción de lectura a
+escritura). ``escribir(fn, modelo)`` no abre su propia transacción: deja
+``fn`` en la cola de un hilo escritor que junta lo que llegue en ``VENTANA``
+segundos (hasta ``MAX_LOTE`` operaciones) y lo aplica en una sola
+transacción corta, con un SAVEPOINT por operación. Un error de validación
+o un ``Conflicto`` de una operación solo revierte su savepoint y le llega a
+quien la pidió; las demás se confirman igual.
+
+Si la base sigue bloqueada (otro proceso escribiendo), el lote entero se
+reintenta con espera exponencial. Por eso ``fn`` debe poder repetirse: el
+estado de las ``instancias`` que recibe (pk, alta, versión) se restaura
+antes de cada intento.
+
+Cada operación corre en una copia del contexto de quien la pidió (shard
+activo, etc.) y se agrupa por el alias de base que le toca. Dentro de un
+``transaction.atomic()`` del llamador, o con ``CIS_ESCRITURA_AGRUPADA =
+False``, se aplica en el mismo hilo con ``con_reintentos``.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextvars import copy_context
+
+from django.conf import settings
+from django.db import OperationalError, connections, router, transaction
+
+logger = logging.getLogger(__name__)
+
+VENTANA = 0.005
+MAX_LOTE = 64
+REINTENTOS = 8
+ESPERA_INICIAL = 0.01
+
+estadisticas = {"operaciones": 0, "lotes": 0, "reintentos": 0}
+_lock_estadisticas = threading.Lock()
+
+
+def _contar(**deltas):
+    with _lock_estadisticas:
+        for clave, n in deltas.items():
+            estadisticas[clave] += n
+
+
+def base_bloqueada(exc):
+    return isinstance(exc, OperationalError) and "locked" in str(exc).lower()
+
+
+def _instantanea(instancias):
+    return [(obj, obj.pk, obj._state.adding, getattr(obj, "version_esperada", None),
+             getattr(obj, "_original", None)) for obj in instancias]
+
+
+def _restaurar(estado):
+    for obj, pk, adding, version, original in estado:
+        obj.pk = pk
+        obj._state.adding = adding
+        obj.version_esperada = version
+        if original is not None:
+            obj._original = original
+
+
+def con_reintentos(fn, using=None, instancias=()):
+    """Ejecuta ``fn`` en su propia transacción, reintentando si la base está bloqueada."""
+    if connections[using or "default"].in_atomic_block:
+        return fn()  # la transacción es del llamador: no se puede repetir desde aquí
+    estado = _instantanea(instancias)
+    espera = ESPERA_INICIAL
+    for intento in range(REINTENTOS):
+        _restaurar(estado)
+        try:
+            with transaction.atomic(using=using):
+                return fn()
+        except OperationalError as exc:
+            if not base_bloqueada(exc) or intento == REINTENTOS - 1:
+                raise
+        _contar(reintentos=1)
+        time.sleep(espera)
+        espera *= 2
+
+
+class _Pedido:
+    __slots__ = ("fn", "alias", "contexto", "estado", "futuro")
+
+    def __init__(self, fn, alias, instancias):
+        self.fn = fn
+        self.alias = alias
+        self.contexto = copy_context()
+        self.estado = _instantanea(instancias)
+        self.futuro = Future()
+
+
+_FIN = object()
+
+
+class Escritor(threading.Thread):
+    """Hilo único que vacía la cola en lotes de una transacción por base."""
+
+    def __init__(self):
+        super().__init__(name="cis-escritor", daemon=True)
+        self.cola = queue.Queue()
+
+    def enviar(self, pedido):
+        self.cola.put(pedido)
+        return pedido.futuro
+
+    def run(self):
+        try:
+            terminar = False
+            while not terminar:
+                lote = [self.cola.get()]
+                if lote[0] is _FIN:
+                    break
+                limite = time.monotonic() + VENTANA
+                while len(lote) < MAX_LOTE:
+                    restante = limite - time.monotonic()
+                    try:
+                        pedido = self.cola.get(timeout=restante) if restante > 0 else self.cola.get_nowait()
+                    except queue.Empty:
+                        break
+                    if pedido is _FIN:
+                        terminar = True
+                        break
+                    lote.append(pedido)
+                por_alias = {}
+                for pedido in lote:
+                    por_alias.setdefault(pedido.alias, []).append(pedido)
+                for alias, pedidos in por_alias.items():
+                    self._aplicar(alias, pedidos)
+        finally:
+            connections.close_all()
+
+    def _aplicar(self, alias, pedidos):
+        try:
+            resultados = self._confirmar(alias, pedidos)
+        except BaseException as exc:  # nadie debe quedar esperando un futuro que no se resuelve
+            for pedido in pedidos:
+                pedido.futuro.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+        _contar(operaciones=len(pedidos), lotes=1)
+        for pedido, (ok, valor) in zip(pedidos, resultados):
+            if ok:
+                pedido.futuro.set_result(valor)
+            else:
+                pedido.futuro.set_exception(valor)
+
+    def _confirmar(self, alias, pedidos):
+        espera = ESPERA_INICIAL
+        for intento in range(REINTENTOS):
+            resultados = []
+            try:
+                with transaction.atomic(using=alias):
+                    for pedido in pedidos:
+                        _restaurar(pedido.estado)
+                        try:
+                            with transaction.atomic(using=alias):
+                                resultados.append((True, pedido.contexto.run(pedido.fn)))
+                        except OperationalError as exc:
+                            if base_bloqueada(exc):
+                                raise  # bloquea al lote entero: se reintenta todo
+                            resultados.append((False, exc))
+                        except Exception as exc:
+                            resultados.append((False, exc))
+                return resultados
+            except OperationalError as exc:
+                if not base_bloqueada(exc) or intento == REINTENTOS - 1:
+                    raise
+            logger.debug("Base bloqueada; reintentando lote de %s escrituras", len(pedidos))
+            _contar(reintentos=1)
+            time.sleep(espera)
+            espera *= 2
+
+
+_escritor = None
+_lock_escritor = threading.Lock()
+
+
+def _activo():
+    global _escritor
+    with _lock_escritor:
+        if _escritor is None or not _escritor.is_alive():
+            _escritor = Escritor()
+            _escritor.start()
+        return _escritor
+
+
+def detener():
+    """Vacía la cola y termina el hilo escritor (cierra sus conexiones); se recrea al siguiente uso."""
+    global _escritor
+    with _lock_escritor:
+        escritor, _escritor = _escritor, None
+    if escritor is not None and escritor.is_alive():
+        escritor.cola.put(_FIN)
+        escritor.join()
+
+
+def escribir(fn, modelo, instancias=()):
+    """
+    Aplica ``fn()`` (que guarda instancias de ``modelo``) y devuelve su
+    resultado; las excepciones de ``fn`` se propagan igual que en línea.
+    ``instancias``: objetos que ``fn`` guarda, para restaurarlos si el lote se reintenta.
+    """
+    alias = router.db_for_write(modelo)
+    if not getattr(settings, "CIS_ESCRITURA_AGRUPADA", True) or connections[alias].in_atomic_block:
+        return con_reintentos(fn, alias, instancias)
+    return _activo().enviar(_Pedido(fn, alias, instancias)).result()
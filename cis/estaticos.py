@@ -0,0 +1,203 @@
+# planificacion/estaticos.py
+"""
+Pipeline de estáticos: librerías vendorizadas, bundles, hash y precompresión.
+
+1. ``manage.py vendorizar_assets`` descarga las librerías de ``VENDOR`` a
+   ``cis/static/vendor`` (con las fuentes/íconos que referencian sus CSS).
+2. ``manage.py collectstatic`` con ``AssetsStorage`` arma los ``BUNDLES``
+   (CSS minificado, JS concatenado), les pone hash de contenido y deja al lado
+   variantes ``.gz`` y ``.br`` (esta última si está instalado ``brotli``).
+3. ``servir`` entrega STATIC_ROOT eligiendo la variante comprimida y con
+   cache de un año para los nombres con hash (si no hay nginx delante).
+
+Mientras no se vendorice, el tag ``{% assets_css %}``/``{% assets_js %}`` cae a
+las URLs de CDN de ``VENDOR``.
+"""
+import gzip
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # opcional: sin brotli solo se generan .gz
+    brotli = None
+
+# destino (relativo a static/) -> (url de origen, integridad SRI o None)
+VENDOR = {
+    "vendor/jquery/jquery.min.js": (
+        "https://code.jquery.com/jquery-3.7.1.min.js",
+        "sha256-/JqT3SQfawRcv/BIHPThkBvs0OEvtFFmqPF/lYI/Cxo="),
+    "vendor/select2/select2.min.css": (
+        "https://cdn.jsdelivr.net/npm/select2@4.1.0-rc.0/dist/css/select2.min.css", None),
+    "vendor/select2/select2.min.js": (
+        "https://cdn.jsdelivr.net/npm/select2@4.1.0-rc.0/dist/js/select2.min.js", None),
+    "vendor/bootstrap/bootstrap.min.css": (
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css",
+        "sha384-T3c6CoIi6uLrA9TneNEoa7RxnatzjcDSCmG1MXxSR1GAsXEV/Dwwykc2MPK8M2HN"),
+    "vendor/bootstrap/bootstrap.bundle.min.js": (
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js", None),
+    "vendor/fontawesome/css/all.min.css": (
+        "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.10.0/css/all.min.css", None),
+    "vendor/bootstrap-icons/bootstrap-icons.css": (
+        "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.4.1/font/bootstrap-icons.css", None),
+    "vendor/fonts/anton/latin-400.css": (
+        "https://cdn.jsdelivr.net/npm/@fontsource/anton@5/latin-400.css", None),
+    "vendor/fonts/lora/wght.css": (
+        "https://cdn.jsdelivr.net/npm/@fontsource-variable/lora@5/wght.css", None),
+    "vendor/fonts/lora/wght-italic.css": (
+        "https://cdn.jsdelivr.net/npm/@fontsource-variable/lora@5/wght-italic.css", None),
+    "vendor/chartjs/chart.umd.min.js": (
+        "https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js", None),
+}
+
+# Fuentes que se piden a Google cuando aún no hay copia local
+CDN_FUENTES = [
+    "https://fonts.googleapis.com/css2?family=Anton&display=swap",
+    "https://fonts.googleapis.com/css2?family=Lora:ital,wght@0,400..700;1,400..700&display=swap",
+]
+
+BUNDLES = {
+    "bundle/app.css": [
+        "vendor/bootstrap/bootstrap.min.css",
+        "vendor/select2/select2.min.css",
+        "vendor/fontawesome/css/all.min.css",
+        "vendor/bootstrap-icons/bootstrap-icons.css",
+        "vendor/fonts/anton/latin-400.css",
+        "vendor/fonts/lora/wght.css",
+        "vendor/fonts/lora/wght-italic.css",
+        "css/style.css",
+        "css/utility.css",
+    ],
+    "bundle/app.js": [
+        "vendor/jquery/jquery.min.js",
+        "vendor/select2/select2.min.js",
+        "vendor/bootstrap/bootstrap.bundle.min.js",
+        "js/main.js",
+    ],
+    "bundle/chart.js": [
+        "vendor/chartjs/chart.umd.min.js",
+    ],
+}
+
+COMPRIMIBLES = (".css", ".js", ".svg", ".json", ".txt", ".map", ".eot", ".ttf")
+
+_url_re = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+_hash_re = re.compile(r"\.[0-9a-f]{12}\.[^./]+$")
+
+
+def reescribir_urls(css, origen, destino):
+    """Ajusta los url() relativos de ``origen`` para que funcionen desde ``destino``."""
+    base_o, base_d = posixpath.dirname(origen), posixpath.dirname(destino)
+
+    def sub(m):
+        ref = m.group(2).strip()
+        if re.match(r"^(data:|https?:|//|/|#)", ref):
+            return m.group(0)
+        ruta, sep, resto = _partir(ref)
+        nueva = posixpath.relpath(posixpath.normpath(posixpath.join(base_o, ruta)), base_d or ".")
+        return f'url("{nueva}{sep}{resto}")'
+    return _url_re.sub(sub, css)
+
+
+def _partir(ref):
+    m = re.search(r"[?#]", ref)
+    if not m:
+        return ref, "", ""
+    return ref[:m.start()], ref[m.start()], ref[m.start() + 1:]
+
+
+def minificar_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def armar_bundle(nombre, fuentes):
+    """``fuentes``: lista de (ruta_relativa, contenido_str) en orden."""
+    partes = []
+    for ruta, contenido in fuentes:
+        if nombre.endswith(".css"):
+            contenido = reescribir_urls(contenido, ruta, nombre)
+            if not ruta.endswith(".min.css"):
+                contenido = minificar_css(contenido)
+        partes.append(f"/* {ruta} */\n{contenido.strip()}")
+    sep = "\n" if nombre.endswith(".css") else "\n;\n"
+    return sep.join(partes) + "\n"
+
+
+class AssetsStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage + bundles + variantes .gz/.br."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for nombre, fuentes in BUNDLES.items():
+                if not all(f in paths for f in fuentes):
+                    continue  # sin vendorizar: no hay bundle (se sirve por CDN)
+                leidas = []
+                for f in fuentes:
+                    storage, ruta = paths[f]
+                    with storage.open(ruta) as fh:
+                        leidas.append((f, fh.read().decode("utf-8")))
+                if self.exists(nombre):
+                    self.delete(nombre)
+                self._save(nombre, ContentFile(armar_bundle(nombre, leidas).encode("utf-8")))
+                paths[nombre] = (self, nombre)
+
+        for original, procesado, hecho in super().post_process(paths, dry_run, **options):
+            if hecho and not dry_run and isinstance(procesado, str):
+                self.comprimir(procesado)
+            yield original, procesado, hecho
+
+    def comprimir(self, nombre):
+        if not nombre.endswith(COMPRIMIBLES):
+            return
+        ruta = Path(self.path(nombre))
+        datos = ruta.read_bytes()
+        if len(datos) < 256:
+            return
+        Path(f"{ruta}.gz").write_bytes(gzip.compress(datos, compresslevel=9, mtime=0))
+        if brotli is not None:
+            Path(f"{ruta}.br").write_bytes(brotli.compress(datos, quality=11))
+
+
+def servir(request, path):
+    """
+    Sirve STATIC_ROOT con la variante precomprimida que acepte el cliente.
+    Los nombres con hash son inmutables: cache de un año.
+    """
+    try:
+        ruta = Path(safe_join(settings.STATIC_ROOT, path))
+    except SuspiciousFileOperation:  # ../ fuera de STATIC_ROOT
+        raise Http404(path)
+    if not ruta.is_file():
+        raise Http404(path)
+
+    aceptadas = request.headers.get("Accept-Encoding", "")
+    elegido, encoding = ruta, None
+    for ext, enc in ((".br", "br"), (".gz", "gzip")):
+        variante = Path(f"{ruta}{ext}")
+        if enc in aceptadas and variante.is_file():
+            elegido, encoding = variante, enc
+            break
+
+    content_type, _ = mimetypes.guess_type(str(ruta))
+    response = FileResponse(open(elegido, "rb"), content_type=content_type or "application/octet-stream")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    patch_vary_headers(response, ("Accept-Encoding",))
+    if _hash_re.search(ruta.name):
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        response.headers["Cache-Control"] = "public, max-age=3600"
+    return response
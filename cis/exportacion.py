@@ -0,0 +1,304 @@
+# planificacion/exportacion.py
+"""
+Exportar / importar el plan completo entre entornos, sin ``dumpdata``/``loaddata``.
+
+Formato: gzip de líneas JSON (orjson). Una cabecera, y por modelo una línea
+``{"modelo": …, "campos": […]}`` seguida de una fila por línea como arreglo
+de valores (sin repetir nombres de campo)::
+
+    {"formato": "cis-plan", "version": 1, "creado": "…"}
+    {"modelo": "cis.entidad", "campos": ["id", "nombre", "sigla"]}
+    [1, "Universidad …", "UABJB"]
+    …
+    {"fin": {"cis.entidad": 1, …}}
+
+``exportar`` recorre cada modelo con ``iterator()`` en orden de dependencias,
+así que la memoria no depende del tamaño de la base. ``importar`` lee línea a
+línea e inserta por lotes, reasignando los pk viejos a los nuevos con un mapa
+por modelo padre; solo se guardan mapas de modelos que tienen hijos (nunca el
+de las series, que es el nivel grande). Los padres van con ``bulk_create``;
+las hojas (series y vínculos con fuentes) con ``executemany`` e ids
+consecutivos asignados aquí, como ``loaddata`` (luego se reinician las
+secuencias), para no preparar cada valor con el ORM. Para que nadie inserte
+entre el ``max(id)`` y el INSERT, la importación toma el lock de escritura
+de esas tablas al empezar y lo suelta con el COMMIT.
+
+Como en el resto de las escrituras, no se cargan series en años cerrados
+(``AnioCerrado``): el archivo se rechaza entero.
+
+Los catálogos con nombre único (entidades, áreas estratégicas, fuentes) se
+reutilizan si ya existen en el destino. ``creado``/``actualizado`` no viajan:
+en el destino son filas nuevas (y así aparecen en el feed de cambios).
+"""
+import gzip
+from decimal import Decimal
+
+import orjson
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import historial
+from .models import (AccionEstrategica, AnioCerrado, AreaEstrategica, AreaOrganizacional, Entidad,
+                     FuenteInformacion, HistorialSerie, Indicador, ObjetivoEstrategico, Operacion, SerieIndicador,
+                     VersionPlan)
+
+FORMATO = "cis-plan"
+VERSION = 1
+LOTE = 2000
+
+# orden de dependencias: cada FK apunta a un modelo anterior de la lista
+MODELOS = [Entidad, AreaEstrategica, FuenteInformacion, AreaOrganizacional, ObjetivoEstrategico,
+           AccionEstrategica, Operacion, Indicador, Indicador.fuentes.through, SerieIndicador, VersionPlan]
+# catálogos que se emparejan por nombre con lo que ya exista en el destino
+POR_NOMBRE = {Entidad, AreaEstrategica, FuenteInformacion}
+NO_EXPORTAR = {"creado", "actualizado"}
+
+
+class ArchivoInvalido(ValueError):
+    pass
+
+
+def _campos(modelo):
+    return [f.attname for f in modelo._meta.concrete_fields if f.attname not in NO_EXPORTAR]
+
+
+def _fks(modelo):
+    """{attname: modelo destino} de las FKs del modelo."""
+    return {f.attname: f.related_model for f in modelo._meta.concrete_fields if f.is_relation}
+
+
+def _por_defecto(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError
+
+
+def _linea(obj):
+    return orjson.dumps(obj, default=_por_defecto) + b"\n"
+
+
+def exportar(ruta, progreso=None):
+    """Escribe el plan completo en ``ruta``. Devuelve {modelo: filas}."""
+    conteos = {}
+    with gzip.open(ruta, "wb", compresslevel=6) as fh:
+        fh.write(_linea({"formato": FORMATO, "version": VERSION, "creado": timezone.now()}))
+        for modelo in MODELOS:
+            etiqueta = modelo._meta.label_lower
+            campos = _campos(modelo)
+            fh.write(_linea({"modelo": etiqueta, "campos": campos}))
+            n = 0
+            for fila in modelo._default_manager.order_by("pk").values_list(*campos).iterator(chunk_size=LOTE):
+                fh.write(_linea(fila))
+                n += 1
+            conteos[etiqueta] = n
+            if progreso:
+                progreso(etiqueta, n)
+        fh.write(_linea({"fin": conteos}))
+    return conteos
+
+
+def _lineas(fh):
+    """(número de línea, JSON) desde la segunda línea; un archivo dañado es ``ArchivoInvalido``."""
+    numero = 1
+    while True:
+        try:
+            linea = fh.readline()
+        except (EOFError, OSError):  # gzip cortado o corrupto a mitad del archivo
+            raise ArchivoInvalido("El archivo está truncado o dañado.") from None
+        if not linea:
+            return
+        numero += 1
+        try:
+            dato = orjson.loads(linea)
+        except orjson.JSONDecodeError:
+            raise ArchivoInvalido(f"Línea {numero} dañada (JSON inválido).") from None
+        yield numero, dato
+
+
+def _leer(ruta):
+    """Genera (etiqueta, campos, filas) por modelo; ``filas`` se consume en streaming."""
+    with gzip.open(ruta, "rb") as fh:
+        try:
+            cabecera = orjson.loads(fh.readline())
+        except (orjson.JSONDecodeError, OSError):
+            raise ArchivoInvalido("El archivo no es un plan exportado (gzip de líneas JSON).") from None
+        if cabecera.get("formato") != FORMATO or cabecera.get("version") != VERSION:
+            raise ArchivoInvalido(f"Formato no soportado: {cabecera.get('formato')} v{cabecera.get('version')}.")
+        bloque = None
+        for numero, dato in _lineas(fh):
+            if isinstance(dato, list):
+                if bloque is None:
+                    raise ArchivoInvalido("Fila antes de la cabecera de un modelo.")
+                bloque[2].append(dato)
+                if len(bloque[2]) >= LOTE:
+                    yield bloque
+                    bloque = (bloque[0], bloque[1], [])
+            elif not isinstance(dato, dict):
+                raise ArchivoInvalido(f"Línea {numero} inesperada en el archivo.")
+            elif "modelo" in dato:
+                if bloque and bloque[2]:
+                    yield bloque
+                bloque = (dato["modelo"], dato["campos"], [])
+            elif "fin" in dato:
+                if bloque and bloque[2]:
+                    yield bloque
+                return
+        raise ArchivoInvalido("El archivo está truncado (falta la línea final).")
+
+
+class _Importador:
+    def __init__(self, sufijo_area=""):
+        self.sufijo_area = sufijo_area
+        self.mapas = {}  # modelo → {pk viejo: pk nuevo}
+        self.conteos = {}
+        self.momento = timezone.now()
+        self.modelos = {m._meta.label_lower: m for m in MODELOS}
+        # solo se guardan mapas de modelos a los que apunta alguna FK
+        self.con_hijos = {destino for m in MODELOS for destino in _fks(m).values()}
+        self.siguiente_id = {}  # hojas: próximo pk a asignar
+        self.usados = set()
+        self.cerrados = set()
+
+    def bloquear(self):
+        """
+        Lock de escritura sobre las hojas hasta el COMMIT (ids desde max(id) + 1
+        sin carreras) y, ya con el lock, los años cerrados.
+        """
+        hojas = [m for m in MODELOS if m not in self.con_hijos and m not in POR_NOMBRE]
+        conexion = connections[router.db_for_write(SerieIndicador)]
+        q = conexion.ops.quote_name
+        with conexion.cursor() as cursor:
+            if conexion.vendor == "postgresql":
+                tablas = ", ".join(q(m._meta.db_table) for m in hojas)
+                cursor.execute(f"LOCK TABLE {tablas} IN SHARE ROW EXCLUSIVE MODE")
+            else:  # SQLite: la primera escritura toma el lock de toda la base hasta el COMMIT
+                cursor.execute(f"DELETE FROM {q(hojas[0]._meta.db_table)} WHERE 0 = 1")
+        self.cerrados = set(AnioCerrado.objects.values_list("anio", flat=True))
+
+    def lote(self, etiqueta, campos, filas):
+        modelo = self.modelos.get(etiqueta)
+        if modelo is None:
+            raise ArchivoInvalido(f"Modelo desconocido en el archivo: {etiqueta}.")
+        fks = {c: m for c, m in _fks(modelo).items() if c in campos}
+        if modelo not in self.con_hijos and modelo not in POR_NOMBRE:
+            self._hojas(modelo, campos, fks, filas)
+            self.conteos[etiqueta] = self.conteos.get(etiqueta, 0) + len(filas)
+            return
+        pk = modelo._meta.pk.attname
+        viejos, objetos, propias = [], [], []
+        for valores in filas:
+            datos = dict(zip(campos, valores))
+            viejos.append(datos.pop(pk, None))
+            for campo, destino in fks.items():
+                if datos[campo] is None:
+                    continue
+                nuevo = self.mapas.get(destino, {}).get(datos[campo])
+                if nuevo is None and destino is modelo:
+                    # FK al mismo modelo (base de una versión) que puede estar en este lote
+                    propias.append((len(objetos), campo, datos[campo]))
+                datos[campo] = nuevo
+            objetos.append(modelo(**datos))
+        if modelo in POR_NOMBRE:
+            nuevos = self._emparejar_por_nombre(modelo, objetos)
+        else:
+            if modelo is AreaOrganizacional and self.sufijo_area:
+                for o in objetos:
+                    o.nombre = f"{o.nombre}{self.sufijo_area}"[:180]
+            nuevos = [o.pk for o in modelo._default_manager.bulk_create(objetos, batch_size=LOTE)]
+        if modelo in self.con_hijos:
+            self.mapas.setdefault(modelo, {}).update(zip(viejos, nuevos))
+        if propias:
+            mapa = self.mapas[modelo]
+            pendientes = []
+            for i, campo, viejo in propias:
+                if viejo in mapa:
+                    setattr(objetos[i], campo, mapa[viejo])
+                    pendientes.append(objetos[i])
+            modelo._default_manager.bulk_update(pendientes, {c for _, c, _ in propias}, batch_size=LOTE)
+        self.conteos[etiqueta] = self.conteos.get(etiqueta, 0) + len(objetos)
+
+    def _hojas(self, modelo, campos, fks, filas):
+        """INSERT … VALUES con executemany, sin instancias; ids desde max(id) + 1."""
+        db = router.db_for_write(modelo)
+        conexion = connections[db]
+        pk = modelo._meta.pk.attname
+        if modelo not in self.siguiente_id:
+            self.siguiente_id[modelo] = (modelo._default_manager.aggregate(m=Max("pk"))["m"] or 0) + 1
+            self.usados.add(modelo)
+        columnas = [pk] + [c for c in campos if c != pk]
+        sellos = [f.attname for f in modelo._meta.concrete_fields if f.attname in NO_EXPORTAR]
+        ahora = conexion.ops.adapt_datetimefield_value(self.momento)
+        mapas = {c: self.mapas[m] for c, m in fks.items()}
+        if modelo is SerieIndicador and self.cerrados:
+            i_anio = campos.index("anio")
+            cerrados = sorted(self.cerrados.intersection(f[i_anio] for f in filas))
+            if cerrados:
+                raise ArchivoInvalido(
+                    f"El archivo tiene series de años cerrados ({', '.join(map(str, cerrados))}); reabre esos "
+                    "años (manage.py cerrar_anio <año> --reabrir) antes de importarlo.")
+        salida = []
+        for valores in filas:
+            datos = dict(zip(campos, valores))
+            for c, mapa in mapas.items():
+                if datos[c] is not None:
+                    datos[c] = mapa[datos[c]]
+            datos[pk] = self.siguiente_id[modelo]
+            self.siguiente_id[modelo] += 1
+            salida.append([datos[c] for c in columnas] + [ahora] * len(sellos))
+        q = conexion.ops.quote_name
+        sql = (f"INSERT INTO {q(modelo._meta.db_table)} ({', '.join(q(c) for c in columnas + sellos)}) "
+               f"VALUES ({', '.join(['%s'] * (len(columnas) + len(sellos)))})")
+        with conexion.cursor() as cursor:
+            cursor.executemany(sql, salida)
+        if modelo is SerieIndicador:
+            self._historial_altas(conexion, columnas, salida)
+
+    def _historial_altas(self, conexion, columnas, filas):
+        """Fila ALTA de ``HistorialSerie`` por serie importada, también con executemany."""
+        pos = [columnas.index(c) for c in ("id", "indicador_id", "anio", "es_programado")]
+        i_valor = columnas.index("valor")
+        momento = conexion.ops.adapt_datetimefield_value(self.momento)
+        q = conexion.ops.quote_name
+        destino = ("serie_id", "indicador_id", "anio", "es_programado", "valor_centesimos", "tipo", "momento")
+        sql = (f"INSERT INTO {q(HistorialSerie._meta.db_table)} ({', '.join(q(c) for c in destino)}) "
+               f"VALUES ({', '.join(['%s'] * len(destino))})")
+        with conexion.cursor() as cursor:
+            cursor.executemany(sql, [[f[i] for i in pos] + [historial.a_centesimos(f[i_valor]), HistorialSerie.ALTA,
+                                                            momento] for f in filas])
+
+    def reiniciar_secuencias(self):
+        for modelo in self.usados:
+            conexion = connections[router.db_for_write(modelo)]
+            sentencias = conexion.ops.sequence_reset_sql(no_style(), [modelo])
+            if sentencias:
+                with conexion.cursor() as cursor:
+                    for sql in sentencias:
+                        cursor.execute(sql)
+
+    def _emparejar_por_nombre(self, modelo, objetos):
+        existentes = dict(modelo._default_manager.filter(nombre__in=[o.nombre for o in objetos])
+                          .values_list("nombre", "pk"))
+        faltan = [o for o in objetos if o.nombre not in existentes]
+        for o in modelo._default_manager.bulk_create(faltan, batch_size=LOTE):
+            existentes[o.nombre] = o.pk
+        return [existentes[o.nombre] for o in objetos]
+
+
+def importar(ruta, sufijo_area="", progreso=None):
+    """
+    Carga ``ruta`` en una transacción. Devuelve {modelo: filas}. Si un área ya
+    existe en la misma entidad falla la restricción única; ``sufijo_area`` se
+    agrega a los nombres de las áreas importadas para evitarlo. Un archivo con
+    series de años cerrados es ``ArchivoInvalido`` y no se importa nada.
+    """
+    imp = _Importador(sufijo_area)
+    with transaction.atomic(using=router.db_for_write(SerieIndicador)):
+        imp.bloquear()
+        for etiqueta, campos, filas in _leer(ruta):
+            imp.lote(etiqueta, campos, filas)
+            if progreso:
+                progreso(etiqueta, imp.conteos[etiqueta])
+        imp.reiniciar_secuencias()
+    return imp.conteos
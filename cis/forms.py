@@ -162,8 +162,10 @@ class FuenteInformacionForm(forms.ModelForm):
 # planificacion/forms.py
 from django import forms
 from .models import Indicador, Operacion, FuenteInformacion, TipoIndicador, UnidadMedida
+from . import formulas
+from .concurrencia import VersionFormMixin
 
-class IndicadorForm(forms.ModelForm):
+class IndicadorForm(VersionFormMixin, forms.ModelForm):
     class Meta:
         model = Indicador
         fields = [
@@ -191,8 +193,19 @@ class IndicadorForm(forms.ModelForm):
             "unidad": "Número, Porcentaje o Texto.",
             "linea_base": "Valor en el año de línea base.",
             "meta_valor": "Valor objetivo al año meta.",
+            "formula_texto": "Fracción cumplida con ejecutado, programado, linea_base y meta "
+                             "(p. ej. TECPFAP = ejecutado/programado). Sin variables se usa ejecutado/programado.",
         }
 
+    def clean_formula_texto(self):
+        texto = self.cleaned_data.get("formula_texto", "")
+        if formulas.es_formula(texto):
+            try:
+                formulas.compilar(texto)
+            except formulas.FormulaInvalida as exc:
+                raise forms.ValidationError(str(exc))
+        return texto
+
     def clean(self):
         cleaned = super().clean()
         unidad = cleaned.get("unidad")
@@ -223,8 +236,9 @@ class IndicadorForm(forms.ModelForm):
 from django import forms
 from django.forms import modelformset_factory
 from .models import SerieIndicador, Indicador, UnidadMedida
+from .concurrencia import VersionFormMixin
 
-class SerieIndicadorForm(forms.ModelForm):
+class SerieIndicadorForm(VersionFormMixin, forms.ModelForm):
     class Meta:
         model = SerieIndicador
         fields = ["indicador", "anio", "valor", "es_programado", "nota"]
@@ -262,7 +276,7 @@ class SerieIndicadorForm(forms.ModelForm):
 
 
 # ---------- Editor masivo (para un indicador) ----------
-class SerieIndicadorInlineForm(forms.ModelForm):
+class SerieIndicadorInlineForm(VersionFormMixin, forms.ModelForm):
     class Meta:
         model = SerieIndicador
         fields = ["anio", "valor", "es_programado", "nota"]
@@ -278,3 +292,43 @@ SerieIndicadorFormSet = modelformset_factory(
     form=SerieIndicadorInlineForm,
     extra=0, can_delete=True
 )
+
+
+# planificacion/forms.py
+from django import forms
+from .models import AreaOrganizacional
+from . import versiones
+
+class VersionClonarForm(forms.Form):
+    area = forms.ModelChoiceField(
+        queryset=AreaOrganizacional.objects.select_related("entidad").order_by("nombre"),
+        label="Área de origen", widget=forms.Select(attrs={"class": "form-select"}))
+    nombre = forms.CharField(max_length=120, label="Nombre de la versión",
+                             widget=forms.TextInput(attrs={"class": "form-control", "placeholder": "Ej.: PEI 2026-2030"}))
+    nombre_area = forms.CharField(max_length=180, required=False, label="Nombre del área nueva",
+                                  widget=forms.TextInput(attrs={"class": "form-control"}),
+                                  help_text="Opcional; por defecto «<área> — <versión>».")
+    desplazar_anios = forms.IntegerField(initial=0, min_value=-50, max_value=50, label="Desplazar años",
+                                         widget=forms.NumberInput(attrs={"class": "form-control"}),
+                                         help_text="Suma este número a los años de línea base, meta y series.")
+    series = forms.ChoiceField(
+        choices=[(versiones.SERIES_TODAS, "Todas"), (versiones.SERIES_PROGRAMADAS, "Solo programadas"),
+                 (versiones.SERIES_NINGUNA, "Ninguna")],
+        initial=versiones.SERIES_TODAS, label="Series a copiar",
+        widget=forms.Select(attrs={"class": "form-select"}))
+    notas = forms.CharField(required=False, label="Notas",
+                            widget=forms.Textarea(attrs={"class": "form-control", "rows": 2}))
+
+    def clean(self):
+        cleaned = super().clean()
+        area = cleaned.get("area")
+        if area and cleaned.get("nombre"):
+            nombre_area = cleaned.get("nombre_area") or f"{area.nombre} — {cleaned['nombre']}"
+            if AreaOrganizacional.objects.filter(entidad_id=area.entidad_id, nombre=nombre_area[:180]).exists():
+                self.add_error("nombre_area", "Ya existe un área con ese nombre en la entidad.")
+        if area and cleaned.get("desplazar_anios") is not None and cleaned.get("series"):
+            cerrados = versiones.anios_cerrados_destino(area, cleaned["desplazar_anios"], cleaned["series"])
+            if cerrados:
+                self.add_error("desplazar_anios", f"Las series caerían en años cerrados "
+                                                  f"({', '.join(map(str, cerrados))}).")
+        return cleaned
@@ -0,0 +1,222 @@
+# planificacion/formulas.py
+"""
+Fórmulas de cumplimiento por indicador (``Indicador.formula_texto``).
+
+Una fórmula es ``[NOMBRE =] expresión`` con las variables ``ejecutado``,
+``programado``, ``linea_base`` y ``meta``, números, ``+ - * / **``,
+paréntesis y ``min``/``max``/``abs``. Da la fracción cumplida (1 = 100 %):
+
+    TECPFAP = (ejecutado/programado)
+    (ejecutado - linea_base) / (meta - linea_base)
+
+El texto se analiza con ``ast`` (nunca ``eval``) contra una lista blanca de
+nodos y se compila a una función sobre arreglos numpy, así que una fórmula
+se evalúa de una vez para todas las filas (indicador × año) que la usan.
+``compilar`` está cacheado por el texto: editar la fórmula de un indicador
+cambia la clave y la versión anterior simplemente deja de usarse.
+
+``a_sql`` traduce la misma lista blanca a expresiones del ORM, para los
+reportes que necesitan el cumplimiento dentro de la consulta (ordenar,
+promediar o rankear sin traer las filas).
+
+Los textos descriptivos que no nombran ninguna variable (“N/C”, “N° de
+productos ejecutados / …”) usan ``FORMULA_DEFECTO``, que es el cálculo que
+hacían los reportes: ejecutado / programado.
+"""
+import ast
+import operator
+import re
+from functools import lru_cache
+
+import numpy as np
+from django.db.models import Case, FloatField, Value, When
+from django.db.models.functions import Abs, Coalesce, Greatest, Least
+
+VARIABLES = ("ejecutado", "programado", "linea_base", "meta")
+FORMULA_DEFECTO = "ejecutado / programado"
+LARGO_MAXIMO = 500
+
+# columnas que los reportes agregan a sus values() para evaluar la fórmula
+CAMPO_TEXTO = "indicador__formula_texto"
+CAMPOS_INDICADOR = {CAMPO_TEXTO: None, "indicador__linea_base": "linea_base", "indicador__meta_valor": "meta"}
+
+_OPERADORES = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.Pow: operator.pow,
+}
+_UNARIOS = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+
+
+def _dividir(a, b):
+    # x / 0 → NaN, como el NULL de SQL: así se propaga igual por min/max y da 0 en los dos lados
+    return np.where(b == 0, np.nan, np.true_divide(a, b))
+
+
+_OPERADORES_NP = {**_OPERADORES, ast.Div: _dividir}
+_FUNCIONES = {"min": np.minimum, "max": np.maximum, "abs": np.abs}
+_FUNCIONES_SQL = {"min": Least, "max": Greatest, "abs": Abs}
+_NOMBRE = re.compile(r"^\s*[A-Za-z_][\w]*\s*=(?!=)")
+_MENCIONA_VARIABLE = re.compile(r"\b(%s)\b" % "|".join(VARIABLES), re.IGNORECASE)
+
+
+class FormulaInvalida(ValueError):
+    pass
+
+
+class Formula:
+    """Expresión compilada: ``formula(ejecutado=arr, programado=arr, ...)`` → arreglo."""
+
+    def __init__(self, texto, fn, variables):
+        self.texto = texto
+        self._fn = fn
+        self.variables = variables
+
+    def __call__(self, **valores):
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            return np.asarray(self._fn(valores), dtype=float)
+
+    def __repr__(self):
+        return f"Formula({self.texto!r})"
+
+
+def expresion(texto):
+    """Quita el ``NOMBRE =`` inicial si lo hay."""
+    return _NOMBRE.sub("", texto or "", count=1).strip()
+
+
+def es_formula(texto):
+    """¿El texto pretende ser una fórmula (nombra alguna variable)?"""
+    return bool(_MENCIONA_VARIABLE.search(texto or ""))
+
+
+def _compilar_nodo(nodo, usadas):
+    if isinstance(nodo, ast.Constant) and type(nodo.value) in (int, float):
+        valor = np.float64(nodo.value)  # desbordes → inf, no OverflowError
+        return lambda v: valor
+    if isinstance(nodo, ast.Name):
+        nombre = nodo.id.lower()
+        if nombre not in VARIABLES:
+            raise FormulaInvalida(f"Variable desconocida: {nodo.id}. Use {', '.join(VARIABLES)}.")
+        usadas.add(nombre)
+        return lambda v: v[nombre]
+    if isinstance(nodo, ast.BinOp) and type(nodo.op) in _OPERADORES:
+        op = _OPERADORES_NP[type(nodo.op)]
+        izq, der = _compilar_nodo(nodo.left, usadas), _compilar_nodo(nodo.right, usadas)
+        return lambda v: op(izq(v), der(v))
+    if isinstance(nodo, ast.UnaryOp) and type(nodo.op) in _UNARIOS:
+        op = _UNARIOS[type(nodo.op)]
+        arg = _compilar_nodo(nodo.operand, usadas)
+        return lambda v: op(arg(v))
+    if (isinstance(nodo, ast.Call) and isinstance(nodo.func, ast.Name) and nodo.func.id in _FUNCIONES
+            and not nodo.keywords and nodo.args):
+        fn = _FUNCIONES[nodo.func.id]
+        args = [_compilar_nodo(a, usadas) for a in nodo.args]
+        if fn is np.abs:
+            if len(args) != 1:
+                raise FormulaInvalida("abs() recibe un solo argumento.")
+            return lambda v: fn(args[0](v))
+
+        def reducir(v):
+            resultado = args[0](v)
+            for a in args[1:]:
+                resultado = fn(resultado, a(v))
+            return resultado
+        return reducir
+    raise FormulaInvalida(f"Expresión no permitida: {ast.dump(nodo)[:60]}")
+
+
+@lru_cache(maxsize=1024)
+def compilar(texto):
+    """Compila ``texto`` (con o sin ``NOMBRE =``). Lanza ``FormulaInvalida``."""
+    expr = expresion(texto)
+    if not expr:
+        raise FormulaInvalida("La fórmula está vacía.")
+    if len(expr) > LARGO_MAXIMO:
+        raise FormulaInvalida(f"La fórmula supera {LARGO_MAXIMO} caracteres.")
+    try:
+        arbol = ast.parse(expr, mode="eval")
+    except SyntaxError as exc:
+        raise FormulaInvalida(f"Sintaxis inválida: {exc.msg}") from None
+    usadas = set()
+    fn = _compilar_nodo(arbol.body, usadas)
+    return Formula(expr, fn, frozenset(usadas))
+
+
+@lru_cache(maxsize=1024)
+def de_texto(texto):
+    """La fórmula vigente para un ``formula_texto`` (la de defecto si no aplica)."""
+    if es_formula(texto):
+        try:
+            return compilar(texto)
+        except FormulaInvalida:
+            pass
+    return compilar(FORMULA_DEFECTO)
+
+
+def _a_float(valores):
+    return np.array([np.nan if v is None else float(v) for v in valores], dtype=float)
+
+
+def aplicar(filas, campo="cumplimiento"):
+    """
+    Completa ``fila[campo]`` (en %) para filas de values() con ``programado``,
+    ``ejecutado`` y ``CAMPOS_INDICADOR``: agrupa por texto de fórmula y evalúa
+    cada grupo de una vez. Sin dato o sin división posible queda 0.0, como el
+    ``Case`` que usaban los reportes. Quita las columnas auxiliares.
+    """
+    grupos = {}
+    for i, f in enumerate(filas):
+        grupos.setdefault(f.get(CAMPO_TEXTO) or "", []).append(i)
+    for texto, idx in grupos.items():
+        formula = de_texto(texto)
+        valores = {"ejecutado": _a_float(filas[i]["ejecutado"] for i in idx),
+                   "programado": _a_float(filas[i]["programado"] for i in idx)}
+        for clave, var in CAMPOS_INDICADOR.items():
+            if var in formula.variables:
+                valores[var] = _a_float(filas[i].get(clave) for i in idx)
+        resultado = np.broadcast_to(formula(**valores) * 100, (len(idx),))
+        resultado = np.where(np.isfinite(resultado), resultado, 0.0)
+        for i, r in zip(idx, resultado.tolist()):
+            filas[i][campo] = r
+    for f in filas:
+        for clave in CAMPOS_INDICADOR:
+            f.pop(clave, None)
+    return filas
+
+
+# ---------- Fórmula como expresión SQL ----------
+def _nodo_sql(nodo, variables):
+    # el árbol ya pasó por ``compilar``: solo aparecen nodos de la lista blanca
+    if isinstance(nodo, ast.Constant):
+        return Value(float(nodo.value), output_field=FloatField())
+    if isinstance(nodo, ast.Name):
+        return variables[nodo.id.lower()]
+    if isinstance(nodo, ast.BinOp):
+        return _OPERADORES[type(nodo.op)](_nodo_sql(nodo.left, variables), _nodo_sql(nodo.right, variables))
+    if isinstance(nodo, ast.UnaryOp):
+        arg = _nodo_sql(nodo.operand, variables)
+        return arg if isinstance(nodo.op, ast.UAdd) else arg * Value(-1.0, output_field=FloatField())
+    fn = _FUNCIONES_SQL[nodo.func.id]
+    args = [_nodo_sql(a, variables) for a in nodo.args]
+    return fn(*args, output_field=FloatField()) if len(args) > 1 or fn is Abs else args[0]
+
+
+def a_sql(textos, variables, campo_texto="formula_texto"):
+    """
+    Cumplimiento (en %) como expresión del ORM. ``variables``: {variable:
+    expresión FloatField}; ``textos``: los ``formula_texto`` distintos del
+    conjunto, cada uno con su rama en un ``Case`` sobre ``campo_texto``.
+    División por cero u otro resultado sin valor → 0.0, como ``aplicar``
+    (salvo ±inf por desborde, que SQLite no produce).
+    """
+    defecto = compilar(FORMULA_DEFECTO)
+    ramas = []
+    for texto in sorted({t for t in textos if t}):
+        formula = de_texto(texto)
+        if formula is not defecto:
+            arbol = ast.parse(formula.texto, mode="eval").body
+            ramas.append(When(**{campo_texto: texto}, then=_nodo_sql(arbol, variables)))
+    expr = _nodo_sql(ast.parse(defecto.texto, mode="eval").body, variables)
+    if ramas:
+        expr = Case(*ramas, default=expr, output_field=FloatField())
+    return Coalesce(expr * Value(100.0, output_field=FloatField()), Value(0.0), output_field=FloatField())
@@ -0,0 +1,98 @@
+# planificacion/historial.py
+"""
+Historial solo-anexar de los valores de las series.
+
+``SerieIndicador.save()``/``delete()`` anotan una fila en ``HistorialSerie``
+cuando cambia el valor (o el año/tipo). Fuera de un ``lote()`` es un INSERT
+por guardado; dentro de un lote las filas se acumulan y salen en un único
+``bulk_create`` al cerrar:
+
+    with historial.lote():
+        for inst in formset.save(commit=False):
+            inst.save()           # → acumulado, sin INSERT extra por fila
+
+Consulta "al día X" sin reproducir la bitácora: el último id por serie con
+``momento <= X`` sale del índice (serie_id, momento) y se descartan las bajas.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import HistorialSerie
+
+ESCALA = 100  # DECIMALS tiene 2 decimales
+
+_pendientes = ContextVar("cis_historial_pendientes", default=None)
+
+
+def a_centesimos(valor):
+    return None if valor is None else int((Decimal(valor) * ESCALA).to_integral_value())
+
+
+def a_decimal(centesimos):
+    return None if centesimos is None else Decimal(centesimos) / ESCALA
+
+
+def fila(serie, tipo, momento=None):
+    return HistorialSerie(
+        serie_id=serie.pk, indicador_id=serie.indicador_id, anio=serie.anio,
+        es_programado=serie.es_programado, valor_centesimos=a_centesimos(serie.valor),
+        tipo=tipo, momento=momento or timezone.now())
+
+
+def registrar(filas):
+    """Anexa ``filas``: al lote abierto si lo hay, si no en un solo INSERT."""
+    filas = list(filas)
+    if not filas:
+        return
+    pendientes = _pendientes.get()
+    if pendientes is not None:
+        pendientes.extend(filas)
+    else:
+        HistorialSerie.objects.bulk_create(filas)
+
+
+@contextmanager
+def lote():
+    """Acumula lo registrado dentro del bloque y lo escribe al salir (si no hubo error)."""
+    if _pendientes.get() is not None:  # anidado: se suma al lote exterior
+        yield
+        return
+    pendientes = []
+    token = _pendientes.set(pendientes)
+    try:
+        yield
+    finally:
+        _pendientes.reset(token)
+    if pendientes:
+        HistorialSerie.objects.bulk_create(pendientes, batch_size=1000)
+
+
+def registrar_bajas(qs):
+    """Para borrados masivos que no pasan por ``delete()`` (una lectura + un INSERT)."""
+    ahora = timezone.now()
+    registrar(HistorialSerie(serie_id=s["pk"], indicador_id=s["indicador_id"], anio=s["anio"],
+                             es_programado=s["es_programado"], valor_centesimos=a_centesimos(s["valor"]),
+                             tipo=HistorialSerie.BAJA, momento=ahora)
+              for s in qs.values("pk", "indicador_id", "anio", "es_programado", "valor"))
+
+
+def valores_al(fecha, **filtros):
+    """
+    Última versión de cada serie vigente a ``fecha`` (filas de ``HistorialSerie``;
+    ``a_decimal(fila.valor_centesimos)`` da el valor). ``filtros`` acota p. ej.
+    por ``indicador_id``.
+    """
+    ultimos = (HistorialSerie.objects.filter(momento__lte=fecha, **filtros)
+               .values("serie_id").annotate(ultimo=Max("id")).values("ultimo"))
+    return HistorialSerie.objects.filter(id__in=ultimos).exclude(tipo=HistorialSerie.BAJA)
+
+
+def valor_al(serie_id, fecha):
+    """Valor de una serie a ``fecha`` (None si no existía o estaba borrada)."""
+    h = (HistorialSerie.objects.filter(serie_id=serie_id, momento__lte=fecha)
+         .order_by("-momento", "-id").first())
+    return None if h is None or h.tipo == HistorialSerie.BAJA else a_decimal(h.valor_centesimos)
@@ -0,0 +1,110 @@
+# planificacion/listados.py
+"""
+Base común para los ListView del CRUD.
+
+Cada vista declara sus filtros y columnas en vez de armar a mano el ``Q``:
+
+    filtros = [Filtro("op", "operacion_id", contexto="op_selected")]
+    busqueda = ("nombre", "codigo")              # ?q= → OR de icontains
+    columnas = ("nombre", "operacion__codigo")   # → only()
+    truncar = {"operacion__descripcion": 50}     # → Substr en SQL
+
+Los campos de ``truncar`` llegan como ``<campo>_corto`` (con un carácter de
+más para que ``truncatechars`` ponga los puntos suspensivos) y el texto
+completo no sale de la base.
+"""
+from django.db.models import Q
+from django.db.models.functions import Substr
+from django.views.generic import ListView
+
+from .condicional import ConditionalGetMixin
+
+
+def nombre_corto(campo):
+    return f"{campo.replace('__', '_')}_corto"
+
+
+def columnas_truncadas(truncar):
+    """Anotaciones Substr para un dict {campo: largo}."""
+    return {nombre_corto(c): Substr(c, 1, n + 1) for c, n in truncar.items()}
+
+
+class Filtro:
+    """
+    Parámetro GET → lookup. ``valores`` traduce opciones fijas
+    (p. ej. {"prog": True}); sin ``valores`` se convierte con ``tipo`` y
+    un valor inválido se ignora en vez de romper la consulta.
+    """
+
+    def __init__(self, param, lookup, contexto=None, tipo=int, valores=None):
+        self.param = param
+        self.lookup = lookup
+        self.contexto = contexto or f"{param}_selected"
+        self.tipo = tipo
+        self.valores = valores
+
+    def valor(self, request):
+        return request.GET.get(self.param, "").strip()
+
+    def aplicar(self, qs, crudo):
+        if not crudo:
+            return qs
+        if self.valores is not None:
+            if crudo not in self.valores:
+                return qs
+            return qs.filter(**{self.lookup: self.valores[crudo]})
+        try:
+            return qs.filter(**{self.lookup: self.tipo(crudo)})
+        except (TypeError, ValueError):
+            return qs
+
+
+class FiltroListView(ConditionalGetMixin, ListView):
+    filtros = ()
+    busqueda = ()
+    select_related = ()
+    prefetch_related = ()
+    columnas = None
+    truncar = {}
+
+    def get_filtros(self):
+        return self.filtros
+
+    def get_busqueda(self):
+        return self.busqueda
+
+    def filtrar(self, qs):
+        q = self.request.GET.get("q", "").strip()
+        busqueda = self.get_busqueda()
+        if q and busqueda:
+            cond = Q()
+            for campo in busqueda:
+                cond |= Q(**{f"{campo}__icontains": q})
+            qs = qs.filter(cond)
+        for f in self.get_filtros():
+            qs = f.aplicar(qs, f.valor(self.request))
+        return qs
+
+    def get_queryset(self):
+        qs = self.filtrar(self.model._default_manager.all())
+        if self.select_related:
+            qs = qs.select_related(*self.select_related)
+        if self.prefetch_related:
+            qs = qs.prefetch_related(*self.prefetch_related)
+        if self.columnas is not None:
+            qs = qs.only(*self.columnas)
+        if self.truncar:
+            qs = qs.annotate(**columnas_truncadas(self.truncar))
+        ordering = self.get_ordering()
+        return qs.order_by(*ordering) if ordering else qs
+
+    def get_huella_querysets(self):
+        # la huella solo necesita los filtros, no las columnas ni los joins de display
+        return [self.filtrar(self.model._default_manager.all())]
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["q"] = self.request.GET.get("q", "").strip()
+        for f in self.get_filtros():
+            ctx[f.contexto] = self.request.GET.get(f.param, "")
+        return ctx
@@ -0,0 +1,199 @@
+# planificacion/management/commands/benchmark.py
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+from django.db import connection, connections, models, transaction
+from django.test.utils import CaptureQueriesContext
+
+from django.template import engines
+
+from cis import analitica, escritura, historial, mapa_calor, reportes, ventanas
+from cis.forms import IndicadorForm, SerieIndicadorFormSet
+from cis.models import AnioCerrado, Indicador, SerieIndicador
+
+
+def _medir(fn, repeticiones):
+    fn()  # calentamiento (plantillas, conexiones, caché de páginas)
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        fn()
+    return (time.perf_counter() - t0) / repeticiones * 1000
+
+
+def _medir_async(afn, repeticiones):
+    """Como ``_medir`` pero dentro de un solo event loop (como en un servidor ASGI)."""
+    async def todas():
+        await afn()
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            await afn()
+        return (time.perf_counter() - t0) / repeticiones * 1000
+    return async_to_sync(todas)()
+
+
+@contextmanager
+def _base_temporal():
+    """Apunta ``default`` a una copia de la base (SQLite) mientras dura el bloque."""
+    escritura.detener()
+    connections.close_all()
+    ajustes = connections.settings["default"]
+    original = ajustes["NAME"]
+    with tempfile.TemporaryDirectory() as carpeta:
+        ajustes["NAME"] = os.path.join(carpeta, "carga.sqlite3")
+        shutil.copyfile(original, ajustes["NAME"])
+        try:
+            yield
+        finally:
+            escritura.detener()
+            connections.close_all()
+            ajustes["NAME"] = original
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmarks de rutas críticas (ms por iteración)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("caso", choices=sorted(self.casos()))
+        parser.add_argument("-n", "--repeticiones", type=int, default=20)
+
+    @staticmethod
+    def casos():
+        return {
+            "analitica": Command.bench_analitica,
+            "dashboard": Command.bench_dashboard,
+            "escritura": Command.bench_escritura,
+            "formularios": Command.bench_formularios,
+            "historial": Command.bench_historial,
+            "mapa_calor": Command.bench_mapa_calor,
+            "ventanas": Command.bench_ventanas,
+        }
+
+    def handle(self, *args, caso, repeticiones, **opts):
+        for etiqueta, valor in self.casos()[caso](repeticiones):
+            if isinstance(valor, int):  # conteos (consultas, filas)
+                self.stdout.write(f"{etiqueta:<40} {valor:10d}")
+            else:
+                self.stdout.write(f"{etiqueta:<40} {valor:10.2f} ms")
+
+    @staticmethod
+    def bench_analitica(n):
+        with CaptureQueriesContext(connection) as q:
+            r = analitica.calcular(Indicador.objects.all())
+        yield "indicadores analizados", len(r)
+        yield "consultas por cálculo", len(q)
+        yield "analítica de avance (todo el conjunto)", _medir(lambda: analitica.calcular(Indicador.objects.all()), n)
+
+    @staticmethod
+    def bench_mapa_calor(n):
+        with CaptureQueriesContext(connection) as q:
+            m = mapa_calor.matriz()
+        yield "celdas (áreas × años)", len(m["cumplimiento"])
+        yield "consultas por matriz", len(q)
+        yield "bytes del JSON", len(json.dumps(m, separators=(",", ":")))
+        yield "mapa de calor área × año", _medir(mapa_calor.matriz, n)
+
+    @staticmethod
+    def bench_ventanas(n):
+        anio = reportes.ultimo_anio()
+        yield "filas de evolución", len(ventanas.evolucion())
+        yield "evolución interanual (todo el conjunto)", _medir(lambda: list(ventanas.evolucion()), n)
+        yield f"evolución, solo {anio}", _medir(lambda: list(ventanas.evolucion(anio=anio)), n)
+        yield "ranking top 10 de áreas", _medir(lambda: list(ventanas.ranking(anio, n=10)), n)
+        yield "ranking últimas 10 operaciones", _medir(
+            lambda: list(ventanas.ranking(anio, "operacion", n=10, ultimos=True)), n)
+
+    @staticmethod
+    def bench_dashboard(n):
+        yield "dashboard síncrono (WSGI)", _medir(reportes.contexto_dashboard, n)
+        yield "dashboard async (ASGI, en el pool)", _medir_async(
+            lambda: reportes.en_hilo(reportes.contexto_dashboard), n)
+
+    @staticmethod
+    def bench_formularios(n):
+        motor = engines["django"]
+        t_form = motor.from_string(
+            "{% load bootstrap_extras %}{% for f in form %}{% render_bs_field f %}{% endfor %}")
+        t_formset = motor.from_string(
+            "{% load bootstrap_extras %}{% for form in formset %}"
+            "{{ form.anio|add_class:'form-control' }}{{ form.valor|add_class:'form-control' }}"
+            "{{ form.es_programado|add_class:'form-check-input' }}{{ form.nota|add_class:'form-control' }}"
+            "{% endfor %}")
+        ind = Indicador.objects.first()
+        formset = SerieIndicadorFormSet(queryset=SerieIndicador.objects.filter(indicador=ind))
+        yield "IndicadorForm (render_bs_field)", _medir(lambda: t_form.render({"form": IndicadorForm(instance=ind)}), n)
+        yield "formset de series (add_class)", _medir(lambda: t_formset.render({"formset": formset}), n)
+
+    @staticmethod
+    def bench_escritura(n, hilos=8):
+        """
+        ``hilos`` usuarios guardando ``n`` series sueltas cada uno, sobre una
+        copia de la base: cada guardado en su transacción (con reintentos)
+        frente a los guardados agrupados de cis/escritura.py.
+        """
+        def carga(guardar):
+            cerrados = AnioCerrado.objects.values_list("anio", flat=True)
+            series = list(SerieIndicador.objects.exclude(valor=None).exclude(anio__in=cerrados)[:hilos * n])
+            connections.close_all()
+            partes = [series[i::hilos] for i in range(hilos)]
+
+            def usuario(propias):
+                try:
+                    for i in range(n):
+                        s = propias[i % len(propias)]
+                        s.valor += 1
+                        guardar(s)
+                finally:
+                    connections.close_all()
+
+            for clave in escritura.estadisticas:
+                escritura.estadisticas[clave] = 0
+            threads = [threading.Thread(target=usuario, args=(p,)) for p in partes if p]
+            t0 = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            segundos = time.perf_counter() - t0
+            return len(threads) * n / segundos, dict(escritura.estadisticas)
+
+        with _base_temporal():
+            directo, e_directo = carga(lambda s: escritura.con_reintentos(s.save, instancias=[s]))
+            agrupado, e_agrupado = carga(lambda s: escritura.escribir(s.save, SerieIndicador, [s]))
+        yield f"guardados/s, {hilos} hilos, transacción propia", int(directo)
+        yield "  reintentos por base bloqueada", e_directo["reintentos"]
+        yield f"guardados/s, {hilos} hilos, agrupados", int(agrupado)
+        yield "  lotes (transacciones)", e_agrupado["lotes"]
+        yield "  reintentos por base bloqueada", e_agrupado["reintentos"]
+
+    @staticmethod
+    def bench_historial(n):
+        """Guardar un lote de series con y sin historial (todo se revierte al final)."""
+        cerrados = AnioCerrado.objects.values_list("anio", flat=True)
+        series = list(SerieIndicador.objects.exclude(valor=None).exclude(anio__in=cerrados)[:50])
+
+        def guardar(con_historial):
+            for s in series:
+                s.valor += 1
+            if con_historial:
+                with historial.lote():
+                    for s in series:
+                        s.save()
+            else:
+                for s in series:
+                    models.Model.save(s)
+
+        with transaction.atomic():
+            yield f"{len(series)} series sin historial", _medir(lambda: guardar(False), n)
+            yield f"{len(series)} series con historial (lote)", _medir(lambda: guardar(True), n)
+            with CaptureQueriesContext(connection) as q:
+                guardar(True)
+            inserts = sum('INSERT INTO "cis_historialserie"' in c["sql"] for c in q.captured_queries)
+            yield "INSERTs de historial por lote", inserts
+            transaction.set_rollback(True)
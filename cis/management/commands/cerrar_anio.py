@@ -0,0 +1,31 @@
+# planificacion/management/commands/cerrar_anio.py
+from django.core.management.base import BaseCommand, CommandError
+
+from cis import cierres, sharding
+
+
+class Command(BaseCommand):
+    help = "Cierra un año de planificación (congela su cumplimiento) o lo reabre con --reabrir."
+
+    def add_arguments(self, parser):
+        parser.add_argument("anio", type=int)
+        parser.add_argument("--reabrir", action="store_true", help="Descarta la instantánea y reabre el año.")
+        parser.add_argument("--notas", default="")
+        parser.add_argument("--shard", default=None,
+                            help="Solo este shard (por defecto todos los configurados).")
+
+    def handle(self, *args, anio, reabrir, notas, shard, **opts):
+        claves = [shard] if shard else (sharding.shards() or [None])
+        for clave in claves:
+            prefijo = f"[{clave}] " if clave else ""
+            with sharding.usar_shard(clave):
+                if reabrir:
+                    ok = cierres.reabrir(anio)
+                    self.stdout.write(f"{prefijo}{anio}: {'reabierto' if ok else 'no estaba cerrado'}")
+                    continue
+                try:
+                    n_ind, n_niv = cierres.cerrar(anio, notas=notas)
+                except ValueError as exc:
+                    raise CommandError(f"{prefijo}{exc}")
+                self.stdout.write(self.style.SUCCESS(
+                    f"{prefijo}{anio} cerrado: {n_ind} indicadores, {n_niv} nodos congelados"))
@@ -0,0 +1,18 @@
+# planificacion/management/commands/exportar_plan.py
+from django.core.management.base import BaseCommand
+
+from cis import exportacion, sharding
+
+
+class Command(BaseCommand):
+    help = "Exporta el plan completo (entidades → series y fuentes) a un .jsonl.gz para importar_plan."
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="Ruta de salida, p. ej. plan.jsonl.gz")
+        parser.add_argument("--shard", default=None, help="Shard de origen (por defecto la base principal).")
+
+    def handle(self, *args, archivo, shard, **opts):
+        with sharding.usar_shard(shard):
+            conteos = exportacion.exportar(
+                archivo, progreso=lambda modelo, n: self.stdout.write(f"{modelo:<32} {n:10d}"))
+        self.stdout.write(self.style.SUCCESS(f"{sum(conteos.values())} filas exportadas a {archivo}"))
@@ -0,0 +1,27 @@
+# planificacion/management/commands/importar_plan.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from cis import exportacion, sharding
+
+
+class Command(BaseCommand):
+    help = "Importa un plan generado con exportar_plan (inserciones por lotes, en una transacción)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo")
+        parser.add_argument("--sufijo-area", default="",
+                            help="Texto agregado al nombre de cada área importada (evita choques con áreas existentes).")
+        parser.add_argument("--shard", default=None, help="Shard de destino (por defecto la base principal).")
+
+    def handle(self, *args, archivo, sufijo_area, shard, **opts):
+        with sharding.usar_shard(shard):
+            try:
+                conteos = exportacion.importar(archivo, sufijo_area=sufijo_area)
+            except (exportacion.ArchivoInvalido, FileNotFoundError) as exc:
+                raise CommandError(str(exc))
+            except IntegrityError as exc:
+                raise CommandError(f"Choque con datos existentes ({exc}). Pruebe con --sufijo-area.")
+        for modelo, n in conteos.items():
+            self.stdout.write(f"{modelo:<32} {n:10d}")
+        self.stdout.write(self.style.SUCCESS(f"{sum(conteos.values())} filas importadas"))
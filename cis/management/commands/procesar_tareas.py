@@ -0,0 +1,24 @@
+# planificacion/management/commands/procesar_tareas.py
+from django.core.management.base import BaseCommand
+
+from cis import tareas
+
+
+class Command(BaseCommand):
+    help = "Worker de la cola local de tareas (exportaciones, recálculos, importaciones)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--una-vez", action="store_true",
+                            help="Procesa lo pendiente y termina (útil en cron).")
+        parser.add_argument("--intervalo", type=float, default=2.0,
+                            help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument("--maximo", type=int, default=None,
+                            help="Termina tras procesar N tareas.")
+
+    def handle(self, *args, una_vez, intervalo, maximo, **opts):
+        self.stdout.write(f"Tipos registrados: {', '.join(sorted(tareas.REGISTRO))}")
+        try:
+            hechas = tareas.procesar(una_vez=una_vez, intervalo=intervalo, maximo=maximo)
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(self.style.SUCCESS(f"{hechas} tarea(s) procesada(s)."))
@@ -0,0 +1,74 @@
+# planificacion/management/commands/vendorizar_assets.py
+import base64
+import hashlib
+import posixpath
+import re
+import urllib.request
+from pathlib import Path
+from urllib.parse import urljoin
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cis.estaticos import VENDOR
+
+STATIC_DIR = Path(__file__).resolve().parents[2] / "static"
+_url_re = re.compile(r"""url\(\s*['"]?([^'")]+?)['"]?\s*\)""")
+_sourcemap_re = re.compile(r"/[*/]# sourceMappingURL=[^\n]*?(\*/)?\s*$", re.M)
+
+
+class Command(BaseCommand):
+    help = "Descarga las librerías de CDN a cis/static/vendor (con fuentes e íconos)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--forzar", action="store_true", help="Vuelve a descargar aunque exista.")
+
+    def handle(self, *args, forzar, **opts):
+        for destino, (url, sri) in VENDOR.items():
+            ruta = STATIC_DIR / destino
+            if ruta.exists() and not forzar:
+                self.stdout.write(f"= {destino}")
+                continue
+            datos = self.bajar(url)
+            if sri:
+                self.verificar(destino, datos, sri)
+            if destino.endswith((".css", ".js")):
+                # sin .map: el manifest de collectstatic exigiría el archivo
+                datos = _sourcemap_re.sub("", datos.decode("utf-8")).encode("utf-8")
+            self.guardar(ruta, datos)
+            self.stdout.write(self.style.SUCCESS(f"+ {destino}"))
+            if destino.endswith(".css"):
+                self.bajar_referencias(url, destino, datos.decode("utf-8"), forzar)
+
+    def bajar(self, url):
+        try:
+            with urllib.request.urlopen(url, timeout=60) as resp:
+                return resp.read()
+        except OSError as exc:
+            raise CommandError(f"No se pudo descargar {url}: {exc}")
+
+    def verificar(self, destino, datos, sri):
+        algo, esperado = sri.split("-", 1)
+        obtenido = base64.b64encode(hashlib.new(algo, datos).digest()).decode()
+        if obtenido != esperado:
+            raise CommandError(f"Integridad inválida para {destino}: {algo}-{obtenido}")
+
+    def guardar(self, ruta, datos):
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta.write_bytes(datos)
+
+    def bajar_referencias(self, url_css, destino_css, css, forzar):
+        """Fuentes/imágenes relativas que usa el CSS, en la misma estructura."""
+        hechas = set()
+        for ref in _url_re.findall(css):
+            if re.match(r"^(data:|https?:|//|/|#)", ref):
+                continue
+            ref = re.split(r"[?#]", ref, maxsplit=1)[0]
+            if not ref or ref in hechas:
+                continue
+            hechas.add(ref)
+            destino = posixpath.normpath(posixpath.join(posixpath.dirname(destino_css), ref))
+            ruta = STATIC_DIR / destino
+            if ruta.exists() and not forzar:
+                continue
+            self.guardar(ruta, self.bajar(urljoin(url_css, ref)))
+            self.stdout.write(f"  + {destino}")
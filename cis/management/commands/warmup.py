@@ -0,0 +1,24 @@
+# planificacion/management/commands/warmup.py
+from django.core.management.base import BaseCommand, CommandError
+
+from cis import warmup
+
+
+class Command(BaseCommand):
+    help = "Precompila plantillas, resuelve URLs y calienta cachés e índices tras un deploy."
+
+    def add_arguments(self, parser):
+        parser.add_argument("etapas", nargs="*",
+                            help=f"Etapas a correr (por defecto todas): {', '.join(n for n, _ in warmup.ETAPAS)}.")
+
+    def handle(self, *args, etapas, **opts):
+        desconocidas = set(etapas) - {n for n, _ in warmup.ETAPAS}
+        if desconocidas:
+            raise CommandError(f"Etapas desconocidas: {', '.join(sorted(desconocidas))}")
+
+        def reportar(nombre, segundos, resumen):
+            self.stdout.write(f"{nombre:<12} {segundos * 1000:9.1f} ms  {resumen}")
+
+        resultados = warmup.ejecutar(etapas, reportar)
+        total = sum(s for _, s, _ in resultados)
+        self.stdout.write(self.style.SUCCESS(f"{'total':<12} {total * 1000:9.1f} ms"))
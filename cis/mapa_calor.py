@@ -0,0 +1,93 @@
+# planificacion/mapa_calor.py
+"""
+Mapa de calor área × año: promedio del % de cumplimiento y cantidad de
+indicadores con programación en cada celda.
+
+Los años abiertos salen de una sola consulta agrupada por (área, año) sobre
+las series programadas, con la ejecutada del mismo año unida por
+``FilteredRelation`` y la fórmula de cada indicador traducida a SQL; los
+años cerrados, de otra consulta agrupada sobre ``CierreIndicador``. Es el
+mismo promedio del panel y de ``CierreNivel``.
+
+``matriz()`` devuelve el formato columnar que consume el navegador: etiquetas
+de filas y de columnas más arreglos planos fila por fila (``None`` en las
+celdas sin datos), así el JSON no repite claves por celda.
+"""
+from django.db.models import Avg, Count, F, FilteredRelation, FloatField, Q, Value
+from django.db.models.functions import Cast, Coalesce
+
+from . import formulas
+from .models import AnioCerrado, AreaOrganizacional, CierreIndicador, Indicador, SerieIndicador
+
+_AREA = "indicador__operacion__accion__objetivo__area_org_id"
+
+
+def _float(campo):
+    return Cast(campo, FloatField())
+
+
+def programadas():
+    """
+    Series programadas (> 0) anotadas con ``cumplimiento_ind``: el % del
+    indicador en ese año según su fórmula, con la ejecutada del mismo año
+    unida por ``FilteredRelation``. Una fila por (indicador, año).
+    """
+    textos = Indicador.objects.order_by().values_list("formula_texto", flat=True).distinct()
+    qs = (SerieIndicador.objects.filter(es_programado=True, valor__gt=0)
+          .annotate(ejec=FilteredRelation("indicador__series", condition=Q(
+              indicador__series__anio=F("anio"), indicador__series__es_programado=False))))
+    return qs.annotate(cumplimiento_ind=formulas.a_sql(textos, {
+        "programado": _float("valor"),
+        "ejecutado": Coalesce(_float("ejec__valor"), Value(0.0)),
+        "linea_base": _float("indicador__linea_base"),
+        "meta": _float("indicador__meta_valor"),
+    }, campo_texto=formulas.CAMPO_TEXTO))
+
+
+def celdas_vivas(excluir_anios=()):
+    """{(área, año): (promedio, indicadores)} de los años abiertos, en una consulta."""
+    qs = programadas()
+    if excluir_anios:
+        qs = qs.exclude(anio__in=excluir_anios)
+    filas = (qs.values("anio", area=F(_AREA))
+             .annotate(prom=Avg("cumplimiento_ind"), n=Count("indicador_id"))
+             .order_by())
+    return {(r["area"], r["anio"]): (r["prom"], r["n"]) for r in filas}
+
+
+def celdas_cerradas():
+    """Lo mismo para los años cerrados, desde la instantánea del cierre."""
+    filas = (CierreIndicador.objects.filter(programado__gt=0)
+             .values("area_org_id", "anio")
+             .annotate(prom=Avg("cumplimiento"), n=Count("id"))
+             .order_by())
+    return {(r["area_org_id"], r["anio"]): (r["prom"], r["n"]) for r in filas}
+
+
+def matriz(decimales=1):
+    """
+    ``{"filas": [...], "fila_ids": [...], "columnas": [años], "cumplimiento":
+    [...], "indicadores": [...]}`` con ``len(filas) * len(columnas)`` valores
+    en cada arreglo plano; la celda (i, j) está en ``i * len(columnas) + j``.
+    """
+    cerrados = set(AnioCerrado.objects.values_list("anio", flat=True))
+    celdas = celdas_vivas(excluir_anios=cerrados)
+    if cerrados:
+        celdas.update(celdas_cerradas())
+    areas = list(AreaOrganizacional.objects.select_related("entidad").order_by("entidad__sigla", "nombre")
+                 .only("nombre", "entidad__sigla", "entidad__nombre"))
+    anios = sorted({anio for _, anio in celdas})
+    columnas = list(range(anios[0], anios[-1] + 1)) if anios else []
+    cumplimiento, indicadores = [], []
+    for area in areas:
+        for anio in columnas:
+            prom, n = celdas.get((area.pk, anio), (None, 0))
+            cumplimiento.append(None if prom is None else round(prom, decimales))
+            indicadores.append(n)
+    return {
+        "filas": [f"{a.nombre} ({a.entidad.sigla or a.entidad.nombre})" for a in areas],
+        "fila_ids": [a.pk for a in areas],
+        "columnas": columnas,
+        "cumplimiento": cumplimiento,
+        "indicadores": indicadores,
+    }
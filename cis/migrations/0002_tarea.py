@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cis', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('tipo', models.CharField(max_length=60)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('shard', models.CharField(blank=True, max_length=40)),
+                ('estado', models.CharField(choices=[('PEND', 'Pendiente'), ('CURS', 'En curso'), ('OK', 'Terminada'), ('ERR', 'Error')], default='PEND', max_length=4)),
+                ('progreso', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('mensaje', models.CharField(blank=True, max_length=250)),
+                ('archivo', models.CharField(blank=True, max_length=300)),
+                ('iniciada', models.DateTimeField(blank=True, null=True)),
+                ('terminada', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Tarea en segundo plano',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['estado', 'id'], name='cis_tarea_estado_c2fb49_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cis', '0002_tarea'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('nombre', models.CharField(max_length=120)),
+                ('desplazamiento_anios', models.SmallIntegerField(default=0)),
+                ('notas', models.TextField(blank=True)),
+                ('area_org', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='version', to='cis.areaorganizacional')),
+                ('base', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='derivadas', to='cis.versionplan')),
+            ],
+            options={
+                'verbose_name': 'Versión de plan',
+                'verbose_name_plural': 'Versiones de plan',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:58
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def sembrar_historial(apps, schema_editor):
+    """Una fila de alta por serie existente (momento = su último ``actualizado``)."""
+    alias = schema_editor.connection.alias
+    Serie = apps.get_model('cis', 'SerieIndicador')
+    Historial = apps.get_model('cis', 'HistorialSerie')
+    lote = []
+    filas = Serie.objects.using(alias).values_list('pk', 'indicador_id', 'anio', 'es_programado', 'valor', 'actualizado')
+    for pk, ind, anio, prog, valor, actualizado in filas.iterator(chunk_size=2000):
+        lote.append(Historial(serie_id=pk, indicador_id=ind, anio=anio, es_programado=prog, tipo='A',
+                              valor_centesimos=None if valor is None else int((valor * Decimal(100)).to_integral_value()),
+                              momento=actualizado))
+        if len(lote) >= 2000:
+            Historial.objects.using(alias).bulk_create(lote)
+            lote = []
+    Historial.objects.using(alias).bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cis', '0003_versionplan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistorialSerie',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serie_id', models.BigIntegerField()),
+                ('indicador_id', models.BigIntegerField()),
+                ('anio', models.PositiveSmallIntegerField()),
+                ('es_programado', models.BooleanField()),
+                ('valor_centesimos', models.BigIntegerField(null=True)),
+                ('tipo', models.CharField(choices=[('A', 'Alta'), ('M', 'Cambio'), ('B', 'Baja')], max_length=1)),
+                ('momento', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Historial de serie',
+                'verbose_name_plural': 'Historial de series',
+                'indexes': [models.Index(fields=['serie_id', 'momento'], name='cis_hist_serie_mom'), models.Index(fields=['indicador_id', 'momento'], name='cis_hist_ind_mom'), models.Index(fields=['momento'], name='cis_hist_mom')],
+            },
+        ),
+        migrations.RunPython(sembrar_historial, migrations.RunPython.noop),
+    ]
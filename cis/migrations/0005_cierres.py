@@ -0,0 +1,71 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cis', '0004_historialserie'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnioCerrado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('anio', models.PositiveSmallIntegerField(unique=True)),
+                ('notas', models.CharField(blank=True, max_length=250)),
+            ],
+            options={
+                'verbose_name': 'Año cerrado',
+                'verbose_name_plural': 'Años cerrados',
+                'ordering': ['-anio'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CierreIndicador',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveSmallIntegerField()),
+                ('indicador_id', models.BigIntegerField()),
+                ('indicador_nombre', models.CharField(max_length=300)),
+                ('operacion_id', models.BigIntegerField()),
+                ('operacion_codigo', models.CharField(blank=True, max_length=20)),
+                ('accion_id', models.BigIntegerField()),
+                ('objetivo_id', models.BigIntegerField()),
+                ('area_org_id', models.BigIntegerField()),
+                ('area_org_nombre', models.CharField(max_length=180)),
+                ('programado', models.FloatField()),
+                ('ejecutado', models.FloatField()),
+                ('cumplimiento', models.FloatField()),
+            ],
+            options={
+                'verbose_name': 'Cierre por indicador',
+                'verbose_name_plural': 'Cierres por indicador',
+                'indexes': [models.Index(fields=['anio', 'operacion_codigo', 'indicador_nombre'], name='cis_cierreind_orden')],
+                'unique_together': {('anio', 'indicador_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CierreNivel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveSmallIntegerField()),
+                ('nivel', models.CharField(choices=[('area', 'Área organizacional'), ('objetivo', 'Objetivo estratégico'), ('accion', 'Acción estratégica'), ('operacion', 'Operación')], max_length=10)),
+                ('nodo_id', models.BigIntegerField()),
+                ('nombre', models.CharField(max_length=300)),
+                ('programado', models.FloatField()),
+                ('ejecutado', models.FloatField()),
+                ('prom_cumplimiento', models.FloatField()),
+                ('total_indicadores', models.PositiveIntegerField()),
+            ],
+            options={
+                'verbose_name': 'Cierre por nivel',
+                'verbose_name_plural': 'Cierres por nivel',
+                'unique_together': {('anio', 'nivel', 'nodo_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cis', '0005_cierres'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Eliminado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=60)),
+                ('objeto_id', models.BigIntegerField()),
+                ('momento', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Registro eliminado',
+                'verbose_name_plural': 'Registros eliminados',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='accionestrategica',
+            index=models.Index(fields=['actualizado', 'id'], name='cis_accion_sync'),
+        ),
+        migrations.AddIndex(
+            model_name='aniocerrado',
+            index=models.Index(fields=['actualizado', 'id'], name='cis_aniocerrado_sync'),
+        ),
+        migrations.AddIndex(
+            model_name='areaestrategica',
+            index=models.Index(fields=['actualizado', 'id'], name='cis_areaest_sync'),
+        ),
+        migrations.AddIndex(
+            model_name='areaorganizacional',
+            index=models.Index(fields=['actualizado', 'id'], name='cis_areaorg_sync'),
+        ),
+        migrations.AddIndex(
+            model_name='entidad',
+            index=models.Index(fields=['actualizado', 'id'], name='cis_entidad_sync'),
+        ),
+        migrations.AddIndex(
+            model_name='fuenteinformacion',
+            index=models.Index(fields=['actualizado', 'id'], name='cis_fuente_sync'),
+        ),
+        migrations.AddIndex(
+            model_name='indicador',
+            index=models.Index(fields=['actualizado', 'id'], name='cis_indicador_sync'),
+        ),
+        migrations.AddIndex(
+            model_name='objetivoestrategico',
+            index=models.Index(fields=['actualizado', 'id'], name='cis_objetivo_sync'),
+        ),
+        migrations.AddIndex(
+            model_name='operacion',
+            index=models.Index(fields=['actualizado', 'id'], name='cis_operacion_sync'),
+        ),
+        migrations.AddIndex(
+            model_name='serieindicador',
+            index=models.Index(fields=['actualizado', 'id'], name='cis_serie_sync'),
+        ),
+        migrations.AddIndex(
+            model_name='versionplan',
+            index=models.Index(fields=['actualizado', 'id'], name='cis_version_sync'),
+        ),
+        migrations.AddIndex(
+            model_name='eliminado',
+            index=models.Index(fields=['momento', 'id'], name='cis_eliminado_sync'),
+        ),
+    ]
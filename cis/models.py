@@ -10,9 +10,50 @@ class TimeStampedModel(models.Model):
     class Meta:
         abstract = True
 
+class VersionadoModel(TimeStampedModel):
+    """
+    Concurrencia optimista con ``actualizado`` como versión (ver cis/concurrencia.py):
+    el UPDATE solo aplica si la fila sigue en ``version_esperada``.
+    """
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        obj = super().from_db(db, field_names, values)
+        obj.version_esperada = obj.__dict__.get("actualizado")
+        return obj
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.version_esperada = self.__dict__.get("actualizado")
+
+    def save(self, *args, **kwargs):
+        campos = kwargs.get("update_fields")
+        if campos is not None and "actualizado" not in campos:  # la versión avanza en todo guardado
+            kwargs["update_fields"] = [*campos, "actualizado"]
+        super().save(*args, **kwargs)
+
+    def _save_table(self, *args, **kwargs):
+        resultado = super()._save_table(*args, **kwargs)
+        self.version_esperada = self.actualizado
+        return resultado
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        esperada = getattr(self, "version_esperada", None)
+        if esperada is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        if super()._do_update(base_qs.filter(actualizado=esperada), using, pk_val, values, update_fields,
+                              forced_update):
+            return True
+        from .concurrencia import Conflicto
+        raise Conflicto(self, base_qs.filter(pk=pk_val).values_list("actualizado", flat=True).first())
+
 class Entidad(TimeStampedModel):
     nombre = models.CharField(max_length=150, unique=True)
     sigla = models.CharField(max_length=20, blank=True)
+    class Meta:
+        indexes = [models.Index(fields=["actualizado", "id"], name="cis_entidad_sync")]
     def __str__(self): return self.nombre
 
 class AreaOrganizacional(TimeStampedModel):
@@ -21,7 +62,7 @@ class AreaOrganizacional(TimeStampedModel):
     responsable = models.CharField(max_length=120, blank=True)
     class Meta:
         unique_together = [("entidad", "nombre")]
-        indexes = [models.Index(fields=["entidad","nombre"])]
+        indexes = [models.Index(fields=["entidad","nombre"]), models.Index(fields=["actualizado", "id"], name="cis_areaorg_sync")]
         verbose_name = "Área organizacional"
         verbose_name_plural = "Áreas organizacionales"
     def __str__(self): return f"{self.nombre} ({self.entidad.sigla or self.entidad.nombre})"
@@ -29,6 +70,8 @@ class AreaOrganizacional(TimeStampedModel):
 class AreaEstrategica(TimeStampedModel):
     nombre = models.CharField(max_length=150, unique=True)
     descripcion = models.TextField(blank=True)
+    class Meta:
+        indexes = [models.Index(fields=["actualizado", "id"], name="cis_areaest_sync")]
     def __str__(self): return self.nombre
 
 class ObjetivoEstrategico(TimeStampedModel):
@@ -38,7 +81,7 @@ class ObjetivoEstrategico(TimeStampedModel):
     descripcion = models.TextField()
     class Meta:
         unique_together = [("area_org","codigo")]
-        indexes = [models.Index(fields=["area_org","codigo"])]
+        indexes = [models.Index(fields=["area_org","codigo"]), models.Index(fields=["actualizado", "id"], name="cis_objetivo_sync")]
         verbose_name = "Objetivo estratégico"
     def __str__(self): return f"{self.codigo or ''} {self.descripcion[:60]}"
 
@@ -48,7 +91,7 @@ class AccionEstrategica(TimeStampedModel):
     descripcion = models.TextField()  # “Incrementar el número de estudiantes…”
     class Meta:
         unique_together = [("objetivo","codigo")]
-        indexes = [models.Index(fields=["objetivo","codigo"])]
+        indexes = [models.Index(fields=["objetivo","codigo"]), models.Index(fields=["actualizado", "id"], name="cis_accion_sync")]
         verbose_name = "Acción estratégica (producto)"
     def __str__(self): return f"{self.codigo or ''} {self.descripcion[:60]}"
 
@@ -58,13 +101,15 @@ class Operacion(TimeStampedModel):
     descripcion = models.TextField()  # “Difundir a través de los medios…”
     class Meta:
         unique_together = [("accion","codigo")]
-        indexes = [models.Index(fields=["accion","codigo"])]
+        indexes = [models.Index(fields=["accion","codigo"]), models.Index(fields=["actualizado", "id"], name="cis_operacion_sync")]
         verbose_name = "Operación"
     def __str__(self): return f"Op.{self.codigo or '-'} - {self.descripcion[:60]}"
 
 class FuenteInformacion(TimeStampedModel):
     nombre = models.CharField(max_length=200, unique=True)
     descripcion = models.TextField(blank=True)
+    class Meta:
+        indexes = [models.Index(fields=["actualizado", "id"], name="cis_fuente_sync")]
     def __str__(self): return self.nombre
 
 class TipoIndicador(models.TextChoices):
@@ -81,7 +126,7 @@ class UnidadMedida(models.TextChoices):
     PORCENTAJE = "PCT", "Porcentaje"
     TEXTO = "TXT", "Texto"
 
-class Indicador(TimeStampedModel):
+class Indicador(VersionadoModel):
     operacion = models.ForeignKey(Operacion, on_delete=models.CASCADE, related_name="indicadores")
     codigo = models.CharField(max_length=30, blank=True)  # si manejas un código interno del indicador
     nombre = models.CharField(max_length=300)  # “Nº de matriculados…”, “Tasa de eficacia…”
@@ -97,7 +142,7 @@ class Indicador(TimeStampedModel):
 
     class Meta:
         unique_together = [("operacion","nombre")]
-        indexes = [models.Index(fields=["operacion","nombre"]), models.Index(fields=["tipo","unidad"])]
+        indexes = [models.Index(fields=["operacion","nombre"]), models.Index(fields=["tipo","unidad"]), models.Index(fields=["actualizado", "id"], name="cis_indicador_sync")]
         verbose_name = "Indicador"
     def __str__(self): return self.nombre
 
@@ -105,7 +150,13 @@ class Indicador(TimeStampedModel):
     def es_porcentaje(self) -> bool:
         return self.unidad == UnidadMedida.PORCENTAJE
 
-class SerieIndicador(TimeStampedModel):
+    @property
+    def formula(self):
+        """Fórmula de cumplimiento compilada (cacheada por texto, ver cis/formulas.py)."""
+        from . import formulas
+        return formulas.de_texto(self.formula_texto)
+
+class SerieIndicador(VersionadoModel):
     """Programación física y/o ejecución por año."""
     indicador = models.ForeignKey(Indicador, on_delete=models.CASCADE, related_name="series")
     anio = models.PositiveSmallIntegerField()
@@ -115,14 +166,200 @@ class SerieIndicador(TimeStampedModel):
 
     class Meta:
         unique_together = [("indicador","anio","es_programado")]
-        indexes = [models.Index(fields=["indicador","anio"])]
+        indexes = [models.Index(fields=["indicador","anio"]), models.Index(fields=["actualizado", "id"], name="cis_serie_sync")]
         ordering = ["indicador","anio"]
         verbose_name = "Serie anual de indicador"
     def __str__(self): return f"{self.indicador.nombre[:40]} - {self.anio} ({'Prog' if self.es_programado else 'Ejec'})"
 
+    # Historial (cis/historial.py): se anota un cambio solo si estos campos cambian
+    CAMPOS_HISTORIAL = ("indicador_id", "anio", "es_programado", "valor")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        obj = super().from_db(db, field_names, values)
+        obj._original = tuple(obj.__dict__.get(c) for c in cls.CAMPOS_HISTORIAL)
+        return obj
+
+    def anios_tocados(self):
+        """Año actual y, si se está moviendo, el año con que se cargó."""
+        anios = {self.anio}
+        if getattr(self, "_original", None):
+            anios.add(self._original[1])
+        return anios - {None}
+
+    def verificar_anio_abierto(self):
+        cerrados = sorted(AnioCerrado.objects.filter(anio__in=self.anios_tocados()).values_list("anio", flat=True))
+        if cerrados:
+            from django.core.exceptions import ValidationError
+            raise ValidationError(f"El año {cerrados[0]} está cerrado; sus series no se pueden modificar.")
+
+    def save(self, *args, **kwargs):
+        from . import historial
+        self.verificar_anio_abierto()
+        nuevo = self._state.adding
+        super().save(*args, **kwargs)
+        actual = tuple(getattr(self, c) for c in self.CAMPOS_HISTORIAL)
+        if nuevo or actual != getattr(self, "_original", None):
+            historial.registrar([historial.fila(self, HistorialSerie.ALTA if nuevo else HistorialSerie.CAMBIO)])
+        self._original = actual
+
+    def delete(self, *args, **kwargs):
+        from . import historial
+        self.verificar_anio_abierto()
+        fila = historial.fila(self, HistorialSerie.BAJA)
+        resultado = super().delete(*args, **kwargs)
+        historial.registrar([fila])
+        return resultado
+
     def clean(self):
+        self.verificar_anio_abierto()
         # Si el indicador es % limitar lógicamente 0..100
         if self.indicador and self.indicador.unidad == UnidadMedida.PORCENTAJE and self.valor is not None:
             if self.valor < 0 or self.valor > 100:
                 from django.core.exceptions import ValidationError
                 raise ValidationError("Para indicadores en %, el valor debe estar entre 0 y 100.")
+
+class HistorialSerie(models.Model):
+    """
+    Bitácora solo-anexar de valores de ``SerieIndicador`` (ver cis/historial.py).
+    Filas compactas: ids sin FK (sobreviven al borrado), año smallint y valor
+    como entero escalado (centésimos, igual que ``DECIMALS``).
+    """
+    ALTA, CAMBIO, BAJA = "A", "M", "B"
+    TIPOS = [(ALTA, "Alta"), (CAMBIO, "Cambio"), (BAJA, "Baja")]
+
+    serie_id = models.BigIntegerField()
+    indicador_id = models.BigIntegerField()
+    anio = models.PositiveSmallIntegerField()
+    es_programado = models.BooleanField()
+    valor_centesimos = models.BigIntegerField(null=True)
+    tipo = models.CharField(max_length=1, choices=TIPOS)
+    momento = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["serie_id", "momento"], name="cis_hist_serie_mom"),
+            models.Index(fields=["indicador_id", "momento"], name="cis_hist_ind_mom"),
+            models.Index(fields=["momento"], name="cis_hist_mom"),
+        ]
+        verbose_name = "Historial de serie"
+        verbose_name_plural = "Historial de series"
+    def __str__(self): return f"serie {self.serie_id} {self.anio} {self.get_tipo_display()} @ {self.momento:%Y-%m-%d %H:%M}"
+
+class AnioCerrado(TimeStampedModel):
+    """Año de planificación cerrado: sus cifras salen de las instantáneas (cis/cierres.py)."""
+    anio = models.PositiveSmallIntegerField(unique=True)
+    notas = models.CharField(max_length=250, blank=True)
+
+    class Meta:
+        ordering = ["-anio"]
+        indexes = [models.Index(fields=["actualizado", "id"], name="cis_aniocerrado_sync")]
+        verbose_name = "Año cerrado"
+        verbose_name_plural = "Años cerrados"
+    def __str__(self): return str(self.anio)
+
+class CierreIndicador(models.Model):
+    """
+    Cumplimiento de un indicador en un año cerrado. Inmutable y desnormalizado
+    (ids sin FK y nombres copiados) para que no cambie si luego se edita o borra la jerarquía.
+    """
+    anio = models.PositiveSmallIntegerField()
+    indicador_id = models.BigIntegerField()
+    indicador_nombre = models.CharField(max_length=300)
+    operacion_id = models.BigIntegerField()
+    operacion_codigo = models.CharField(max_length=20, blank=True)
+    accion_id = models.BigIntegerField()
+    objetivo_id = models.BigIntegerField()
+    area_org_id = models.BigIntegerField()
+    area_org_nombre = models.CharField(max_length=180)
+    programado = models.FloatField()
+    ejecutado = models.FloatField()
+    cumplimiento = models.FloatField()
+
+    class Meta:
+        unique_together = [("anio", "indicador_id")]
+        indexes = [models.Index(fields=["anio", "operacion_codigo", "indicador_nombre"], name="cis_cierreind_orden")]
+        verbose_name = "Cierre por indicador"
+        verbose_name_plural = "Cierres por indicador"
+    def __str__(self): return f"{self.anio} · {self.indicador_nombre[:60]}"
+
+class NivelCierre(models.TextChoices):
+    AREA = "area", "Área organizacional"
+    OBJETIVO = "objetivo", "Objetivo estratégico"
+    ACCION = "accion", "Acción estratégica"
+    OPERACION = "operacion", "Operación"
+
+class CierreNivel(models.Model):
+    """Cumplimiento agregado de un nodo de la jerarquía en un año cerrado."""
+    anio = models.PositiveSmallIntegerField()
+    nivel = models.CharField(max_length=10, choices=NivelCierre.choices)
+    nodo_id = models.BigIntegerField()
+    nombre = models.CharField(max_length=300)
+    programado = models.FloatField()
+    ejecutado = models.FloatField()
+    prom_cumplimiento = models.FloatField()
+    total_indicadores = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = [("anio", "nivel", "nodo_id")]
+        verbose_name = "Cierre por nivel"
+        verbose_name_plural = "Cierres por nivel"
+    def __str__(self): return f"{self.anio} · {self.get_nivel_display()} · {self.nombre[:60]}"
+
+class EstadoTarea(models.TextChoices):
+    PENDIENTE = "PEND", "Pendiente"
+    EN_CURSO = "CURS", "En curso"
+    TERMINADA = "OK", "Terminada"
+    ERROR = "ERR", "Error"
+
+class Tarea(TimeStampedModel):
+    """Trabajo en segundo plano (cola local en BD, ver cis/tareas.py)."""
+    tipo = models.CharField(max_length=60)
+    parametros = models.JSONField(default=dict, blank=True)
+    shard = models.CharField(max_length=40, blank=True)  # shard activo al encolar
+    estado = models.CharField(max_length=4, choices=EstadoTarea.choices, default=EstadoTarea.PENDIENTE)
+    progreso = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    mensaje = models.CharField(max_length=250, blank=True)
+    archivo = models.CharField(max_length=300, blank=True)  # relativo a CIS_TAREAS_DIR
+    iniciada = models.DateTimeField(null=True, blank=True)
+    terminada = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["estado","id"])]
+        ordering = ["-id"]
+        verbose_name = "Tarea en segundo plano"
+    def __str__(self): return f"#{self.pk} {self.tipo} ({self.get_estado_display()})"
+
+    @property
+    def porcentaje(self) -> int:
+        if self.estado == EstadoTarea.TERMINADA:
+            return 100
+        return int(100 * self.progreso / self.total) if self.total else 0
+
+class VersionPlan(TimeStampedModel):
+    """Versión de un plan (PEI): cada versión es dueña de su propio árbol de área."""
+    nombre = models.CharField(max_length=120)
+    area_org = models.OneToOneField(AreaOrganizacional, on_delete=models.CASCADE, related_name="version")
+    base = models.ForeignKey("self", on_delete=models.SET_NULL, null=True, blank=True, related_name="derivadas")
+    desplazamiento_anios = models.SmallIntegerField(default=0)  # respecto de la base al clonar
+    notas = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [models.Index(fields=["actualizado", "id"], name="cis_version_sync")]
+        verbose_name = "Versión de plan"
+        verbose_name_plural = "Versiones de plan"
+    def __str__(self): return f"{self.nombre} · {self.area_org.nombre}"
+
+class Eliminado(models.Model):
+    """Lápida de un registro borrado, para el feed de cambios (cis/sincronizacion.py)."""
+    modelo = models.CharField(max_length=60)  # label_lower, p. ej. "cis.indicador"
+    objeto_id = models.BigIntegerField()
+    momento = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["momento", "id"], name="cis_eliminado_sync")]
+        verbose_name = "Registro eliminado"
+        verbose_name_plural = "Registros eliminados"
+    def __str__(self): return f"{self.modelo} #{self.objeto_id} @ {self.momento:%Y-%m-%d %H:%M}"
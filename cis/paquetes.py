@@ -0,0 +1,130 @@
+# planificacion/paquetes.py
+"""
+Paquetes de reporte de cumplimiento por área para el cierre de periodo.
+
+``generar`` lee las filas del reporte una sola vez (``filas_cumplimiento``,
+que ya combina años cerrados y en vivo) y las reparte por área en memoria;
+después cada área se renderiza (HTML, CSV, XLSX) en un ``ProcessPoolExecutor``.
+Los procesos no tocan la base: reciben las filas ya calculadas y solo
+escriben archivos, así que escalan con los núcleos sin competir por SQLite.
+
+Deja en ``salida`` un directorio por área y un ``index.html`` (y
+``index.json``) con los archivos y lo que tardó cada una.
+"""
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.db import connections
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import reportes
+from .models import AreaOrganizacional
+
+FORMATOS = ("html", "csv", "xlsx")
+ENCABEZADOS = ["Año", "Operación", "Indicador", "Programado", "Ejecutado", "% Cumplido"]
+_AREA = "indicador__operacion__accion__objetivo__area_org_id"
+
+
+def datos_por_area(anio=None):
+    """[{"id", "nombre", "carpeta", "filas"}] de todas las áreas, con una sola lectura del reporte."""
+    areas = {a.pk: {"id": a.pk, "nombre": str(a), "carpeta": f"{a.pk:04d}-{slugify(a.nombre)[:60]}", "filas": []}
+             for a in AreaOrganizacional.objects.select_related("entidad").order_by("entidad__sigla", "nombre")}
+    for r in reportes.filas_cumplimiento(anio).iterator(chunk_size=2000):
+        area = areas.get(r[_AREA])
+        if area is not None:
+            area["filas"].append({
+                "anio": r["anio"], "operacion": r["indicador__operacion__codigo"], "indicador": r["indicador__nombre"],
+                "programado": r["programado"], "ejecutado": r["ejecutado"], "cumplimiento": r["cumplimiento"]})
+    return list(areas.values())
+
+
+def _resumen(filas):
+    con_prog = [float(f["cumplimiento"]) for f in filas if f["programado"] > 0]
+    return {"registros": len(filas), "con_programacion": len(con_prog),
+            "prom_cumplimiento": round(sum(con_prog) / len(con_prog), 2) if con_prog else 0.0}
+
+
+def _iniciar_proceso():
+    # con "spawn"/"forkserver" el proceso hijo arranca sin Django configurado
+    import django
+    django.setup()
+
+
+def generar_area(area, salida, formatos, anio, generado):
+    """Corre en un proceso del pool: escribe los archivos de un área. Devuelve (área, archivos, segundos)."""
+    from django.template.loader import render_to_string
+    from . import xlsx
+
+    t0 = time.perf_counter()
+    carpeta = os.path.join(salida, area["carpeta"])
+    os.makedirs(carpeta, exist_ok=True)
+    filas = area["filas"]
+    valores = [[f["anio"], f["operacion"], f["indicador"], round(float(f["programado"]), 2),
+                round(float(f["ejecutado"]), 2), round(float(f["cumplimiento"]), 2)] for f in filas]
+    archivos = []
+    if "html" in formatos:
+        html = render_to_string("planificacion/paquete_area.html", {
+            "area": area, "filas": filas, "resumen": _resumen(filas), "anio": anio, "generado": generado})
+        archivos.append(_escribir(carpeta, "cumplimiento.html", html))
+    if "csv" in formatos:
+        ruta = os.path.join(carpeta, "cumplimiento.csv")
+        with open(ruta, "w", newline="", encoding="utf-8") as fh:
+            w = csv.writer(fh)
+            w.writerow(ENCABEZADOS)
+            w.writerows(valores)
+        archivos.append(ruta)
+    if "xlsx" in formatos:
+        ruta = os.path.join(carpeta, "cumplimiento.xlsx")
+        xlsx.escribir(ruta, ENCABEZADOS, valores, hoja="Cumplimiento")
+        archivos.append(ruta)
+    return area["id"], [os.path.relpath(a, salida) for a in archivos], time.perf_counter() - t0
+
+
+def _escribir(carpeta, nombre, texto):
+    ruta = os.path.join(carpeta, nombre)
+    with open(ruta, "w", encoding="utf-8") as fh:
+        fh.write(texto)
+    return ruta
+
+
+def generar(salida, anio=None, formatos=FORMATOS, procesos=None, al_terminar=None):
+    """
+    Genera los paquetes en ``salida``. ``al_terminar(area, archivos, segundos)``
+    se llama a medida que cada área termina. Devuelve (resultados, segundos de
+    la lectura, segundos totales).
+    """
+    from django.template.loader import render_to_string
+
+    t0 = time.perf_counter()
+    areas = datos_por_area(anio)
+    lectura = time.perf_counter() - t0
+    generado = timezone.now()
+    os.makedirs(salida, exist_ok=True)
+    # los hijos heredan el proceso: que no hereden también conexiones abiertas
+    connections.close_all()
+
+    por_id = {a["id"]: a for a in areas}
+    resultados = []
+    with ProcessPoolExecutor(max_workers=procesos or os.cpu_count(), initializer=_iniciar_proceso) as pool:
+        futuros = [pool.submit(generar_area, a, salida, formatos, anio, generado) for a in areas]
+        for futuro in as_completed(futuros):
+            area_id, archivos, segundos = futuro.result()
+            area = por_id[area_id]
+            resultados.append({"area": area["nombre"], "carpeta": area["carpeta"], "archivos": archivos,
+                               "segundos": round(segundos, 3), **_resumen(area["filas"])})
+            if al_terminar:
+                al_terminar(area, archivos, segundos)
+
+    resultados.sort(key=lambda r: r["carpeta"])
+    total = time.perf_counter() - t0
+    _escribir(salida, "index.html", render_to_string("planificacion/paquete_indice.html", {
+        "resultados": resultados, "anio": anio, "generado": generado, "lectura": lectura, "total": total,
+        "procesos": procesos or os.cpu_count()}))
+    _escribir(salida, "index.json", json.dumps({
+        "anio": anio, "generado": generado.isoformat(), "segundos_lectura": round(lectura, 3),
+        "segundos_total": round(total, 3), "areas": resultados}, ensure_ascii=False, indent=1))
+    return resultados, lectura, total
@@ -0,0 +1,315 @@
+# planificacion/reportes.py
+"""
+Consultas agregadas del panel y del reporte de cumplimiento.
+
+Cada agregado es una función independiente. La vista asíncrona (ASGI) arma
+el mismo contexto que la síncrona, pero en un hilo del pool de consultas
+(``en_hilo``) para no bloquear el event loop. No se lanzan en paralelo: son
+consultas cortas y el trabajo es sobre todo Python (con el GIL), así que
+repartirlas en hilos solo sumaba saltos entre hilos.
+
+Los años cerrados (``AnioCerrado``) se leen de las instantáneas
+``CierreIndicador``/``CierreNivel``; solo los años abiertos se agregan en vivo
+sobre ``SerieIndicador``. El % de cumplimiento por indicador sale de la
+fórmula de cada indicador (cis/formulas.py), evaluada por bloques.
+"""
+import heapq
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from . import formulas, sharding
+from .models import (AnioCerrado, AreaOrganizacional, CierreIndicador, CierreNivel, Indicador, NivelCierre,
+                     SerieIndicador)
+
+
+def suma_prog_ejec():
+    """Anotaciones programado/ejecutado (todo a FloatField)."""
+    return dict(
+        programado=Coalesce(
+            Sum(Case(When(es_programado=True, then=F("valor")), default=Value(0), output_field=FloatField())),
+            Value(0.0), output_field=FloatField()
+        ),
+        ejecutado=Coalesce(
+            Sum(Case(When(es_programado=False, then=F("valor")), default=Value(0), output_field=FloatField())),
+            Value(0.0), output_field=FloatField()
+        ),
+    )
+
+
+# ---------- Panel principal ----------
+def total_indicadores():
+    return Indicador.objects.count()
+
+
+def con_ejecucion():
+    return (Indicador.objects
+            .filter(series__es_programado=False, series__valor__isnull=False)
+            .distinct().count())
+
+
+def sin_programacion():
+    return Indicador.objects.exclude(series__es_programado=True).distinct().count()
+
+
+def anios_cerrados():
+    return set(AnioCerrado.objects.values_list("anio", flat=True))
+
+
+def series_abiertas(cerrados=None):
+    cerrados = anios_cerrados() if cerrados is None else cerrados
+    qs = SerieIndicador.objects.all()
+    return qs.exclude(anio__in=cerrados) if cerrados else qs
+
+
+def _sumas_cierre():
+    return dict(programado=Coalesce(Sum("programado"), Value(0.0)), ejecutado=Coalesce(Sum("ejecutado"), Value(0.0)))
+
+
+def por_anio():
+    cerrados = anios_cerrados()
+    vivos = list(series_abiertas(cerrados).values("anio").annotate(**suma_prog_ejec()).order_by("anio"))
+    if not cerrados:
+        return vivos
+    congelados = list(CierreIndicador.objects.values("anio").annotate(**_sumas_cierre()).order_by("anio"))
+    return sorted(vivos + congelados, key=lambda r: r["anio"])
+
+
+def dist_tipo():
+    return list(Indicador.objects.values("tipo").annotate(total=Count("id")).order_by("tipo"))
+
+
+def avance_promedio():
+    cerrados = anios_cerrados()
+    tot = series_abiertas(cerrados).aggregate(**suma_prog_ejec())
+    if cerrados:
+        congelado = CierreIndicador.objects.aggregate(**_sumas_cierre())
+        tot = {k: tot[k] + congelado[k] for k in tot}
+    if tot["programado"] > 0:
+        return round((tot["ejecutado"] / tot["programado"]) * 100, 2)
+    return 0.0
+
+
+def ultimo_anio():
+    return SerieIndicador.objects.order_by("-anio").values_list("anio", flat=True).first()
+
+
+def cumplimiento_area(ultimo=None):
+    """Promedio del % de cumplimiento por área para el año ``ultimo``."""
+    if ultimo is None:
+        ultimo = ultimo_anio()
+    if not ultimo:
+        return []
+    if AnioCerrado.objects.filter(anio=ultimo).exists():
+        return list(CierreNivel.objects.filter(anio=ultimo, nivel=NivelCierre.AREA)
+                    .values("prom_cumplimiento", "total_indicadores", area_id=F("nodo_id"), area=F("nombre"))
+                    .order_by("id"))
+    return cumplimiento_area_vivo(ultimo)
+
+
+def cumplimiento_area_vivo(ultimo):
+    # una sola consulta (indicador, año) con el área de cada indicador
+    valores = defaultdict(list)
+    filas = ConFormula(SerieIndicador.objects
+                       .filter(anio=ultimo)
+                       .values("indicador__operacion__accion__objetivo__area_org_id", "indicador_id",
+                               *formulas.CAMPOS_INDICADOR)
+                       .annotate(**suma_prog_ejec()))
+    for r in filas:
+        if r["programado"] > 0:
+            valores[r["indicador__operacion__accion__objetivo__area_org_id"]].append(r["cumplimiento"])
+
+    areas = (AreaOrganizacional.objects
+             .select_related("entidad")
+             .annotate(total_ind=Count("objetivos__acciones__operaciones__indicadores", distinct=True))
+             .order_by("entidad__sigla", "nombre"))
+    res = []
+    for area in areas:
+        vals = valores.get(area.id, [])
+        res.append({
+            "area_id": area.id,
+            "area": f"{area.nombre} ({area.entidad.sigla or area.entidad.nombre})",
+            "prom_cumplimiento": round(sum(vals) / len(vals), 2) if vals else 0.0,
+            "total_indicadores": area.total_ind,
+        })
+    return res
+
+
+AGREGADOS_DASHBOARD = {
+    "total_indicadores": total_indicadores,
+    "con_ejecucion": con_ejecucion,
+    "sin_programacion": sin_programacion,
+    "avance_promedio": avance_promedio,
+    "por_anio": por_anio,
+    "dist_tipo": dist_tipo,
+    "ultimo_anio": ultimo_anio,
+    "cumplimiento_area": cumplimiento_area,
+}
+
+
+def contexto_dashboard(ultimo=None):
+    ctx = {k: fn() for k, fn in AGREGADOS_DASHBOARD.items() if k not in ("ultimo_anio", "cumplimiento_area")}
+    ctx["ultimo_anio"] = ultimo_anio() if ultimo is None else ultimo
+    ctx["cumplimiento_area"] = cumplimiento_area(ctx["ultimo_anio"])
+    return ctx
+
+
+# ---------- Panel consolidado entre shards ----------
+def contexto_dashboard_consolidado():
+    """
+    Panel con shards configurados y ninguno elegido: el panel de cada shard
+    (``sharding.fan_out``) combinado con ``combinar_dashboard``. El último año
+    es el global, para que todas las áreas se midan en el mismo año.
+    """
+    ultimo = max((u for _, u in sharding.fan_out(ultimo_anio) if u), default=None)
+    return combinar_dashboard([ctx for _, ctx in sharding.fan_out(lambda: contexto_dashboard(ultimo))], ultimo)
+
+
+def combinar_dashboard(partes, ultimo):
+    """
+    Suma conteos, años y tipos; las áreas son de un solo shard y se
+    concatenan. ``avance_promedio`` se recalcula desde ``por_anio``, que
+    cubre las mismas series (en vivo y cerradas).
+    """
+    anios = defaultdict(lambda: {"programado": 0.0, "ejecutado": 0.0})
+    tipos = defaultdict(int)
+    for p in partes:
+        for r in p["por_anio"]:
+            anios[r["anio"]]["programado"] += r["programado"]
+            anios[r["anio"]]["ejecutado"] += r["ejecutado"]
+        for r in p["dist_tipo"]:
+            tipos[r["tipo"]] += r["total"]
+    programado = sum(a["programado"] for a in anios.values())
+    ejecutado = sum(a["ejecutado"] for a in anios.values())
+    return {
+        "total_indicadores": sum(p["total_indicadores"] for p in partes),
+        "con_ejecucion": sum(p["con_ejecucion"] for p in partes),
+        "sin_programacion": sum(p["sin_programacion"] for p in partes),
+        "avance_promedio": round(ejecutado / programado * 100, 2) if programado > 0 else 0.0,
+        "por_anio": [{"anio": anio, **anios[anio]} for anio in sorted(anios)],
+        "dist_tipo": [{"tipo": t, "total": tipos[t]} for t in sorted(tipos)],
+        "ultimo_anio": ultimo,
+        "cumplimiento_area": [fila for p in partes for fila in p["cumplimiento_area"]],
+    }
+
+
+# ---------- Reporte de cumplimiento ----------
+ORDEN_CUMPLIMIENTO = ("anio", "indicador__operacion__codigo", "indicador__nombre")
+
+
+def filas_cumplimiento(anio=None):
+    """
+    Filas del reporte: de la instantánea si ``anio`` está cerrado, en vivo si no.
+    Sin año mezcla ambas fuentes ya ordenadas (ver ``FilasCombinadas``).
+    """
+    cerrados = anios_cerrados()
+    if anio:
+        return filas_cierre(anio) if anio in cerrados else filas_cumplimiento_vivo(anio)
+    if not cerrados:
+        return filas_cumplimiento_vivo()
+    return FilasCombinadas(filas_cierre(), filas_cumplimiento_vivo(excluir_anios=cerrados))
+
+
+def filas_cierre(anio=None):
+    """Mismas claves que ``filas_cumplimiento_vivo``, leídas de ``CierreIndicador``."""
+    qs = (CierreIndicador.objects
+          .values("indicador_id", "anio", "programado", "ejecutado", "cumplimiento",
+                  indicador__nombre=F("indicador_nombre"),
+                  indicador__operacion__codigo=F("operacion_codigo"),
+                  indicador__operacion__accion__objetivo__area_org_id=F("area_org_id"),
+                  indicador__operacion__accion__objetivo__area_org__nombre=F("area_org_nombre"))
+          .order_by("anio", "operacion_codigo", "indicador_nombre"))
+    return qs.filter(anio=anio) if anio else qs
+
+
+class FilasCombinadas:
+    """Une dos querysets ordenados por ``ORDEN_CUMPLIMIENTO`` sin cargarlos completos."""
+
+    def __init__(self, *partes):
+        self.partes = partes
+
+    def count(self):
+        return sum(p.count() for p in self.partes)
+
+    def iterator(self, chunk_size=2000):
+        clave = lambda r: tuple(r[k] for k in ORDEN_CUMPLIMIENTO)
+        return heapq.merge(*(p.iterator(chunk_size=chunk_size) for p in self.partes), key=clave)
+
+    def __iter__(self):
+        return self.iterator()
+
+    def __len__(self):
+        return self.count()
+
+
+class ConFormula:
+    """
+    Filas values() por indicador con ``cumplimiento`` según la fórmula de cada
+    indicador (cis/formulas.py). Se evalúa por bloques de ``chunk_size`` filas,
+    una vez por fórmula distinta en el bloque, no fila por fila.
+    """
+
+    def __init__(self, qs):
+        self.qs = qs
+
+    def count(self):
+        return self.qs.count()
+
+    def iterator(self, chunk_size=2000):
+        filas = self.qs.iterator(chunk_size=chunk_size)
+        while bloque := list(islice(filas, chunk_size)):
+            yield from formulas.aplicar(bloque)
+
+    def __iter__(self):
+        return self.iterator()
+
+    def __len__(self):
+        return self.count()
+
+
+def filas_cumplimiento_vivo(anio=None, excluir_anios=()):
+    qs = (
+        SerieIndicador.objects
+        .values(
+            "indicador_id",
+            "indicador__nombre",
+            "anio",
+            "indicador__operacion__codigo",
+            "indicador__operacion__accion__objetivo__area_org_id",
+            "indicador__operacion__accion__objetivo__area_org__nombre",
+            *formulas.CAMPOS_INDICADOR,
+        )
+        .annotate(**suma_prog_ejec())
+        .order_by(*ORDEN_CUMPLIMIENTO)
+    )
+    if anio:
+        qs = qs.filter(anio=anio)
+    if excluir_anios:
+        qs = qs.exclude(anio__in=excluir_anios)
+    return ConFormula(qs)
+
+
+# ---------- Ejecución concurrente (ASGI) ----------
+# Hilos fijos: cada uno abre su conexión una vez y la reutiliza entre requests
+# (abrir y cerrar una conexión SQLite por llamada costaba más que la consulta).
+_pool = ThreadPoolExecutor(thread_name_prefix="cis-consultas")
+
+
+def _con_conexion_vigente(fn):
+    def inner(*args):
+        # sin CONN_MAX_AGE: solo se reabre si un error dejó la conexión inservible
+        for conn in connections.all(initialized_only=True):
+            if conn.connection is not None and conn.errors_occurred and not conn.is_usable():
+                conn.close()
+        return fn(*args)
+    return inner
+
+
+def en_hilo(fn, *args):
+    """Corre una consulta síncrona fuera del hilo del event loop (awaitable)."""
+    return sync_to_async(_con_conexion_vigente(fn), thread_sensitive=False, executor=_pool)(*args)
@@ -0,0 +1,143 @@
+# planificacion/sharding.py
+"""
+Sharding opcional por Entidad.
+
+Cada clave listada en ``settings.CIS_SHARDS`` tiene su propia base de datos
+(alias ``shard_<clave>``) con la jerarquía y las series de esa entidad.
+El shard activo se guarda en un ContextVar que fija ``ShardMiddleware``
+a partir del prefijo ``/s/<clave>/`` de la URL o de la sesión.
+Sin shards configurados todo sigue usando ``default``.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.urls import get_script_prefix, set_script_prefix
+
+SESSION_KEY = "cis_shard"
+_shard_actual = ContextVar("cis_shard", default=None)
+_prefijo_re = re.compile(r"^/s/(?P<clave>[\w-]+)(?P<resto>/.*)$")
+
+# Modelos de la app que NO se reparten (viven siempre en default)
+MODELOS_GLOBALES = {"tarea"}
+
+
+def shards():
+    return list(getattr(settings, "CIS_SHARDS", []))
+
+
+def shard_alias(clave):
+    return f"shard_{clave}"
+
+
+def shard_actual():
+    return _shard_actual.get()
+
+
+@contextmanager
+def usar_shard(clave):
+    """Fija el shard activo dentro del bloque (None = base default)."""
+    token = _shard_actual.set(clave)
+    try:
+        yield
+    finally:
+        _shard_actual.reset(token)
+
+
+def iterar_en_shard(clave, iterable):
+    """
+    Recorre ``iterable`` con ``clave`` activo en cada paso. Para cuerpos de
+    ``StreamingHttpResponse``: se consumen después de que ``ShardMiddleware``
+    ya salió de su ``usar_shard``.
+    """
+    iterador = iter(iterable)
+    while True:
+        with usar_shard(clave):
+            try:
+                trozo = next(iterador)
+            except StopIteration:
+                return
+        yield trozo
+
+
+def _en_shard(clave, fn):
+    with usar_shard(clave):
+        try:
+            return clave, fn()
+        finally:
+            # la conexión es local al hilo del pool; no la dejamos abierta
+            connections[shard_alias(clave)].close()
+
+
+def fan_out(fn):
+    """
+    Ejecuta ``fn()`` en cada shard (en paralelo) y devuelve [(clave, resultado), …]
+    en el orden de ``CIS_SHARDS``.
+    """
+    claves = shards()
+    if not claves:
+        return [(None, fn())]
+    with ThreadPoolExecutor(max_workers=len(claves)) as pool:
+        return list(pool.map(lambda c: _en_shard(c, fn), claves))
+
+
+class EntidadShardRouter:
+    """Envía los modelos de planificación al shard activo."""
+
+    def _db(self, model, **hints):
+        if model._meta.app_label != "cis" or model._meta.model_name in MODELOS_GLOBALES:
+            return None
+        clave = shard_actual()
+        return shard_alias(clave) if clave else None
+
+    db_for_read = _db
+    db_for_write = _db
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if obj1._state.db and obj2._state.db:
+            return obj1._state.db == obj2._state.db
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db.startswith("shard_"):
+            return app_label == "cis" and model_name not in MODELOS_GLOBALES
+        return None
+
+
+class ShardMiddleware:
+    """
+    Elige el shard del request:
+      - /s/<clave>/… → se recorta el prefijo y reverse() lo conserva;
+      - ?shard=<clave> → se guarda en sesión (``?shard=`` vacío la limpia);
+      - en otro caso, lo que haya en la sesión.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        claves = shards()
+        if not claves:
+            request.shard = None
+            return self.get_response(request)
+
+        clave = None
+        m = _prefijo_re.match(request.path_info)
+        if m and m["clave"] in claves:
+            clave = m["clave"]
+            request.path_info = m["resto"]
+            set_script_prefix(f"{get_script_prefix()}s/{clave}/")
+        elif "shard" in request.GET:
+            clave = request.GET["shard"] if request.GET["shard"] in claves else None
+            request.session[SESSION_KEY] = clave
+        else:
+            clave = request.session.get(SESSION_KEY)
+            if clave not in claves:
+                clave = None
+
+        request.shard = clave
+        with usar_shard(clave):
+            return self.get_response(request)
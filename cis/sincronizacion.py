@@ -0,0 +1,201 @@
+# planificacion/sincronizacion.py
+"""
+Feed de cambios incremental para BI y oficinas: todo lo creado o modificado
+en los modelos de planificación desde un cursor, más lápidas de lo borrado.
+
+    pagina = cambios(cursor=None, desde=None, limite=1000)
+    pagina["cambios"]  # [{"modelo", "id", "accion", "actualizado", "datos"}]
+    pagina["cursor"]   # se pasa tal cual en la siguiente llamada
+    pagina["hay_mas"]  # True → pedir de nuevo ya mismo
+
+El orden global es (actualizado, modelo, id). Cada modelo se recorre por su
+índice (actualizado, id) con paginación por clave, en dos pasos: primero solo
+las claves (el índice las cubre) para elegir las ``limite`` siguientes entre
+todos los modelos, y luego las filas completas de esas claves por pk.
+
+Los borrados dejan una fila en ``Eliminado``: ``Model.delete()`` y las
+cascadas del ``Collector`` vía ``post_delete`` (conectado en ``CisConfig``),
+y los borrados masivos de cis/borrado.py con ``registrar_bajas``.
+
+Solo se entregan cambios hasta ``ahora - HOLGURA``: ``auto_now`` se fija
+antes del commit, así que una transacción lenta podría confirmar filas con
+un ``actualizado`` anterior a un cursor ya entregado.
+"""
+import base64
+import heapq
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import (AccionEstrategica, AnioCerrado, AreaEstrategica, AreaOrganizacional, Eliminado, Entidad,
+                     FuenteInformacion, Indicador, ObjetivoEstrategico, Operacion, SerieIndicador, VersionPlan)
+
+LIMITE = 1000
+LIMITE_MAXIMO = 5000
+HOLGURA = timedelta(seconds=2)
+
+# el orden de esta lista desempata filas con el mismo ``actualizado`` (padres antes que hijos)
+MODELOS = [Entidad, AreaEstrategica, FuenteInformacion, AreaOrganizacional, ObjetivoEstrategico,
+           AccionEstrategica, Operacion, Indicador, SerieIndicador, VersionPlan, AnioCerrado]
+ETIQUETAS = [m._meta.label_lower for m in MODELOS]
+BAJAS = Eliminado._meta.label_lower  # las lápidas van al final del desempate
+ORDEN = {etiqueta: i for i, etiqueta in enumerate(ETIQUETAS + [BAJAS])}
+_FIN = 2 ** 62  # id mayor que cualquiera: "todo lo de ese instante ya se vio"
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+# ---------- Lápidas ----------
+def registrar_bajas(modelo, ids, momento=None):
+    """Lápidas para borrados que no pasan por ``delete()`` (una sola inserción)."""
+    etiqueta = modelo._meta.label_lower
+    if etiqueta not in ORDEN or etiqueta == BAJAS:
+        return
+    momento = momento or timezone.now()
+    Eliminado.objects.bulk_create([Eliminado(modelo=etiqueta, objeto_id=pk, momento=momento) for pk in ids],
+                                  batch_size=1000)
+
+
+def al_borrar(sender, instance, **kwargs):
+    """Receptor ``post_delete`` de los modelos de ``MODELOS``."""
+    Eliminado.objects.create(modelo=sender._meta.label_lower, objeto_id=instance.pk, momento=timezone.now())
+
+
+# ---------- Cursor ----------
+def codificar(momento, etiqueta, pk):
+    crudo = f"{momento.isoformat()}|{etiqueta}|{pk}"
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+
+def decodificar(cursor):
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        momento, etiqueta, pk = crudo.split("|")
+        momento = parse_datetime(momento)
+        pk = int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise CursorInvalido("Cursor inválido.") from None
+    if momento is None or etiqueta not in ORDEN:
+        raise CursorInvalido("Cursor inválido.")
+    return momento, etiqueta, pk
+
+
+def parsear_desde(texto):
+    """``?desde=`` en ISO 8601 (fecha, o fecha y hora); sin zona se toma la del sitio."""
+    momento = parse_datetime(texto)
+    if momento is None:
+        fecha = parse_date(texto)
+        momento = datetime.combine(fecha, time.min) if fecha else None
+    if momento is None:
+        raise ValueError("Parámetro 'desde' inválido (use ISO 8601).")
+    return _consciente(momento)
+
+
+def _consciente(momento):
+    # ``creado``/``actualizado`` vienen con zona: comparar con uno ingenuo es TypeError
+    if timezone.is_naive(momento):
+        return timezone.make_aware(momento, timezone.get_current_timezone())
+    return momento
+
+
+# ---------- Feed ----------
+def _fuente(etiqueta, etiquetas):
+    """(queryset base, campo de tiempo) de una etiqueta."""
+    if etiqueta == BAJAS:
+        qs = Eliminado.objects.all()
+        return (qs if etiquetas == ETIQUETAS else qs.filter(modelo__in=etiquetas)), "momento"
+    return MODELOS[ORDEN[etiqueta]]._default_manager.all(), "actualizado"
+
+
+def _posteriores(etiqueta, qs, campo, posicion):
+    """Filas de ``etiqueta`` estrictamente después de ``posicion`` en el orden global."""
+    if posicion is None:
+        return qs
+    momento, etiqueta_cursor, pk = posicion
+    qs = qs.filter(**{f"{campo}__gte": momento})
+    if ORDEN[etiqueta] < ORDEN[etiqueta_cursor]:
+        return qs.exclude(**{campo: momento})
+    if ORDEN[etiqueta] == ORDEN[etiqueta_cursor]:
+        return qs.exclude(Q(**{campo: momento}) & Q(id__lte=pk))
+    return qs
+
+
+def _claves(etiquetas, posicion, hasta, limite):
+    """Hasta ``limite`` + 1 claves (momento, orden, etiqueta, id) en orden global."""
+    partes = []
+    for etiqueta in etiquetas + [BAJAS]:
+        qs, campo = _fuente(etiqueta, etiquetas)
+        qs = _posteriores(etiqueta, qs.filter(**{f"{campo}__lte": hasta}), campo, posicion)
+        filas = qs.order_by(campo, "id").values_list(campo, "id")[:limite + 1]
+        partes.append([(m, ORDEN[etiqueta], etiqueta, pk) for m, pk in filas])
+    return list(heapq.merge(*partes))[:limite + 1]
+
+
+def _datos(etiqueta, ids):
+    modelo = MODELOS[ORDEN[etiqueta]]
+    campos = [f.attname for f in modelo._meta.concrete_fields]
+    filas = {f["id"]: f for f in modelo._default_manager.filter(pk__in=ids).values(*campos)}
+    if modelo is Indicador:
+        for f in filas.values():
+            f["fuentes"] = []
+        for ind, fuente in (Indicador.fuentes.through.objects.filter(indicador_id__in=ids)
+                            .values_list("indicador_id", "fuenteinformacion_id").order_by("id")):
+            filas[ind]["fuentes"].append(fuente)
+    return filas
+
+
+def cambios(cursor=None, desde=None, limite=LIMITE, modelos=None):
+    """
+    Siguiente página del feed. ``cursor`` (el devuelto en la página anterior)
+    tiene prioridad sobre ``desde`` (datetime: cambios posteriores a ese
+    momento). Sin ninguno de los dos empieza desde el principio. ``modelos``
+    restringe a ciertas etiquetas (``cis.indicador``…); el cursor solo es
+    válido para la misma selección.
+    """
+    limite = max(1, min(int(limite), LIMITE_MAXIMO))
+    if cursor:
+        posicion = decodificar(cursor)
+    elif desde is not None:
+        posicion = (_consciente(desde), BAJAS, _FIN)
+    else:
+        posicion = None
+    etiquetas = [e for e in ETIQUETAS if not modelos or e in modelos]
+    hasta = timezone.now() - HOLGURA
+
+    claves = _claves(etiquetas, posicion, hasta, limite)
+    hay_mas = len(claves) > limite
+    claves = claves[:limite]
+
+    por_etiqueta = {}
+    for _, _, etiqueta, pk in claves:
+        por_etiqueta.setdefault(etiqueta, []).append(pk)
+    bajas = {}
+    if BAJAS in por_etiqueta:
+        bajas = {e.pk: e for e in Eliminado.objects.filter(pk__in=por_etiqueta.pop(BAJAS))}
+    datos = {etiqueta: _datos(etiqueta, ids) for etiqueta, ids in por_etiqueta.items()}
+
+    inicio = posicion[0] if posicion else None
+    salida = []
+    for momento, _, etiqueta, pk in claves:
+        if etiqueta == BAJAS:
+            e = bajas[pk]
+            salida.append({"modelo": e.modelo, "id": e.objeto_id, "accion": "baja",
+                           "actualizado": momento.isoformat(), "datos": None})
+            continue
+        fila = datos[etiqueta].get(pk)
+        if fila is None:  # borrada entre los dos pasos: llegará su lápida
+            continue
+        accion = "alta" if inicio is None or fila["creado"] > inicio else "cambio"
+        salida.append({"modelo": etiqueta, "id": pk, "accion": accion,
+                       "actualizado": momento.isoformat(), "datos": fila})
+
+    if claves:
+        momento, _, etiqueta, pk = claves[-1]
+        cursor = codificar(momento, etiqueta, pk)
+    elif posicion is not None and not cursor:
+        cursor = codificar(posicion[0], BAJAS, _FIN)
+    return {"cambios": salida, "cursor": cursor or None, "hay_mas": hay_mas}
@@ -0,0 +1,174 @@
+# planificacion/tareas.py
+"""
+Cola local de trabajos en segundo plano, respaldada por la tabla ``Tarea``.
+
+    @tarea("exportar_cumplimiento")
+    def exportar_cumplimiento(ctx, anio=None): ...
+
+    encolar("exportar_cumplimiento", anio=2024)
+
+El worker (``manage.py procesar_tareas``) toma la tarea pendiente más antigua
+con un UPDATE condicional, la ejecuta y guarda progreso/resultado. Los archivos
+generados quedan en ``settings.CIS_TAREAS_DIR``. No hace falta broker.
+
+Si el worker muere a mitad de una tarea, esta queda EN_CURSO. Cada
+``ctx.progreso`` renueva ``actualizado``; al arrancar, el worker reencola las
+tareas EN_CURSO sin noticias en ``settings.CIS_TAREAS_PLAZO`` segundos, así
+que una tarea larga debe reportar progreso al menos una vez por plazo.
+"""
+import csv
+import logging
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import borrado, reportes, sharding
+from .models import EstadoTarea, Tarea
+
+logger = logging.getLogger(__name__)
+
+REGISTRO = {}
+
+
+def tarea(nombre):
+    """Registra una función como tipo de tarea; recibe (ctx, **parametros)."""
+    def deco(fn):
+        REGISTRO[nombre] = fn
+        return fn
+    return deco
+
+
+def encolar(tipo, **parametros):
+    if tipo not in REGISTRO:
+        raise ValueError(f"Tipo de tarea desconocido: {tipo}")
+    return Tarea.objects.create(tipo=tipo, parametros=parametros, shard=sharding.shard_actual() or "")
+
+
+def directorio():
+    ruta = Path(settings.CIS_TAREAS_DIR)
+    ruta.mkdir(parents=True, exist_ok=True)
+    return ruta
+
+
+class Contexto:
+    """Lo que recibe cada tarea: reporte de progreso y archivo de salida."""
+
+    # no escribimos el progreso más de una vez por este intervalo (s)
+    intervalo_progreso = 0.5
+
+    def __init__(self, obj):
+        self.tarea = obj
+        self._ultimo = 0.0
+
+    def progreso(self, actual, total=None, mensaje=None):
+        t = self.tarea
+        t.progreso = actual
+        if total is not None:
+            t.total = total
+        if mensaje is not None:
+            t.mensaje = mensaje[:250]
+        ahora = time.monotonic()
+        if ahora - self._ultimo >= self.intervalo_progreso or (t.total and actual >= t.total):
+            self._ultimo = ahora
+            Tarea.objects.filter(pk=t.pk).update(progreso=t.progreso, total=t.total, mensaje=t.mensaje,
+                                                 actualizado=timezone.now())
+
+    def archivo(self, nombre):
+        """Ruta donde escribir el resultado; queda asociada a la tarea."""
+        rel = f"{self.tarea.pk}-{nombre}"
+        self.tarea.archivo = rel
+        return directorio() / rel
+
+
+def tomar_siguiente():
+    """Reclama la tarea pendiente más antigua (seguro con varios workers)."""
+    while True:
+        pk = (Tarea.objects.filter(estado=EstadoTarea.PENDIENTE)
+              .order_by("id").values_list("pk", flat=True).first())
+        if pk is None:
+            return None
+        ok = (Tarea.objects.filter(pk=pk, estado=EstadoTarea.PENDIENTE)
+              .update(estado=EstadoTarea.EN_CURSO, iniciada=timezone.now(), actualizado=timezone.now()))
+        if ok:
+            return Tarea.objects.get(pk=pk)
+
+
+def recuperar_vencidas(plazo=None):
+    """Vuelve a PENDIENTE las tareas EN_CURSO cuyo worker dejó de dar noticias."""
+    if plazo is None:
+        plazo = settings.CIS_TAREAS_PLAZO
+    ahora = timezone.now()
+    n = (Tarea.objects.filter(estado=EstadoTarea.EN_CURSO, actualizado__lt=ahora - timedelta(seconds=plazo))
+         .update(estado=EstadoTarea.PENDIENTE, progreso=0, iniciada=None, actualizado=ahora,
+                 mensaje="Reencolada: el worker se detuvo sin terminarla."))
+    if n:
+        logger.warning("%s tarea(s) EN_CURSO sin progreso en %ss; reencoladas", n, plazo)
+    return n
+
+
+def ejecutar(obj):
+    ctx = Contexto(obj)
+    try:
+        fn = REGISTRO[obj.tipo]
+        with sharding.usar_shard(obj.shard or None):
+            mensaje = fn(ctx, **obj.parametros)
+        obj.estado = EstadoTarea.TERMINADA
+        obj.mensaje = (mensaje or obj.mensaje or "Terminada")[:250]
+    except Exception as exc:
+        logger.exception("Falló la tarea %s", obj.pk)
+        obj.estado = EstadoTarea.ERROR
+        obj.mensaje = f"{exc.__class__.__name__}: {exc}"[:250]
+    obj.terminada = timezone.now()
+    obj.save()
+    return obj
+
+
+def procesar(una_vez=False, intervalo=2.0, maximo=None):
+    recuperar_vencidas()
+    hechas = 0
+    while maximo is None or hechas < maximo:
+        close_old_connections()
+        obj = tomar_siguiente()
+        if obj is None:
+            if una_vez:
+                break
+            time.sleep(intervalo)
+            continue
+        ejecutar(obj)
+        hechas += 1
+    return hechas
+
+
+# ---------- Tareas registradas ----------
+@tarea("exportar_cumplimiento")
+def exportar_cumplimiento(ctx, anio=None):
+    qs = reportes.filas_cumplimiento(anio)
+    total = qs.count()
+    ctx.progreso(0, total, "Exportando reporte de cumplimiento…")
+    with open(ctx.archivo(f"cumplimiento-{anio or 'todos'}.csv"), "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["Año", "Operación", "Indicador", "Área", "Programado", "Ejecutado", "% Cumplido"])
+        for i, r in enumerate(qs.iterator(chunk_size=2000), 1):
+            w.writerow([r["anio"], r["indicador__operacion__codigo"], r["indicador__nombre"],
+                        r["indicador__operacion__accion__objetivo__area_org__nombre"],
+                        f"{r['programado']:.2f}", f"{r['ejecutado']:.2f}", f"{r['cumplimiento']:.2f}"])
+            if i % 500 == 0:
+                ctx.progreso(i)
+    ctx.progreso(total)
+    return f"{total} filas exportadas"
+
+
+@tarea("borrar_jerarquia")
+def borrar_jerarquia(ctx, modelo, pk):
+    try:
+        obj = borrado.resolver(modelo, pk)
+    except ObjectDoesNotExist:
+        return "El registro ya no existe"
+    nombre = str(obj)[:120]
+    total = borrado.borrar(obj, progreso=ctx.progreso, atomico=False)
+    return f"{nombre}: {total} filas eliminadas"
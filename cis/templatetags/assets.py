@@ -0,0 +1,57 @@
+# planificacion/templatetags/assets.py
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from cis.estaticos import BUNDLES, CDN_FUENTES, VENDOR
+
+register = template.Library()
+
+
+def _hay_bundle(nombre):
+    # solo tras collectstatic (manifest) y fuera de DEBUG
+    return not settings.DEBUG and nombre in getattr(staticfiles_storage, "hashed_files", {})
+
+
+@lru_cache(maxsize=None)
+def _fuentes(nombre):
+    """[(url, integridad)] de un bundle sin empaquetar: copia local o CDN."""
+    urls, fuentes_google = [], False
+    for ruta in BUNDLES[nombre]:
+        if finders.find(ruta):
+            urls.append((static(ruta), None))
+        elif ruta.startswith("vendor/fonts/"):
+            if not fuentes_google:  # las de Google van juntas, una sola vez
+                urls.extend((u, None) for u in CDN_FUENTES)
+                fuentes_google = True
+        elif ruta in VENDOR:
+            urls.append(VENDOR[ruta])
+    return tuple(urls)
+
+
+def _urls(nombre):
+    if _hay_bundle(nombre):
+        return [(static(nombre), None)]
+    return _fuentes(nombre)
+
+
+@register.simple_tag
+def assets_css(nombre="bundle/app.css"):
+    return format_html_join(
+        "\n", '<link rel="stylesheet" href="{}"{}>',
+        ((url, format_html(' integrity="{}" crossorigin="anonymous"', sri) if sri else "")
+         for url, sri in _urls(nombre)))
+
+
+@register.simple_tag
+def assets_js(nombre="bundle/app.js"):
+    """Siempre ``defer``: no bloquea el render y respeta el orden del bundle."""
+    return format_html_join(
+        "\n", '<script src="{}"{} defer></script>',
+        ((url, format_html(' integrity="{}" crossorigin="anonymous"', sri) if sri else "")
+         for url, sri in _urls(nombre)))
@@ -1,24 +1,60 @@
 # planificacion/templatetags/bootstrap_extras.py
+from functools import lru_cache
+
 from django import template
 from django.utils.safestring import mark_safe
 
 register = template.Library()
 
+SELECTS = ("Select", "SelectMultiple")
+
+
+@lru_cache(maxsize=1024)
+def _unir_clases(previa, extra):
+    """Une clases CSS sin repetir (resultado cacheado por par de strings)."""
+    vistas = dict.fromkeys(previa.split())
+    vistas.update(dict.fromkeys(extra.split()))
+    return " ".join(vistas)
+
+
+@lru_cache(maxsize=256)
+def _parsear_attrs(arg):
+    attrs = {}
+    for pair in arg.split(","):
+        if "=" in pair:
+            k, v = pair.split("=", 1)
+            attrs[k.strip()] = v.strip()
+    return attrs
+
+
+_attrs_bs = {}
+
+
+def _attrs_campo(field):
+    """
+    Atributos extra de render_bs_field, calculados una vez por
+    (clase de form, campo, clase de widget) — nunca se muta el widget.
+    """
+    widget = field.field.widget
+    clave = (field.form.__class__, field.name, widget.__class__, widget.attrs.get("class", ""))
+    attrs = _attrs_bs.get(clave)
+    if attrs is None:
+        widget_class = "form-select" if widget.__class__.__name__ in SELECTS else "form-control"
+        attrs = _attrs_bs[clave] = {"class": _unir_clases(clave[3], widget_class)}
+    return attrs
+
+
 @register.filter(name="add_class")
 def add_class(field, css):
-    return field.as_widget(attrs={**field.field.widget.attrs, "class": f"{field.field.widget.attrs.get('class','')} {css}".strip()})
+    return field.as_widget(attrs={"class": _unir_clases(field.field.widget.attrs.get("class", ""), css)})
 
 @register.filter(name="add_attrs")
 def add_attrs(field, arg):
     """
     Uso: {{ form.campo|add_attrs:'placeholder=Buscar...,data-foo=bar' }}
     """
-    attrs = {}
-    for pair in arg.split(","):
-        if "=" in pair:
-            k, v = pair.split("=", 1)
-            attrs[k.strip()] = v.strip()
-    return field.as_widget(attrs={**field.field.widget.attrs, **attrs})
+    # as_widget ya combina con widget.attrs; solo pasamos lo nuevo
+    return field.as_widget(attrs=_parsear_attrs(arg))
 
 @register.simple_tag
 def field_errors(field):
@@ -31,8 +67,4 @@ def render_bs_field(field, show_label=True):
     """
     Render rápido de un campo con label + input/select + help + errores (Bootstrap 5)
     """
-    widget_class = "form-select" if field.field.widget.__class__.__name__ in ("Select", "SelectMultiple") else "form-control"
-    # si ya tiene clase previa, la respetamos y agregamos
-    prev_cls = field.field.widget.attrs.get("class", "")
-    field.field.widget.attrs["class"] = f"{prev_cls} {widget_class}".strip()
-    return {"field": field, "show_label": show_label}
+    return {"field": field, "widget": field.as_widget(attrs=_attrs_campo(field)), "show_label": show_label}
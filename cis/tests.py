@@ -1,3 +1,1224 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from datetime import datetime, timedelta, timezone as tz
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django import forms
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F, FilteredRelation, FloatField, Q, Value
+from django.db.models.functions import Cast, Coalesce
+from django.core.management import CommandError, call_command
+from django.template import engines
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_script_prefix, path, reverse, set_script_prefix
+
+from core import urls as urls_proyecto
+
+from . import (analitica, arbol, borrado, cierres, escritura, estaticos, exportacion, formulas, historial,
+               mapa_calor, paquetes, reportes, sharding, sincronizacion, tareas, ventanas, versiones, views)
+from .concurrencia import Conflicto
+from .forms import IndicadorForm
+from .models import (AccionEstrategica, AreaOrganizacional, Eliminado, Entidad, EstadoTarea, FuenteInformacion,
+                     HistorialSerie, Indicador, ObjetivoEstrategico, Operacion, SerieIndicador, Tarea)
+
+# las rutas de core/urls.py con las vistas async, como bajo ASGI (CIS_ASYNC_VIEWS)
+urlpatterns = [
+    path("", views.adashboard, name="dashboard"),
+    path("reportes/cumplimiento/", views.ReporteCumplimientoAsyncView.as_view(), name="reporte_cumplimiento"),
+    *urls_proyecto.urlpatterns,
+]
+
+
+# las páginas HTML sin correr collectstatic (AssetsStorage exige el manifiesto)
+sin_manifiesto = override_settings(STORAGES={
+    **settings.STORAGES, "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}})
+
+
+def crear_plan(sigla="F", indicadores=1, **campos_indicador):
+    """Una rama Entidad → … → Operación con ``indicadores`` indicadores."""
+    entidad = Entidad.objects.create(nombre=f"Facultad {sigla}", sigla=sigla)
+    area = AreaOrganizacional.objects.create(entidad=entidad, nombre=f"Área {sigla}")
+    objetivo = ObjetivoEstrategico.objects.create(area_org=area, codigo="1", descripcion="Objetivo")
+    accion = AccionEstrategica.objects.create(objetivo=objetivo, codigo="1.1", descripcion="Acción")
+    operacion = Operacion.objects.create(accion=accion, codigo="9", descripcion="Operación")
+    return [Indicador.objects.create(operacion=operacion, nombre=f"Indicador {i}", **campos_indicador)
+            for i in range(indicadores)]
+
+
+def serie(indicador, anio, valor, es_programado=True):
+    return SerieIndicador.objects.create(indicador=indicador, anio=anio, valor=valor, es_programado=es_programado)
+
+
+def datos_formset(formset, **cambios):
+    """POST de un formset tal como se mostró; ``cambios``: {"form-0-valor": …}."""
+    datos = {campo.html_name: campo.value() for campo in formset.management_form}
+    for form in formset.forms:
+        for nombre in form.fields:
+            valor = form[nombre].value()
+            if valor not in (None, False):
+                datos[form.add_prefix(nombre)] = "on" if valor is True else valor
+    datos.update(cambios)
+    return datos
+
+
+class ApiShardTests(TestCase):
+    def test_cuerpo_streaming_consulta_el_shard_del_request(self):
+        # ShardMiddleware fija el prefijo /s/zz/ en el hilo; reverse() de otros tests no debe heredarlo
+        self.addCleanup(set_script_prefix, get_script_prefix())
+        Entidad.objects.create(nombre="Facultad", sigla="F")
+        vistos = []
+        real = sharding.shard_actual
+
+        def espiar():
+            vistos.append(real())
+            return None  # se sigue leyendo de default: solo interesa el shard activo
+
+        with mock.patch.object(sharding, "shards", return_value=["zz"]), \
+                mock.patch.object(sharding, "shard_actual", side_effect=espiar):
+            respuesta = self.client.get("/s/zz/api/v1/entidades/")
+            cuerpo = b"".join(respuesta.streaming_content)
+        self.assertIn(b"Facultad", cuerpo)
+        self.assertTrue(vistos)
+        self.assertEqual(set(vistos), {"zz"})
+
+
+@mock.patch.object(sincronizacion, "HOLGURA", timedelta(0))
+class FeedCambiosTests(TestCase):
+    def setUp(self):
+        self.indicadores = crear_plan(indicadores=3)
+
+    def recorrer(self, limite, **kwargs):
+        vistos, cursor = [], None
+        while True:
+            pagina = sincronizacion.cambios(cursor=cursor, limite=limite, **kwargs)
+            vistos += pagina["cambios"]
+            cursor = pagina["cursor"]
+            if not pagina["hay_mas"]:
+                return vistos, cursor
+
+    def test_paginas_con_cursor_sin_repetir_ni_saltear(self):
+        completo = sincronizacion.cambios(limite=1000)["cambios"]
+        por_paginas, _ = self.recorrer(limite=2)
+        claves = [(c["modelo"], c["id"]) for c in por_paginas]
+        self.assertEqual(claves, [(c["modelo"], c["id"]) for c in completo])
+        self.assertEqual(len(claves), len(set(claves)))
+        self.assertEqual(len(claves), 8)  # entidad, área, objetivo, acción, operación, 3 indicadores
+
+    def test_cursor_entrega_solo_lo_nuevo_y_las_lapidas(self):
+        _, cursor = self.recorrer(limite=1000)
+        borrado = self.indicadores[0]
+        borrado_id = borrado.pk
+        borrado.delete()
+        nueva = serie(self.indicadores[1], 2024, 10)
+        pagina = sincronizacion.cambios(cursor=cursor)
+        acciones = {(c["modelo"], c["id"]): c["accion"] for c in pagina["cambios"]}
+        self.assertEqual(acciones, {("cis.indicador", borrado_id): "baja",
+                                    ("cis.serieindicador", nueva.pk): "alta"})
+        self.assertEqual(sincronizacion.cambios(cursor=pagina["cursor"])["cambios"], [])
+
+    def test_cursor_invalido(self):
+        with self.assertRaises(sincronizacion.CursorInvalido):
+            sincronizacion.cambios(cursor="no-es-un-cursor")
+
+    def test_desde_sin_zona_o_solo_fecha(self):
+        for desde in ("2020-01-01", "2020-01-01T00:00", "2020-01-01T00:00:00+00:00"):
+            respuesta = self.client.get("/api/cambios/", {"desde": desde})
+            self.assertEqual(respuesta.status_code, 200, desde)
+            self.assertEqual({c["accion"] for c in respuesta.json()["cambios"]}, {"alta"})
+        self.assertEqual(self.client.get("/api/cambios/", {"desde": "ayer"}).status_code, 400)
+
+    def test_desde_marca_cambios(self):
+        _, cursor = self.recorrer(limite=1000)
+        momento = sincronizacion.decodificar(cursor)[0]
+        ind = Indicador.objects.get(pk=self.indicadores[2].pk)
+        ind.observaciones = "editado"
+        ind.save()
+        cambios = sincronizacion.cambios(desde=momento)["cambios"]
+        self.assertEqual([(c["id"], c["accion"]) for c in cambios], [(ind.pk, "cambio")])
+
+
+@sin_manifiesto
+class AniosCerradosTests(TestCase):
+    def setUp(self):
+        (self.indicador,) = crear_plan()
+        self.area = self.indicador.operacion.accion.objetivo.area_org
+        serie(self.indicador, 2024, 10)
+        serie(self.indicador, 2024, 8, es_programado=False)
+        serie(self.indicador, 2025, 12)
+        cierres.cerrar(2024)
+
+    def test_borrado_jerarquico_se_niega(self):
+        with self.assertRaises(ValidationError):
+            borrado.borrar(self.indicador.operacion)
+        self.assertEqual(SerieIndicador.objects.count(), 3)
+
+    def test_confirmacion_muestra_el_aviso_y_no_borra(self):
+        url = reverse("indicador_delete", args=[self.indicador.pk])
+        self.assertContains(self.client.get(url), "años cerrados (2024)")
+        respuesta = self.client.post(url)
+        self.assertContains(respuesta, "años cerrados (2024)")
+        self.assertTrue(Indicador.objects.filter(pk=self.indicador.pk).exists())
+        self.assertEqual(SerieIndicador.objects.filter(anio=2024).count(), 2)
+
+    def test_borra_si_el_anio_se_reabre(self):
+        cierres.reabrir(2024)
+        borrado.borrar(self.indicador)
+        self.assertFalse(SerieIndicador.objects.exists())
+
+    def test_clonar_hacia_un_anio_cerrado(self):
+        with self.assertRaises(ValidationError):
+            versiones.clonar(self.area, "v2", desplazar_anios=-1)  # 2025 → 2024
+        with self.assertRaises(ValidationError):
+            versiones.clonar(self.area, "v2")  # 2024 → 2024
+        self.assertEqual(AreaOrganizacional.objects.count(), 1)
+        version = versiones.clonar(self.area, "v2", desplazar_anios=5)
+        self.assertEqual(SerieIndicador.objects.filter(
+            indicador__operacion__accion__objetivo__area_org=version.area_org).count(), 3)
+        versiones.clonar(self.area, "v3", series=versiones.SERIES_NINGUNA)
+
+
+@sin_manifiesto
+class DashboardShardsTests(TestCase):
+    def setUp(self):
+        a, b = crear_plan(indicadores=2)
+        serie(a, 2024, 10)
+        serie(a, 2024, 5, es_programado=False)
+        serie(b, 2023, 4)
+
+    def test_sin_shard_elegido_combina_todos(self):
+        solo = reportes.contexto_dashboard()
+
+        def dos_shards(fn):  # los dos "shards" leen default: el consolidado debe duplicar
+            return [("a", fn()), ("b", fn())]
+
+        with mock.patch.object(sharding, "shards", return_value=["a", "b"]), \
+                mock.patch.object(sharding, "fan_out", side_effect=dos_shards):
+            ctx = self.client.get("/").context
+        self.assertEqual(ctx["total_indicadores"], 2 * solo["total_indicadores"])
+        self.assertEqual(ctx["con_ejecucion"], 2)
+        self.assertEqual(ctx["avance_promedio"], solo["avance_promedio"])
+        self.assertEqual(ctx["ultimo_anio"], 2024)
+        self.assertEqual([(r["anio"], r["programado"]) for r in ctx["por_anio"]], [(2023, 8.0), (2024, 20.0)])
+        self.assertEqual(ctx["dist_tipo"], [{"tipo": r["tipo"], "total": 2 * r["total"]} for r in solo["dist_tipo"]])
+        self.assertEqual(len(ctx["cumplimiento_area"]), 2 * len(solo["cumplimiento_area"]))
+
+
+# las consultas de las vistas async corren en otros hilos (otras conexiones):
+# los datos tienen que estar confirmados, no en la transacción de un TestCase
+@sin_manifiesto
+@override_settings(ROOT_URLCONF="cis.tests")
+class VistasAsyncTests(TransactionTestCase):
+    def setUp(self):
+        a, b = crear_plan(indicadores=2)
+        serie(a, 2024, 10)
+        serie(a, 2024, 5, es_programado=False)
+        serie(b, 2023, 4)
+
+    async def test_dashboard_igual_que_el_sincrono(self):
+        respuesta = await self.async_client.get("/")
+        self.assertEqual(respuesta.status_code, 200)
+        esperado = await reportes.en_hilo(reportes.contexto_dashboard)
+        for clave, valor in esperado.items():
+            self.assertEqual(respuesta.context[clave], valor, clave)
+        repetida = await self.async_client.get("/", headers={"if-none-match": respuesta["ETag"]})
+        self.assertEqual(repetida.status_code, 304)
+
+    async def test_reporte_con_anio(self):
+        respuesta = await self.async_client.get("/reportes/cumplimiento/", {"anio": "2024"})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([r["anio"] for r in respuesta.context["rows"]], [2024])
+        self.assertFalse(respuesta.context["anio_cerrado"])
+        await reportes.en_hilo(cierres.cerrar, 2024)
+        respuesta = await self.async_client.get("/reportes/cumplimiento/", {"anio": "2024"})
+        self.assertTrue(respuesta.context["anio_cerrado"])
+        self.assertContains(respuesta, "Año cerrado")
+
+
+@sin_manifiesto
+class GetCondicionalTests(TestCase):
+    def test_etag_cambia_al_borrar_la_fila_mas_nueva(self):
+        (ind,) = crear_plan()
+        serie(ind, 2023, 4)
+        nueva = serie(ind, 2024, 10)
+        primera = self.client.get("/")
+        self.assertFalse(primera.has_header("Last-Modified"))
+        etag = primera["ETag"]
+        self.assertEqual(self.client.get("/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        nueva.delete()
+        self.assertEqual(self.client.get("/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        # sin ETag no hay revalidación por fecha: If-Modified-Since solo no da 304
+        self.assertEqual(self.client.get("/", HTTP_IF_MODIFIED_SINCE="Wed, 01 Jan 2098 00:00:00 GMT").status_code, 200)
+
+    def test_aviso_tras_redirect_no_da_304(self):
+        (ind,) = crear_plan()
+        cerrada = serie(ind, 2024, 10)
+        cierres.cerrar(2024)
+        lista = reverse("serie_list")
+        etag = self.client.get(lista)["ETag"]
+        self.assertEqual(self.client.get(lista, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # borrar una serie de un año cerrado se niega: ninguna fila cambia, pero hay aviso
+        respuesta = self.client.post(reverse("serie_delete", args=[cerrada.pk]))
+        self.assertRedirects(respuesta, lista, fetch_redirect_response=False)
+        respuesta = self.client.get(lista, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(respuesta, "El año 2024 está cerrado")
+        self.assertFalse(respuesta.has_header("ETag"))
+        # ya mostrado el aviso, vuelve la revalidación
+        self.assertEqual(self.client.get(lista, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class RankingTests(TestCase):
+    def setUp(self):
+        a, b, c, _ = crear_plan(indicadores=4)
+        serie(a, 2024, 10)
+        serie(a, 2024, 5, es_programado=False)
+        serie(b, 2024, 0)
+        serie(c, 2024, 3, es_programado=False)
+
+    def filas(self, nivel):
+        return [(r["nodo_id"], r["total_indicadores"], r["programado"], r["ejecutado"],
+                 round(r["prom_cumplimiento"], 2), r["puesto"]) for r in ventanas.ranking(2024, nivel)]
+
+    def test_en_vivo_coincide_con_el_cierre(self):
+        vivo = {nivel: self.filas(nivel) for nivel in ventanas.NIVELES}
+        cierres.cerrar(2024)
+        for nivel in ventanas.NIVELES:
+            self.assertEqual(vivo[nivel], self.filas(nivel), nivel)
+        self.assertEqual(vivo["area"][0][1:5], (4, 10.0, 8.0, 50.0))
+        self.assertEqual(vivo["operacion"][0][1], 3)
+
+
+@sin_manifiesto
+class AnaliticaTests(TestCase):
+    def setUp(self):
+        for i, ind in enumerate(crear_plan(indicadores=60, linea_base=0, meta_valor=100)):
+            serie(ind, 2023, i, es_programado=False)
+            serie(ind, 2024, 2 * i, es_programado=False)
+
+    def test_solo_se_convierte_la_pagina(self):
+        fila = analitica.Resultado.fila
+        with mock.patch.object(analitica.Resultado, "fila", autospec=True, side_effect=fila) as convertir:
+            respuesta = self.client.get(reverse("analitica"), {"orden": "-avance", "page": 2})
+        self.assertEqual(convertir.call_count, 10)
+        filas = respuesta.context["filas"]
+        self.assertEqual([f["avance_pct"] for f in filas], [18.0 - 2 * i for i in range(10)])
+
+    def test_filas_perezosas_en_orden(self):
+        r = analitica.calcular(Indicador.objects.all())
+        filas = r.filas("avance_pct", descendente=True)
+        self.assertEqual(len(filas), 60)
+        self.assertEqual(filas[0]["avance_pct"], 118.0)
+        self.assertEqual([f["id"] for f in filas[5:8]], [f["id"] for f in list(filas)[5:8]])
+
+
+class ImportarPlanTests(TestCase):
+    def setUp(self):
+        (ind,) = crear_plan()
+        serie(ind, 2024, 10)
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.ruta = os.path.join(carpeta.name, "plan.jsonl.gz")
+        exportacion.exportar(self.ruta)
+        with gzip.open(self.ruta, "rb") as fh:
+            self.lineas = fh.read().splitlines(keepends=True)
+
+    def reescribir(self, contenido):
+        with gzip.open(self.ruta, "wb") as fh:
+            fh.write(contenido)
+
+    def test_linea_dañada_a_mitad_del_archivo(self):
+        mitad = len(self.lineas) // 2
+        self.reescribir(b"".join(self.lineas[:mitad] + [b'[1, "sin cerrar\n'] + self.lineas[mitad:]))
+        with self.assertRaisesMessage(exportacion.ArchivoInvalido, f"Línea {mitad + 1} dañada"):
+            exportacion.importar(self.ruta, sufijo_area=" (copia)")
+
+    def test_gzip_cortado(self):
+        with open(self.ruta, "rb") as fh:
+            crudo = fh.read()
+        with open(self.ruta, "wb") as fh:
+            fh.write(crudo[:len(crudo) // 2])
+        with self.assertRaises(exportacion.ArchivoInvalido):
+            exportacion.importar(self.ruta, sufijo_area=" (copia)")
+        self.assertEqual(AreaOrganizacional.objects.count(), 1)  # la transacción se revirtió
+
+    def test_archivo_integro_se_importa(self):
+        exportacion.importar(self.ruta, sufijo_area=" (copia)")
+        self.assertEqual(SerieIndicador.objects.count(), 2)
+
+    def test_series_de_un_anio_cerrado(self):
+        cierres.cerrar(2024)
+        with self.assertRaisesMessage(exportacion.ArchivoInvalido, "años cerrados (2024)"):
+            exportacion.importar(self.ruta, sufijo_area=" (copia)")
+        self.assertEqual(AreaOrganizacional.objects.count(), 1)
+        self.assertEqual(SerieIndicador.objects.count(), 1)
+
+
+class ImportarPlanBloqueoTests(TransactionTestCase):
+    def test_nadie_inserta_series_durante_la_importacion(self):
+        (ind,) = crear_plan()
+        serie(ind, 2024, 10)
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        ruta = os.path.join(carpeta.name, "plan.jsonl.gz")
+        exportacion.exportar(ruta)
+        errores = []
+
+        def otro_usuario():
+            try:
+                serie(ind, 2030, 1)
+            except OperationalError as exc:
+                errores.append(exc)
+            finally:
+                connections.close_all()
+
+        def progreso(etiqueta, n):
+            # la entidad ya existe (se empareja por nombre): hasta aquí la importación no escribió nada
+            if etiqueta == "cis.entidad":
+                hilo = threading.Thread(target=otro_usuario)
+                hilo.start()
+                hilo.join()
+
+        exportacion.importar(ruta, sufijo_area=" (copia)", progreso=progreso)
+        self.assertEqual(len(errores), 1)
+        self.assertIn("locked", str(errores[0]))
+        self.assertEqual(SerieIndicador.objects.count(), 2)
+
+
+class FormulasTests(TestCase):
+    def test_lista_blanca(self):
+        for texto in ("ejecutado.real", "__import__('os')", "open('x') / programado", "ejecutado > programado",
+                      "ejecutado if programado else 0", "(lambda: ejecutado)()", "[ejecutado][0]",
+                      "'texto' * ejecutado", "avance / programado", "abs(ejecutado, programado)",
+                      "min(ejecutado, programado, key=abs)", "ejecutado / programado; 1", ""):
+            with self.subTest(texto=texto), self.assertRaises(formulas.FormulaInvalida):
+                formulas.compilar(texto)
+
+    def test_evalua_por_arreglos(self):
+        f = formulas.compilar("min(ejecutado / programado, 1) + abs(-meta) * 0 - -linea_base ** 2")
+        self.assertEqual(f.variables, {"ejecutado", "programado", "meta", "linea_base"})
+        r = f(ejecutado=np.array([5.0, 20.0]), programado=np.array([10.0, 10.0]),
+              meta=np.array([1.0, 1.0]), linea_base=np.array([0.0, 1.0]))
+        self.assertEqual(r.tolist(), [0.5, 2.0])
+
+    def test_prefijo_nombre(self):
+        f = formulas.compilar("TECPFAP = (ejecutado/programado)")
+        self.assertEqual(f.texto, "(ejecutado/programado)")
+        self.assertEqual(f(ejecutado=np.array([3.0]), programado=np.array([4.0])).tolist(), [0.75])
+        # "==" no es un nombre: queda una comparación, que no está permitida
+        with self.assertRaises(formulas.FormulaInvalida):
+            formulas.compilar("ejecutado == programado")
+
+    def test_texto_descriptivo_usa_la_de_defecto(self):
+        defecto = formulas.compilar(formulas.FORMULA_DEFECTO)
+        for texto in ("", None, "N/C", "N° de productos ejecutados / programados", "ejecutado +", "x = ejecutado.y"):
+            with self.subTest(texto=texto):
+                self.assertIs(formulas.de_texto(texto), defecto)
+        self.assertIsNot(formulas.de_texto("meta - ejecutado"), defecto)
+        self.assertTrue(formulas.es_formula("TEC = Ejecutado/Programado"))
+
+    def test_numpy_y_sql_coinciden(self):
+        textos = ["", "N/C", "TEC = ejecutado/programado", "(ejecutado - linea_base) / (meta - linea_base)",
+                  "min(ejecutado / programado, 1)", "max(ejecutado, programado, meta) / programado",
+                  "abs(-ejecutado) / programado ** 2", "-(ejecutado - programado) / programado",
+                  "1 - ejecutado / programado"]
+        # (programado, ejecutado): con división por cero y sin ejecutado
+        valores = [(10, 5), (0, 3), (4, None), (8, 8), (2.5, 7.25)]
+        for texto, indicador in zip(textos, crear_plan(indicadores=len(textos), linea_base=1, meta_valor=9)):
+            indicador.formula_texto = texto
+            indicador.save()
+            for anio, (prog, ejec) in enumerate(valores, 2020):
+                serie(indicador, anio, prog)
+                if ejec is not None:
+                    serie(indicador, anio, ejec, es_programado=False)
+        Indicador.objects.filter(formula_texto="1 - ejecutado / programado").update(linea_base=None)
+
+        flotante = lambda campo: Cast(campo, FloatField())
+        qs = (SerieIndicador.objects.filter(es_programado=True)
+              .annotate(ejec=FilteredRelation("indicador__series", condition=Q(
+                  indicador__series__anio=F("anio"), indicador__series__es_programado=False)))
+              .annotate(programado=flotante("valor"),
+                        ejecutado=Coalesce(flotante("ejec__valor"), Value(0.0)))
+              .order_by("pk"))
+        en_sql = qs.annotate(cumplimiento=formulas.a_sql(textos, {
+            "programado": F("programado"), "ejecutado": F("ejecutado"),
+            "linea_base": flotante("indicador__linea_base"), "meta": flotante("indicador__meta_valor"),
+        }, campo_texto=formulas.CAMPO_TEXTO)).values_list("cumplimiento", flat=True)
+        en_numpy = formulas.aplicar(list(qs.values("programado", "ejecutado", *formulas.CAMPOS_INDICADOR)))
+        self.assertEqual(len(en_numpy), len(textos) * len(valores))
+        for sql, fila in zip(en_sql, en_numpy):
+            self.assertAlmostEqual(sql, fila["cumplimiento"], places=6, msg=fila)
+        self.assertIn(0.0, list(en_sql))  # la división por cero da 0, no NULL
+
+
+@sin_manifiesto
+class ConcurrenciaTests(TestCase):
+    def setUp(self):
+        (self.indicador,) = crear_plan()
+        self.fila = serie(self.indicador, 2024, 10)
+
+    def test_dos_guardados_con_la_misma_version(self):
+        a = SerieIndicador.objects.get(pk=self.fila.pk)
+        b = SerieIndicador.objects.get(pk=self.fila.pk)
+        a.valor = 11
+        a.save()
+        b.valor = 12
+        with self.assertRaises(Conflicto) as ctx, transaction.atomic():  # como el savepoint de escribir()
+            b.save()
+        self.assertEqual(ctx.exception.actual, SerieIndicador.objects.get(pk=self.fila.pk).actualizado)
+        self.assertEqual(SerieIndicador.objects.get(pk=self.fila.pk).valor, 11)
+        a.valor = 13
+        a.save()  # la versión de ``a`` avanzó con su propio guardado
+
+    def test_guardar_una_fila_borrada(self):
+        a = SerieIndicador.objects.get(pk=self.fila.pk)
+        SerieIndicador.objects.filter(pk=self.fila.pk).delete()
+        with self.assertRaises(Conflicto) as ctx, transaction.atomic():
+            a.save()
+        self.assertIsNone(ctx.exception.actual)
+
+    def test_editor_masivo_avisa_y_el_reenvio_sobrescribe(self):
+        url = reverse("serie_bulk_edit", args=[self.indicador.pk])
+        visto = self.client.get(url).context["formset"]
+        otro = SerieIndicador.objects.get(pk=self.fila.pk)
+        otro.valor = 20
+        otro.save()
+
+        respuesta = self.client.post(url, datos_formset(visto, **{"form-0-valor": "30"}))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn("Otro usuario modificó algunas filas", [m.message for m in respuesta.context["messages"]][0])
+        formset = respuesta.context["formset"]
+        self.assertIn("Otro usuario modificó este registro", formset.forms[0].non_field_errors()[0])
+        self.assertEqual(SerieIndicador.objects.get(pk=self.fila.pk).valor, 20)
+
+        # el formulario vuelve con la versión vigente: reenviarlo sobrescribe a sabiendas
+        self.assertRedirects(self.client.post(url, datos_formset(formset)), url, fetch_redirect_response=False)
+        self.assertEqual(SerieIndicador.objects.get(pk=self.fila.pk).valor, 30)
+
+
+# el hilo escritor usa su propia conexión: los datos tienen que estar confirmados
+@mock.patch.object(escritura, "ESPERA_INICIAL", 0)
+class EscrituraAgrupadaTests(TransactionTestCase):
+    def setUp(self):
+        self.indicadores = crear_plan(indicadores=4)
+
+    def estadisticas(self):
+        return dict(escritura.estadisticas)
+
+    def en_un_lote(self, *pedidos):
+        """Encola todos los pedidos antes de arrancar el escritor: caen en un solo lote."""
+        escritor = escritura.Escritor()
+        futuros = [escritor.enviar(escritura._Pedido(fn, "default", instancias)) for fn, instancias in pedidos]
+        escritor.cola.put(escritura._FIN)
+        escritor.start()
+        escritor.join()
+        return futuros
+
+    def test_un_lote_y_un_error_no_arrastra_a_los_demas(self):
+        antes = self.estadisticas()
+
+        def cerrado():
+            serie(self.indicadores[3], 2024, 1)
+            raise ValidationError("año cerrado")
+
+        futuros = self.en_un_lote(*[(lambda ind=ind: serie(ind, 2024, 5).pk, ()) for ind in self.indicadores[:3]],
+                                  (cerrado, ()))
+        self.assertEqual(self.estadisticas()["lotes"] - antes["lotes"], 1)
+        self.assertEqual(self.estadisticas()["operaciones"] - antes["operaciones"], 4)
+        self.assertEqual(sorted(f.result() for f in futuros[:3]),
+                         sorted(SerieIndicador.objects.values_list("pk", flat=True)))
+        with self.assertRaises(ValidationError):
+            futuros[3].result()
+        self.assertFalse(SerieIndicador.objects.filter(indicador=self.indicadores[3]).exists())
+
+    def test_base_bloqueada_reintenta_el_lote_entero(self):
+        antes = self.estadisticas()
+        nueva = SerieIndicador(indicador=self.indicadores[0], anio=2024, valor=1)
+        intentos = []
+
+        def bloqueada_una_vez():
+            intentos.append(1)
+            if len(intentos) == 1:
+                raise OperationalError("database is locked")
+            return "ok"
+
+        alta, reintento = self.en_un_lote((lambda: nueva.save() or nueva.pk, [nueva]), (bloqueada_una_vez, ()))
+        self.assertEqual(reintento.result(), "ok")
+        self.assertEqual(self.estadisticas()["reintentos"] - antes["reintentos"], 1)
+        # el primer intento se revirtió y ``nueva`` volvió a ser un alta: una sola fila
+        self.assertEqual(alta.result(), SerieIndicador.objects.get().pk)
+
+    def test_con_reintentos(self):
+        llamadas = []
+
+        def bloqueada_dos_veces():
+            llamadas.append(1)
+            if len(llamadas) <= 2:
+                raise OperationalError("database is locked")
+            return len(llamadas)
+
+        self.assertEqual(escritura.con_reintentos(bloqueada_dos_veces), 3)
+
+        def otro_error():
+            llamadas.append(1)
+            raise OperationalError("no such table: x")
+
+        llamadas.clear()
+        with self.assertRaises(OperationalError):
+            escritura.con_reintentos(otro_error)
+        self.assertEqual(len(llamadas), 1)
+
+    def test_escribir_devuelve_el_resultado_y_propaga_errores(self):
+        self.addCleanup(escritura.detener)
+        fila = escritura.escribir(lambda: serie(self.indicadores[0], 2024, 7), SerieIndicador)
+        self.assertEqual(SerieIndicador.objects.get().pk, fila.pk)
+        with self.assertRaises(ValidationError):
+            escritura.escribir(lambda: SerieIndicador(indicador=self.indicadores[0], anio=2024, valor=1,
+                                                      es_programado=True).full_clean(), SerieIndicador)
+
+
+def inserts(consultas, modelo):
+    tabla = f'INSERT INTO "{modelo._meta.db_table}"'
+    return sum(c["sql"].startswith(tabla) for c in consultas.captured_queries)
+
+
+class HistorialTests(TestCase):
+    def setUp(self):
+        self.indicadores = crear_plan(indicadores=2)
+
+    def test_valor_al_dia(self):
+        dia = lambda d: datetime(2024, 3, d, tzinfo=tz.utc)
+        with mock.patch("django.utils.timezone.now", return_value=dia(1)):
+            a = serie(self.indicadores[0], 2024, 10)
+            b = serie(self.indicadores[1], 2024, 7)
+        with mock.patch("django.utils.timezone.now", return_value=dia(5)):
+            a.valor = 12
+            a.save()
+            a.nota = "sin cambio de valor"
+            a.save()  # no anota nada
+        b_id = b.pk
+        with mock.patch("django.utils.timezone.now", return_value=dia(9)):
+            b.delete()
+
+        self.assertEqual(list(HistorialSerie.objects.order_by("id").values_list("serie_id", "tipo")),
+                         [(a.pk, "A"), (b_id, "A"), (a.pk, "M"), (b_id, "B")])
+        self.assertIsNone(historial.valor_al(a.pk, dia(1) - timedelta(seconds=1)))
+        self.assertEqual(historial.valor_al(a.pk, dia(4)), 10)
+        self.assertEqual(historial.valor_al(a.pk, dia(5)), 12)
+        self.assertEqual(historial.valor_al(b_id, dia(8)), 7)
+        self.assertIsNone(historial.valor_al(b_id, dia(9)))
+
+        def al(fecha, **filtros):
+            return {h.serie_id: historial.a_decimal(h.valor_centesimos) for h in historial.valores_al(fecha, **filtros)}
+
+        self.assertEqual(al(dia(2)), {a.pk: 10, b_id: 7})
+        self.assertEqual(al(dia(6)), {a.pk: 12, b_id: 7})
+        self.assertEqual(al(dia(10)), {a.pk: 12})
+        self.assertEqual(al(dia(6), indicador_id=self.indicadores[1].pk), {b_id: 7})
+
+    def test_lote_un_solo_insert(self):
+        filas = [serie(ind, anio, 1) for ind in self.indicadores for anio in (2023, 2024)]
+
+        def guardar():
+            for fila in filas:
+                fila.valor += 1
+                fila.save()
+
+        with CaptureQueriesContext(connection) as sueltas:
+            guardar()
+        self.assertEqual(inserts(sueltas, HistorialSerie), 4)
+        with CaptureQueriesContext(connection) as agrupadas:
+            with historial.lote():
+                guardar()
+                with historial.lote():  # anidado: se suma al exterior
+                    filas[0].delete()
+        self.assertEqual(inserts(agrupadas, HistorialSerie), 1)
+        self.assertEqual(HistorialSerie.objects.filter(tipo="M").count(), 8)
+        self.assertEqual(HistorialSerie.objects.filter(tipo="B").count(), 1)
+
+    def test_lote_con_error_no_anota(self):
+        antes = HistorialSerie.objects.count()
+        with self.assertRaises(ZeroDivisionError), transaction.atomic(), historial.lote():
+            serie(self.indicadores[0], 2022, 5)
+            1 / 0
+        self.assertEqual(HistorialSerie.objects.count(), antes)
+
+
+@mock.patch.dict(tareas.REGISTRO, {"prueba": lambda ctx, **p: f"hecha {p}"})
+class TareasTests(TestCase):
+    def envejecer(self, tarea, segundos):
+        Tarea.objects.filter(pk=tarea.pk).update(actualizado=F("actualizado") - timedelta(seconds=segundos))
+
+    def test_tomar_reclama_la_mas_antigua_una_sola_vez(self):
+        primera, segunda, tercera = (tareas.encolar("prueba", n=i) for i in range(3))
+        # otro worker ya la reclamó: el UPDATE condicional no la vuelve a tomar
+        Tarea.objects.filter(pk=primera.pk).update(estado=EstadoTarea.EN_CURSO)
+        tomada = tareas.tomar_siguiente()
+        self.assertEqual((tomada.pk, tomada.estado), (segunda.pk, EstadoTarea.EN_CURSO))
+        self.assertIsNotNone(tomada.iniciada)
+        self.assertEqual(tareas.tomar_siguiente().pk, tercera.pk)
+        self.assertIsNone(tareas.tomar_siguiente())
+
+    def test_en_curso_vencida_se_reencola(self):
+        perdida, viva = tareas.encolar("prueba"), tareas.encolar("prueba")
+        tareas.tomar_siguiente(), tareas.tomar_siguiente()
+        self.envejecer(perdida, 700)
+        self.envejecer(viva, 700)
+        tareas.Contexto(Tarea.objects.get(pk=viva.pk)).progreso(1, 10)  # el progreso renueva el plazo
+        self.assertEqual(tareas.recuperar_vencidas(plazo=600), 1)
+        perdida.refresh_from_db()
+        self.assertEqual((perdida.estado, perdida.iniciada), (EstadoTarea.PENDIENTE, None))
+        self.assertEqual(Tarea.objects.get(pk=viva.pk).estado, EstadoTarea.EN_CURSO)
+        self.assertEqual(tareas.tomar_siguiente().pk, perdida.pk)
+
+    @override_settings(CIS_TAREAS_PLAZO=600)
+    def test_el_worker_recupera_al_arrancar(self):
+        t = tareas.encolar("prueba", n=1)
+        tareas.tomar_siguiente()  # el worker que la tomó murió
+        self.assertEqual(tareas.procesar(una_vez=True), 0)  # aún dentro del plazo
+        self.envejecer(t, 601)
+        self.assertEqual(tareas.procesar(una_vez=True), 1)
+        t.refresh_from_db()
+        self.assertEqual((t.estado, t.mensaje), (EstadoTarea.TERMINADA, "hecha {'n': 1}"))
+
+
+class EstaticosTests(TestCase):
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.origen = os.path.join(carpeta.name, "origen")
+        self.destino = os.path.join(carpeta.name, "staticfiles")
+        self.escribir("vendor/chartjs/chart.umd.min.js", "/* chart */\n" + "window.Chart = 1;\n" * 40)
+        self.escribir("css/tema.css", ".logo { background: url('../img/logo.png'); }\n" * 20)
+        self.escribir("img/logo.png", "png")
+        self.escribir("js/chico.js", "var a = 1;")
+        ajustes = override_settings(
+            STATIC_ROOT=self.destino, STATICFILES_DIRS=[self.origen],
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"])
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        call_command("collectstatic", interactive=False, verbosity=0)
+        with open(os.path.join(self.destino, "staticfiles.json")) as fh:
+            self.manifiesto = json.load(fh)["paths"]
+
+    def escribir(self, ruta, texto):
+        ruta = os.path.join(self.origen, ruta)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, "w") as fh:
+            fh.write(texto)
+
+    def leer(self, ruta, modo="rb"):
+        with open(os.path.join(self.destino, ruta), modo) as fh:
+            return fh.read()
+
+    def test_bundle_con_hash_y_variantes_comprimidas(self):
+        # solo el bundle cuyas fuentes están todas (app.css/app.js esperan a vendorizar)
+        self.assertNotIn("bundle/app.js", self.manifiesto)
+        bundle = self.manifiesto["bundle/chart.js"]
+        self.assertRegex(bundle, r"^bundle/chart\.[0-9a-f]{12}\.js$")
+        crudo = self.leer(bundle)
+        self.assertIn(b"/* vendor/chartjs/chart.umd.min.js */", crudo)
+        self.assertEqual(gzip.decompress(self.leer(f"{bundle}.gz")), crudo)
+        if estaticos.brotli is not None:
+            self.assertEqual(estaticos.brotli.decompress(self.leer(f"{bundle}.br")), crudo)
+        # los url() del CSS apuntan al nombre con hash; lo chico no se comprime
+        self.assertIn(self.manifiesto["img/logo.png"].split("/")[-1], self.leer(self.manifiesto["css/tema.css"], "r"))
+        self.assertFalse(os.path.exists(os.path.join(self.destino, self.manifiesto["js/chico.js"] + ".gz")))
+
+    def test_servir_elige_variante_y_cache(self):
+        fabrica = RequestFactory()
+        bundle = self.manifiesto["bundle/chart.js"]
+        respuesta = estaticos.servir(fabrica.get("/", HTTP_ACCEPT_ENCODING="gzip, deflate"), bundle)
+        self.assertEqual(respuesta["Content-Encoding"], "gzip")
+        self.assertEqual(respuesta["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertIn("Accept-Encoding", respuesta["Vary"])
+        self.assertEqual(gzip.decompress(b"".join(respuesta.streaming_content)), self.leer(bundle))
+        sin_comprimir = estaticos.servir(fabrica.get("/"), bundle)
+        self.assertFalse(sin_comprimir.has_header("Content-Encoding"))
+        self.assertEqual(estaticos.servir(fabrica.get("/"), "css/tema.css")["Cache-Control"], "public, max-age=3600")
+        for ruta in ("../origen/css/tema.css", "no/existe.js"):
+            with self.assertRaises(Http404):
+                estaticos.servir(fabrica.get("/"), ruta)
+
+    def test_reescribe_urls_relativas_al_bundle(self):
+        css = "a{background:url(../webfonts/fa.woff2?v=5#x)} b{background:url('data:image/png;base64,AA')}"
+        self.assertEqual(
+            estaticos.reescribir_urls(css, "vendor/fontawesome/css/all.min.css", "bundle/app.css"),
+            'a{background:url("../vendor/fontawesome/webfonts/fa.woff2?v=5#x")} '
+            "b{background:url('data:image/png;base64,AA')}")
+
+
+@sin_manifiesto
+class ListadosTests(TestCase):
+    def setUp(self):
+        (ind,) = crear_plan()
+        self.objetivo = ind.operacion.accion.objetivo
+        otra_area = AreaOrganizacional.objects.create(entidad=self.objetivo.area_org.entidad, nombre="Otra")
+        self.otro = ObjetivoEstrategico.objects.create(area_org=otra_area, codigo="2", descripcion="Otro")
+        for i in range(4):
+            AccionEstrategica.objects.create(objetivo=self.otro, codigo=f"2.{i}", descripcion="x" * 400)
+
+    def acciones(self, **params):
+        return self.client.get(reverse("accion_list"), params).context
+
+    def test_filtros_declarativos(self):
+        self.assertEqual(self.acciones(objetivo=self.otro.pk)["paginator"].count, 4)
+        self.assertEqual(self.acciones(area_org=self.objetivo.area_org_id)["paginator"].count, 1)
+        ctx = self.acciones(objetivo="abc")  # valor inválido: se ignora
+        self.assertEqual(ctx["paginator"].count, 5)
+        self.assertEqual(ctx["objetivo_selected"], "abc")
+        self.assertEqual(self.acciones(q="Acción")["paginator"].count, 1)  # OR de icontains
+        self.assertEqual(self.acciones(q="Otra")["paginator"].count, 4)   # a través de objetivo__area_org
+        (ind,) = Indicador.objects.all()
+        listado = lambda **p: self.client.get(reverse("indicador_list"), p).context["paginator"].count
+        self.assertEqual(listado(tipo=ind.tipo), 1)
+        self.assertEqual(listado(tipo="NO-EXISTE"), 1)  # fuera de ``valores``: se ignora
+
+    def test_columnas_podadas_y_texto_truncado_en_sql(self):
+        with CaptureQueriesContext(connection) as consultas:
+            ctx = self.acciones(objetivo=self.otro.pk)
+        # (antes de otro request: captured_queries lee el log de la conexión, que se reinicia)
+        listado = next(c["sql"] for c in consultas.captured_queries
+                       if c["sql"].startswith('SELECT "cis_accionestrategica"."id"'))
+        self.assertIn('SUBSTR("cis_accionestrategica"."descripcion", 1, 301)', listado)
+        # ningún texto largo sale entero: solo dentro de SUBSTR(...)
+        self.assertNotRegex(listado, r'(SELECT |, )"cis_(accion|objetivo)estrategica?o?"\."descripcion"')
+        accion = ctx["acciones"][0]
+        self.assertIn("descripcion", accion.get_deferred_fields())
+        self.assertEqual(accion.descripcion_corto, "x" * 301)
+        self.assertContains(self.client.get(reverse("accion_list")), "x" * 299 + "…")
+
+    def test_consultas_constantes_con_mas_filas(self):
+        def consultas():
+            with CaptureQueriesContext(connection) as c:
+                self.client.get(reverse("accion_list"))
+            return len(c)
+        antes = consultas()
+        for i in range(4, 9):
+            AccionEstrategica.objects.create(objetivo=self.otro, codigo=f"2.{i}", descripcion="y")
+        self.assertEqual(consultas(), antes)
+
+
+@sin_manifiesto
+class FragmentosTests(TestCase):
+    def setUp(self):
+        caches["fragmentos"].clear()
+        (self.ind,) = crear_plan()
+        self.serie = serie(self.ind, 2024, 10)
+
+    def lista(self, nombre):
+        return self.client.get(reverse(nombre)).content.decode()
+
+    def test_card_de_indicador_se_reutiliza_hasta_que_cambia(self):
+        self.assertIn("Indicador 0", self.lista("indicador_list"))
+        # update() no toca ``actualizado``: la card cacheada sigue sirviéndose
+        Indicador.objects.filter(pk=self.ind.pk).update(nombre="Sin invalidar")
+        self.assertNotIn("Sin invalidar", self.lista("indicador_list"))
+        ind = Indicador.objects.get(pk=self.ind.pk)
+        ind.nombre = "Renombrado"
+        ind.save()
+        self.assertIn("Renombrado", self.lista("indicador_list"))
+        operacion = Operacion.objects.get(pk=ind.operacion_id)
+        operacion.codigo = "77"
+        operacion.save()
+        self.assertIn("Op. 77", self.lista("indicador_list"))
+
+    def test_card_de_serie_cambia_con_su_indicador(self):
+        self.assertIn("Indicador 0", self.lista("serie_list"))
+        ind = Indicador.objects.get(pk=self.ind.pk)
+        ind.nombre = "Renombrado"
+        ind.save()
+        html = self.lista("serie_list")
+        self.assertIn("Renombrado", html)
+        self.assertNotIn("Indicador 0", html)
+
+    def test_card_de_un_objeto_borrado_no_reaparece(self):
+        titulo = '<h5 class="card-title mb-1 fw-semibold">Otro</h5>'
+        otro = Indicador.objects.create(operacion=self.ind.operacion, nombre="Otro")
+        self.assertIn(titulo, self.lista("indicador_list"))
+        otro.delete()
+        html = self.lista("indicador_list")
+        self.assertNotIn(titulo, html)
+        self.assertIn("Indicador 0", html)
+
+
+class BootstrapExtrasTests(TestCase):
+    def render(self, codigo, **contexto):
+        return engines["django"].from_string("{% load bootstrap_extras %}" + codigo).render(contexto)
+
+    def test_render_bs_field_no_muta_el_widget(self):
+        crear_plan()
+        form = IndicadorForm()
+        antes = {nombre: dict(campo.widget.attrs) for nombre, campo in form.fields.items()}
+        codigo = "{% for f in form %}{% render_bs_field f %}{% endfor %}"
+        primera = self.render(codigo, form=form)
+        self.assertEqual(self.render(codigo, form=form), primera)
+        self.assertEqual(self.render(codigo, form=IndicadorForm()), primera)
+        self.assertEqual({nombre: campo.widget.attrs for nombre, campo in form.fields.items()}, antes)
+        self.assertIn('<select name="operacion" class="form-select"', primera)
+        self.assertNotIn("form-select form-select", primera)
+        self.assertNotIn("form-control form-control", primera)
+
+    def test_render_bs_field_agrega_la_clase_que_falta(self):
+        class Simple(forms.Form):
+            anio = forms.IntegerField()
+            tipo = forms.ChoiceField(choices=[("A", "A")])
+        form = Simple()
+        html = self.render("{% render_bs_field form.anio %}{% render_bs_field form.tipo %}", form=form)
+        self.assertIn('class="form-control"', html)
+        self.assertIn('<select name="tipo" class="form-select"', html)
+        self.assertEqual([f.widget.attrs for f in form.fields.values()], [{}, {}])
+
+    def test_add_class_y_add_attrs_sin_repetir_ni_mutar(self):
+        form = IndicadorForm()
+        widget = form.fields["nombre"].widget
+        antes = dict(widget.attrs)
+        for _ in range(2):
+            html = self.render("{{ form.nombre|add_class:'form-control is-invalid' }}", form=form)
+            self.assertIn('class="form-control is-invalid"', html)
+        html = self.render("{{ form.nombre|add_attrs:'placeholder=Buscar...,data-foo=bar' }}", form=form)
+        self.assertIn('placeholder="Buscar..."', html)
+        self.assertIn('data-foo="bar"', html)
+        self.assertIn('class="form-control"', html)  # as_widget ya combina con widget.attrs
+        self.assertEqual(widget.attrs, antes)
+
+
+@sin_manifiesto
+class AdminTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_superuser("admin", "admin@example.com", "x")
+        self.client.force_login(admin)
+        (self.ind,) = crear_plan()
+
+    def consultas(self, url, params=None):
+        with CaptureQueriesContext(connection) as c:
+            respuesta = self.client.get(url, params)
+        self.assertEqual(respuesta.status_code, 200)
+        return [q["sql"] for q in c.captured_queries]
+
+    def test_changelists_con_consultas_constantes(self):
+        for anio in range(2020, 2025):
+            serie(self.ind, anio, anio)
+        urls = [reverse(f"admin:cis_{modelo}_changelist")
+                for modelo in ("indicador", "serieindicador", "objetivoestrategico", "accionestrategica")]
+        antes = [len(self.consultas(url)) for url in urls]
+        for sigla in "GHIJ":
+            for ind in crear_plan(sigla, indicadores=3):
+                serie(ind, 2024, 1)
+        self.assertEqual([len(self.consultas(url)) for url in urls], antes)
+
+    def test_sin_conteo_total_al_filtrar(self):
+        crear_plan("G", indicadores=3)
+        sql = self.consultas(reverse("admin:cis_indicador_changelist"), {"tipo": self.ind.tipo})
+        self.assertEqual(sum("COUNT(*)" in c for c in sql), 1)  # solo el del paginador, filtrado
+
+    def test_objetivos_solo_con_area_elegida(self):
+        objetivo = self.ind.operacion.accion.objetivo
+        url = reverse("admin:cis_indicador_changelist")
+        self.assertNotContains(self.client.get(url), f"?objetivo={objetivo.pk}")
+        self.assertContains(self.client.get(url, {"area_org": objetivo.area_org_id}),
+                            f"objetivo={objetivo.pk}")
+
+    def test_inline_solo_los_ultimos_anios(self):
+        for anio in range(2015, 2025):
+            serie(self.ind, anio, anio)
+        respuesta = self.client.get(reverse("admin:cis_indicador_change", args=[self.ind.pk]))
+        formset = respuesta.context["inline_admin_formsets"][0].formset
+        self.assertEqual(sorted(f.instance.anio for f in formset.initial_forms), list(range(2019, 2025)))
+
+
+@sin_manifiesto
+class BorradoTests(TestCase):
+    def setUp(self):
+        self.indicadores = crear_plan(indicadores=3)
+        self.area = self.indicadores[0].operacion.accion.objetivo.area_org
+        self.fuente = FuenteInformacion.objects.create(nombre="Censo")
+        for ind in self.indicadores:
+            ind.fuentes.add(self.fuente)
+            for anio in range(2020, 2025):
+                serie(ind, anio, anio)
+
+    def test_conteos_por_nivel(self):
+        self.assertEqual(borrado.conteos(self.area), {
+            "Series anuales": 15, "Vínculos con fuentes": 3, "Indicadores": 3, "Operaciones": 1,
+            "Acciones estratégicas": 1, "Objetivos estratégicos": 1, "Versiones de plan": 0})
+
+    def test_por_lotes_de_abajo_hacia_arriba(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(borrado.borrar(self.area, lote=4), 25)
+        borrados = [c["sql"].split('"')[1] for c in consultas.captured_queries if c["sql"].startswith("DELETE")]
+        self.assertEqual(borrados.count("cis_serieindicador"), 4)  # 15 series en lotes de 4
+        orden = list(dict.fromkeys(borrados))
+        self.assertEqual(orden, ["cis_serieindicador", "cis_indicador_fuentes", "cis_indicador", "cis_operacion",
+                                 "cis_accionestrategica", "cis_objetivoestrategico", "cis_areaorganizacional"])
+        self.assertFalse(SerieIndicador.objects.exists() or Indicador.objects.exists()
+                         or AreaOrganizacional.objects.exists())
+        self.assertTrue(FuenteInformacion.objects.filter(pk=self.fuente.pk).exists())
+        self.assertTrue(Entidad.objects.exists())
+
+    def test_lapidas_e_historial_de_bajas(self):
+        series = set(SerieIndicador.objects.values_list("pk", flat=True))
+        borrado.borrar(self.area, lote=4)
+        lapidas = {}
+        for modelo, pk in Eliminado.objects.values_list("modelo", "objeto_id"):
+            lapidas.setdefault(modelo, set()).add(pk)
+        self.assertEqual(lapidas["cis.serieindicador"], series)
+        self.assertEqual(lapidas["cis.indicador"], {i.pk for i in self.indicadores})
+        self.assertEqual(lapidas["cis.areaorganizacional"], {self.area.pk})
+        self.assertNotIn("cis.indicador_fuentes", lapidas)  # la tabla M2M no está en el feed
+        bajas = HistorialSerie.objects.filter(tipo=HistorialSerie.BAJA)
+        self.assertEqual(set(bajas.values_list("serie_id", flat=True)), series)
+
+    def test_vista_borra_en_el_request(self):
+        respuesta = self.client.post(reverse("area_org_delete", args=[self.area.pk]))
+        self.assertRedirects(respuesta, reverse("area_org_list"), fetch_redirect_response=False)
+        self.assertFalse(AreaOrganizacional.objects.exists())
+        self.assertFalse(Tarea.objects.exists())
+
+    def test_vista_encola_si_supera_el_umbral(self):
+        with mock.patch.object(borrado, "UMBRAL_SEGUNDO_PLANO", 20):
+            confirmacion = self.client.get(reverse("area_org_delete", args=[self.area.pk]))
+            self.assertEqual(confirmacion.context["conteo_total"], 24)
+            respuesta = self.client.post(reverse("area_org_delete", args=[self.area.pk]))
+        (tarea,) = Tarea.objects.all()
+        self.assertRedirects(respuesta, reverse("tarea_detalle", args=[tarea.pk]), fetch_redirect_response=False)
+        self.assertEqual((tarea.tipo, tarea.parametros),
+                         ("borrar_jerarquia", {"modelo": "cis.areaorganizacional", "pk": self.area.pk}))
+        self.assertTrue(SerieIndicador.objects.exists())
+        self.assertEqual(tareas.procesar(una_vez=True), 1)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, EstadoTarea.TERMINADA)
+        self.assertFalse(AreaOrganizacional.objects.exists())
+        self.assertEqual(Eliminado.objects.filter(modelo="cis.serieindicador").count(), 15)
+
+
+class PaquetesTests(TestCase):
+    def setUp(self):
+        (self.ind,) = crear_plan()
+        (self.otro,) = crear_plan("G")
+        crear_plan("H")  # área sin series
+        for ind, ejecutado in ((self.ind, 8), (self.otro, 5)):
+            serie(ind, 2023, 10)
+            serie(ind, 2023, ejecutado, es_programado=False)
+            serie(ind, 2024, 10)
+        cierres.cerrar(2023)
+        self.salida = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.salida)
+
+    def test_una_lectura_repartida_por_area(self):
+        with CaptureQueriesContext(connection) as consultas:
+            areas = paquetes.datos_por_area()
+        self.assertLessEqual(len(consultas), 4)  # áreas, años cerrados, instantánea y en vivo
+        por_nombre = {a["nombre"].split(" ")[1]: a for a in areas}
+        self.assertEqual([(f["anio"], f["ejecutado"]) for f in por_nombre["F"]["filas"]], [(2023, 8), (2024, 0)])
+        self.assertEqual(len(por_nombre["G"]["filas"]), 2)
+        self.assertEqual(por_nombre["H"]["filas"], [])
+        self.assertEqual([f["anio"] for f in paquetes.datos_por_area(2024)[0]["filas"]], [2024])
+
+    def test_genera_archivos_e_indice(self):
+        resultados, _, _ = paquetes.generar(self.salida, procesos=2)
+        self.assertEqual([r["registros"] for r in resultados], [2, 2, 0])
+        area = resultados[0]
+        self.assertEqual(sorted(os.path.basename(a) for a in area["archivos"]),
+                         ["cumplimiento.csv", "cumplimiento.html", "cumplimiento.xlsx"])
+        with open(os.path.join(self.salida, area["carpeta"], "cumplimiento.csv"), encoding="utf-8") as fh:
+            self.assertEqual(list(csv.reader(fh)), [
+                paquetes.ENCABEZADOS,
+                ["2023", "9", "Indicador 0", "10.0", "8.0", "80.0"],  # de la instantánea del cierre
+                ["2024", "9", "Indicador 0", "10.0", "0.0", "0.0"],
+            ])
+        with zipfile.ZipFile(os.path.join(self.salida, area["carpeta"], "cumplimiento.xlsx")) as z:
+            hoja = z.read("xl/worksheets/sheet1.xml").decode()
+        self.assertIn("<t xml:space=\"preserve\">Indicador 0</t>", hoja)
+        self.assertEqual(hoja.count("<row "), 3)
+        with open(os.path.join(self.salida, "index.json"), encoding="utf-8") as fh:
+            indice = json.load(fh)
+        self.assertEqual([a["carpeta"] for a in indice["areas"]], [r["carpeta"] for r in resultados])
+        self.assertTrue(os.path.exists(os.path.join(self.salida, "index.html")))
+
+    def test_comando(self):
+        with self.assertRaises(CommandError):
+            call_command("generar_paquetes_area", self.salida, formatos="pdf", stdout=io.StringIO())
+        call_command("generar_paquetes_area", self.salida, anio=2024, formatos="csv", procesos=1,
+                     stdout=io.StringIO())
+        carpetas = [c for c in sorted(os.listdir(self.salida)) if not c.startswith("index")]
+        self.assertEqual(len(carpetas), 3)
+        self.assertEqual(os.listdir(os.path.join(self.salida, carpetas[0])), ["cumplimiento.csv"])
+
+
+@sin_manifiesto
+class SeriesEnParesTests(TestCase):
+    def setUp(self):
+        (self.ind,) = crear_plan()
+        (self.otro,) = crear_plan("G", formula_texto="AV = ejecutado / meta", meta_valor=20)
+        self.prog = serie(self.ind, 2023, 10)
+        self.ejec = serie(self.ind, 2023, 8, es_programado=False)
+        self.sola = serie(self.ind, 2024, 12)
+        serie(self.otro, 2023, 10)
+        serie(self.otro, 2023, 5, es_programado=False)
+
+    def pares(self, **params):
+        return self.client.get(reverse("serie_list"), {"vista": "pares", **params}).context
+
+    def test_una_fila_por_indicador_y_anio(self):
+        with CaptureQueriesContext(connection) as consultas:
+            ctx = self.pares()
+        filas = {(p["indicador_id"], p["anio"]): p for p in ctx["series"]}
+        self.assertEqual(ctx["paginator"].count, 3)
+        par = filas[(self.ind.pk, 2023)]
+        self.assertEqual((par["programado"], par["ejecutado"], par["prog_id"], par["ejec_id"]),
+                         (10, 8, self.prog.pk, self.ejec.pk))
+        self.assertAlmostEqual(par["cumplimiento"], 80.0)
+        sola = filas[(self.ind.pk, 2024)]
+        self.assertEqual((sola["ejecutado"], sola["ejec_id"], sola["prog_id"]), (None, None, self.sola.pk))
+        self.assertAlmostEqual(filas[(self.otro.pk, 2023)]["cumplimiento"], 25.0)  # fórmula propia: 5 / 20
+        self.assertNotIn("indicador__formula_texto", par)
+        agrupadas = [c["sql"] for c in consultas.captured_queries if "GROUP BY" in c["sql"]]
+        self.assertEqual(len(agrupadas), 2)  # el COUNT del paginador y la página
+
+    def test_filtros_que_no_parten_el_par(self):
+        self.assertEqual(self.pares(indicador=self.ind.pk)["paginator"].count, 2)
+        self.assertEqual(self.pares(anio=2023)["paginator"].count, 2)
+        self.assertEqual(self.pares(tipo="ejec")["paginator"].count, 3)  # se ignora en este modo
+        self.assertEqual(self.pares(q="Indicador")["paginator"].count, 3)
+        SerieIndicador.objects.filter(pk=self.ejec.pk).update(nota="revisar")
+        self.assertEqual(self.pares(q="revisar")["paginator"].count, 0)  # la nota es de un solo lado
+
+    def test_html(self):
+        respuesta = self.client.get(reverse("serie_list"), {"vista": "pares"})
+        self.assertContains(respuesta, reverse("serie_update", args=[self.ejec.pk]))
+        self.assertContains(respuesta, "80.00%")
+        self.assertContains(respuesta, '<select name="tipo" class="form-select" disabled>')
+
+
+class MapaCalorTests(TestCase):
+    def setUp(self):
+        uno, dos = crear_plan(indicadores=2)
+        (self.otro,) = crear_plan("G", formula_texto="AV = ejecutado / meta", meta_valor=20)
+        crear_plan("H")  # área sin series
+        for ind, ejecutado in ((uno, 8), (dos, 4), (self.otro, 5)):
+            serie(ind, 2023, 10)
+            serie(ind, 2023, ejecutado, es_programado=False)
+        serie(uno, 2025, 10)  # sin ejecutada: 0 %
+        serie(dos, 2025, 0)  # programado 0: no cuenta
+        self.ejecutada = serie(uno, 2025, 0, es_programado=False)
+
+    def celdas(self, m):
+        ancho = len(m["columnas"])
+        return {(fila.split(" ")[1], anio): (m["cumplimiento"][i * ancho + j], m["indicadores"][i * ancho + j])
+                for i, fila in enumerate(m["filas"]) for j, anio in enumerate(m["columnas"])}
+
+    def test_celdas_por_area_y_anio(self):
+        with CaptureQueriesContext(connection) as consultas:
+            m = mapa_calor.matriz()
+        self.assertEqual(len(consultas), 4)  # años cerrados, textos de fórmula, celdas en vivo, áreas
+        self.assertEqual(m["columnas"], [2023, 2024, 2025])  # 2024 sin datos, pero la columna está
+        self.assertEqual(len(m["cumplimiento"]), len(m["filas"]) * 3)
+        self.assertEqual(self.celdas(m), {
+            ("F", 2023): (60.0, 2), ("F", 2024): (None, 0), ("F", 2025): (0.0, 1),
+            ("G", 2023): (25.0, 1), ("G", 2024): (None, 0), ("G", 2025): (None, 0),  # fórmula propia: 5 / 20
+            ("H", 2023): (None, 0), ("H", 2024): (None, 0), ("H", 2025): (None, 0),
+        })
+
+    def test_anio_cerrado_sale_de_la_instantanea(self):
+        cierres.cerrar(2023)
+        SerieIndicador.objects.filter(anio=2023, es_programado=False).update(valor=10)  # sin pasar por save()
+        celdas = self.celdas(mapa_calor.matriz())
+        self.assertEqual((celdas[("F", 2023)], celdas[("G", 2023)]), ((60.0, 2), (25.0, 1)))
+        self.ejecutada.valor = 5
+        self.ejecutada.save()
+        self.assertEqual(self.celdas(mapa_calor.matriz())[("F", 2025)], (50.0, 1))
+
+    def test_json_columnar_sin_espacios(self):
+        respuesta = self.client.get(reverse("mapa_calor_api"))
+        self.assertNotIn(b", ", respuesta.content)
+        self.assertNotIn(b": ", respuesta.content)
+        self.assertEqual(respuesta.json(), mapa_calor.matriz())
+
+
+class ArbolTests(TestCase):
+    def setUp(self):
+        self.uno, self.dos = crear_plan(indicadores=2)
+        self.operacion = self.uno.operacion
+        self.accion = self.operacion.accion
+        for ind, ejecutado in ((self.uno, 8), (self.dos, 4)):
+            serie(ind, 2024, 10)
+            serie(ind, 2024, ejecutado, es_programado=False)
+
+    def api(self, **params):
+        respuesta = self.client.get(reverse("arbol_api"), params)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_de_la_raiz_a_las_hojas(self):
+        raiz = self.api(anio=2024)
+        self.assertEqual(raiz["nivel"], "entidad")
+        (entidad,) = raiz["hijos"]
+        self.assertEqual((entidad["etiqueta"], entidad["hijos"], entidad["cumplimiento"], entidad["indicadores"]),
+                         ("F — Facultad F", 1, 60.0, 2))
+        nodo, clave = entidad, "entidad"
+        for esperado in ("area", "objetivo", "accion", "operacion"):
+            pagina = self.api(nivel=clave, id=nodo["id"], anio=2024)
+            self.assertEqual((pagina["nivel"], pagina["hoja"], pagina["siguiente"]), (esperado, False, None))
+            (nodo,) = pagina["hijos"]
+            self.assertEqual(nodo["cumplimiento"], 60.0)
+            clave = esperado
+        hojas = self.api(nivel="operacion", id=self.operacion.pk, anio=2024)
+        self.assertTrue(hojas["hoja"])
+        self.assertEqual([(h["cumplimiento"], h["hijos"], h["url"]) for h in hojas["hijos"]], [
+            (80.0, 0, reverse("indicador_update", args=[self.uno.pk])),
+            (40.0, 0, reverse("indicador_update", args=[self.dos.pk]))])
+        self.assertEqual(nodo["url"], reverse("operacion_update", args=[self.operacion.pk]))
+
+    def test_consultas_constantes_y_etiquetas_cortadas(self):
+        def consultas():
+            with CaptureQueriesContext(connection) as c:
+                self.api(nivel="accion", id=self.accion.pk, anio=2024)
+            return len(c)
+        antes = consultas()
+        self.assertEqual(antes, 4)  # ¿año cerrado?, hijos con sus conteos, textos de fórmula, resumen
+        for i in range(5):
+            op = Operacion.objects.create(accion=self.accion, codigo=f"9.{i}", descripcion="z" * 300)
+            serie(Indicador.objects.create(operacion=op, nombre="Otro"), 2024, 10)
+        self.assertEqual(consultas(), antes)
+        etiqueta = self.api(nivel="accion", id=self.accion.pk)["hijos"][-1]["etiqueta"]
+        self.assertEqual(etiqueta, "9.4 — " + "z" * arbol.LARGO_ETIQUETA + "…")
+
+    def test_paginado(self):
+        for i in range(3):
+            Indicador.objects.create(operacion=self.operacion, nombre=f"Extra {i}")
+        with mock.patch.object(arbol, "LIMITE", 2):
+            primera = self.api(nivel="operacion", id=self.operacion.pk)
+            segunda = self.api(nivel="operacion", id=self.operacion.pk, desde=primera["siguiente"])
+            tercera = self.api(nivel="operacion", id=self.operacion.pk, desde=segunda["siguiente"])
+        self.assertEqual((primera["siguiente"], segunda["siguiente"], tercera["siguiente"]), (2, 4, None))
+        ids = [h["id"] for p in (primera, segunda, tercera) for h in p["hijos"]]
+        self.assertEqual(sorted(ids), sorted(Indicador.objects.values_list("pk", flat=True)))
+
+    def test_anio_cerrado_desde_la_instantanea(self):
+        cierres.cerrar(2024)
+        SerieIndicador.objects.filter(es_programado=False).update(valor=10)  # sin pasar por save()
+        (entidad,) = self.api(anio=2024)["hijos"]
+        self.assertEqual((entidad["cumplimiento"], entidad["indicadores"]), (60.0, 2))
+        hojas = self.api(nivel="operacion", id=self.operacion.pk, anio=2024)["hijos"]
+        self.assertEqual([h["cumplimiento"] for h in hojas], [80.0, 40.0])
+
+    def test_pedidos_invalidos(self):
+        for params in ({"nivel": "indicador", "id": self.uno.pk}, {"nivel": "planeta", "id": 1},
+                       {"nivel": "area"}, {"nivel": "area", "id": "x"}):
+            respuesta = self.client.get(reverse("arbol_api"), params)
+            self.assertEqual(respuesta.status_code, 400, params)
+            self.assertIn("error", respuesta.json())
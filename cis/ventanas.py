@@ -0,0 +1,127 @@
+# planificacion/ventanas.py
+"""
+Reportes calculados con funciones de ventana en la base (LAG, SUM OVER,
+RANK OVER), para que solo salgan las filas finales y no el reporte largo.
+
+- ``evolucion``: por indicador y año, lo ejecutado, el año anterior (LAG),
+  la variación interanual y el acumulado (SUM … OVER) frente a ``meta_valor``.
+- ``ranking``: áreas u operaciones de un año ordenadas por cumplimiento
+  (RANK … OVER), con los N primeros o los N últimos.
+
+Como en reportes.py, un año cerrado se rankea sobre ``CierreNivel`` y uno
+abierto en vivo; en vivo el cumplimiento de cada indicador es su fórmula
+traducida a SQL (``formulas.a_sql``), promediada por nodo entre los
+indicadores con programación, igual que el panel y el cierre.
+
+``unique_together`` (indicador, año, es_programado) garantiza una fila por
+indicador, año y tipo, así que las ventanas corren sobre las series sin
+agrupar antes.
+"""
+from django.db.models import Avg, Case, CharField, Count, F, FilteredRelation, FloatField, Max, Q, Sum, Value, When, Window
+from django.db.models.functions import Cast, Coalesce, Concat, Lag, NullIf, Rank
+
+from . import formulas
+from .models import AnioCerrado, CierreNivel, Indicador, NivelCierre, SerieIndicador
+
+_AREA = "operacion__accion__objetivo__area_org"
+NIVELES = {
+    # nivel → (campo del nodo desde Indicador, nombre como lo guarda el cierre)
+    NivelCierre.AREA: (f"{_AREA}_id",
+                       Concat(f"{_AREA}__nombre", Value(" ("),
+                              Coalesce(NullIf(f"{_AREA}__entidad__sigla", Value("")), f"{_AREA}__entidad__nombre"),
+                              Value(")"), output_field=CharField())),
+    NivelCierre.OPERACION: ("operacion_id", F("operacion__codigo")),
+}
+TOP_MAXIMO = 100
+
+
+def _float(campo):
+    return Cast(campo, FloatField())
+
+
+def evolucion(indicadores=None, anio=None):
+    """
+    Filas (indicador, año) de lo ejecutado con ``anterior``, ``variacion``,
+    ``variacion_pct``, ``acumulado`` y ``avance_meta_pct`` (acumulado / meta).
+    Con ``anio`` solo ese año, pero calculado con los años previos: el WHERE
+    deja ``anio <= año`` y el año se elige después de las ventanas.
+    """
+    qs = SerieIndicador.objects.filter(es_programado=False, valor__isnull=False)
+    if indicadores is not None:
+        qs = qs.filter(indicador__in=indicadores)
+    if anio:
+        qs = qs.filter(anio__lte=anio)
+    por_indicador = {"partition_by": [F("indicador_id")], "order_by": F("anio").asc()}
+    qs = qs.annotate(
+        ejecutado=_float("valor"),
+        anterior=Window(Lag(_float("valor")), **por_indicador),
+        acumulado=Window(Sum(_float("valor")), **por_indicador),
+        meta=_float("indicador__meta_valor"),
+    ).annotate(
+        variacion=F("ejecutado") - F("anterior"),
+        variacion_pct=(F("ejecutado") - F("anterior")) * Value(100.0) / F("anterior"),
+        avance_meta_pct=F("acumulado") * Value(100.0) / F("meta"),
+    )
+    if anio:
+        # filtrar por una ventana lo aplica por fuera (subconsulta), ya calculadas LAG y SUM
+        qs = qs.annotate(anio_max=Window(Max("anio"), partition_by=[F("indicador_id")])).filter(
+            anio=F("anio_max"), anio_max=anio)
+    return qs.values("indicador_id", "anio", "ejecutado", "anterior", "variacion", "variacion_pct", "acumulado",
+                     "meta", "avance_meta_pct", indicador_nombre=F("indicador__nombre"),
+                     indicador_codigo=F("indicador__codigo"), operacion_codigo=F("indicador__operacion__codigo"),
+                     ).order_by("operacion_codigo", "indicador_nombre", "anio")
+
+
+def _ranking_vivo(anio, nivel, indicadores):
+    nodo, nombre = NIVELES[nivel]
+    qs = Indicador.objects.all() if indicadores is None else indicadores
+    textos = qs.order_by().values_list("formula_texto", flat=True).distinct()
+    # una fila por indicador: su serie programada y la ejecutada del año, unidas por LEFT JOIN
+    qs = qs.annotate(
+        prog=FilteredRelation("series", condition=Q(series__anio=anio, series__es_programado=True)),
+        ejec=FilteredRelation("series", condition=Q(series__anio=anio, series__es_programado=False)),
+    )
+    cumplimiento = formulas.a_sql(textos, {
+        "programado": Coalesce(_float("prog__valor"), Value(0.0)),
+        "ejecutado": Coalesce(_float("ejec__valor"), Value(0.0)),
+        "linea_base": _float("linea_base"),
+        "meta": _float("meta_valor"),
+    })
+    # las mismas poblaciones que CierreNivel: el área cuenta todos sus indicadores
+    # (como el panel) y los demás niveles los que tienen alguna serie en el año;
+    # el promedio solo entre los que tienen programación
+    if nivel == NivelCierre.AREA:
+        total = Count("id")
+    else:
+        total = Count("id", filter=Q(prog__id__isnull=False) | Q(ejec__id__isnull=False))
+    return (qs.values(nodo_id=F(nodo))
+            .annotate(nombre=Max(nombre), total_indicadores=total,
+                      programado=Sum(Coalesce(_float("prog__valor"), Value(0.0))),
+                      ejecutado=Sum(Coalesce(_float("ejec__valor"), Value(0.0))),
+                      prom_cumplimiento=Avg(Case(When(prog__valor__gt=0, then=cumplimiento))))
+            .filter(programado__gt=0))
+
+
+def _ranking_cerrado(anio, nivel):
+    return (CierreNivel.objects.filter(anio=anio, nivel=nivel, programado__gt=0)
+            .values("nodo_id", "nombre", "total_indicadores", "programado", "ejecutado", "prom_cumplimiento"))
+
+
+def ranking(anio, nivel=NivelCierre.AREA, n=10, ultimos=False, indicadores=None):
+    """
+    Los ``n`` nodos de ``nivel`` con mayor cumplimiento en ``anio`` (o menor,
+    con ``ultimos``). ``puesto`` es RANK() sobre todo el nivel (empates
+    comparten puesto); el corte por ``n`` también va en la base.
+    ``indicadores`` restringe el conjunto (solo en años abiertos: el cierre
+    ya está agregado por nodo).
+    """
+    if nivel not in NIVELES:
+        raise ValueError(f"Nivel no soportado: {nivel}.")
+    n = max(1, min(int(n), TOP_MAXIMO))
+    cerrado = AnioCerrado.objects.filter(anio=anio).exists()
+    qs = _ranking_cerrado(anio, nivel) if cerrado else _ranking_vivo(anio, nivel, indicadores)
+    orden = F("prom_cumplimiento").asc() if ultimos else F("prom_cumplimiento").desc()
+    return (qs.annotate(puesto=Window(Rank(), order_by=[F("prom_cumplimiento").desc()]),
+                        corte=Window(Rank(), order_by=[orden]))
+            .filter(corte__lte=n)
+            .order_by(orden, "nombre"))
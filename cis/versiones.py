@@ -0,0 +1,188 @@
+# planificacion/versiones.py
+"""
+Versiones de plan: clonado masivo de un árbol de área y comparación entre versiones.
+
+``clonar`` copia objetivos → acciones → operaciones → indicadores → fuentes →
+series a un área nueva. Cada nivel se lee con un solo ``values()`` y se
+inserta con ``bulk_create`` (que devuelve los pk nuevos); el mapa
+{pk viejo: pk nuevo} de un nivel es el que reasigna las FKs del siguiente.
+Son 1 SELECT + ceil(n / LOTE) INSERT por nivel, sin instanciar el árbol viejo.
+
+``comparar`` empareja dos versiones por clave natural (los ``unique_together``
+de cada modelo: código del objetivo, de la acción, …, nombre del indicador,
+año y tipo de la serie) y devuelve altas, bajas y campos cambiados por nivel.
+"""
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import historial
+from .models import (AccionEstrategica, AnioCerrado, AreaOrganizacional, HistorialSerie, Indicador, ObjetivoEstrategico,
+                     Operacion, SerieIndicador, VersionPlan)
+
+LOTE = 1000
+
+SERIES_TODAS = "todas"
+SERIES_PROGRAMADAS = "programadas"
+SERIES_NINGUNA = "ninguna"
+
+# (modelo, FK al padre, ruta hasta el área, campos copiados, campos de año a desplazar)
+NIVELES = [
+    (ObjetivoEstrategico, "area_org", "area_org",
+     ("area_estrategica_id", "codigo", "descripcion"), ()),
+    (AccionEstrategica, "objetivo", "objetivo__area_org",
+     ("codigo", "descripcion"), ()),
+    (Operacion, "accion", "accion__objetivo__area_org",
+     ("codigo", "descripcion"), ()),
+    (Indicador, "operacion", "operacion__accion__objetivo__area_org",
+     ("codigo", "nombre", "tipo", "unidad", "formula_texto", "anio_linea_base", "linea_base",
+      "anio_meta", "meta_valor", "observaciones"), ("anio_linea_base", "anio_meta")),
+    (SerieIndicador, "indicador", "indicador__operacion__accion__objetivo__area_org",
+     ("anio", "valor", "es_programado", "nota"), ("anio",)),
+]
+
+
+def _copiar_nivel(modelo, fk, ruta, campos, anios, origen, mapa_padres, desplazar, filtro=None):
+    qs = modelo._default_manager.filter(**{ruta: origen.pk})
+    if filtro:
+        qs = qs.filter(**filtro)
+    filas = list(qs.order_by("pk").values("pk", f"{fk}_id", *campos))
+    nuevos = []
+    for f in filas:
+        datos = {c: f[c] for c in campos}
+        for c in anios:
+            datos[c] += desplazar
+        nuevos.append(modelo(**{f"{fk}_id": mapa_padres[f[f"{fk}_id"]]}, **datos))
+    creados = modelo._default_manager.bulk_create(nuevos, batch_size=LOTE)
+    if modelo is SerieIndicador:
+        momento = timezone.now()
+        historial.registrar(historial.fila(o, HistorialSerie.ALTA, momento) for o in creados)
+    return {f["pk"]: o.pk for f, o in zip(filas, creados)}
+
+
+def version_de(area, nombre="Original"):
+    """La versión dueña de ``area`` (la crea si el área todavía no estaba versionada)."""
+    version = VersionPlan.objects.filter(area_org=area).first()
+    return version or VersionPlan.objects.create(nombre=nombre, area_org=area)
+
+
+def anios_cerrados_destino(area, desplazar_anios=0, series=SERIES_TODAS):
+    """Años cerrados en los que caerían las series copiadas (ya desplazadas)."""
+    if series == SERIES_NINGUNA:
+        return []
+    qs = SerieIndicador.objects.filter(indicador__operacion__accion__objetivo__area_org=area.pk)
+    if series == SERIES_PROGRAMADAS:
+        qs = qs.filter(es_programado=True)
+    return list(qs.annotate(destino=F("anio") + desplazar_anios)
+                .filter(destino__in=AnioCerrado.objects.values("anio"))
+                .order_by("destino").values_list("destino", flat=True).distinct())
+
+
+def clonar(area, nombre, nombre_area=None, desplazar_anios=0, series=SERIES_TODAS, notas=""):
+    """
+    Copia el árbol de ``area`` a un área nueva y la registra como versión
+    derivada. Se niega (``ValidationError``) si alguna serie caería en un año
+    cerrado: ni la instantánea ni el cálculo en vivo la verían.
+    """
+    db = router.db_for_write(AreaOrganizacional)
+    with transaction.atomic(using=db):
+        cerrados = anios_cerrados_destino(area, desplazar_anios, series)
+        if cerrados:
+            raise ValidationError(
+                f"Las series copiadas caerían en años cerrados ({', '.join(map(str, cerrados))}); "
+                "cambia el desplazamiento, no copies series o reabre esos años.")
+        base = version_de(area)
+        nueva = AreaOrganizacional.objects.create(
+            entidad_id=area.entidad_id, responsable=area.responsable,
+            nombre=(nombre_area or f"{area.nombre} — {nombre}")[:180])
+        mapa = {area.pk: nueva.pk}
+        for modelo, fk, ruta, campos, anios in NIVELES:
+            if modelo is SerieIndicador:
+                if series == SERIES_NINGUNA:
+                    break
+                filtro = {"es_programado": True} if series == SERIES_PROGRAMADAS else None
+            else:
+                filtro = None
+            mapa = _copiar_nivel(modelo, fk, ruta, campos, anios, area, mapa, desplazar_anios, filtro)
+            if modelo is Indicador:
+                _copiar_fuentes(area, mapa)
+        return VersionPlan.objects.create(nombre=nombre, area_org=nueva, base=base,
+                                          desplazamiento_anios=desplazar_anios, notas=notas)
+
+
+def _copiar_fuentes(area, mapa_indicadores):
+    through = Indicador.fuentes.through
+    filas = (through.objects.filter(indicador__operacion__accion__objetivo__area_org=area.pk)
+             .values_list("indicador_id", "fuenteinformacion_id"))
+    through.objects.bulk_create(
+        [through(indicador_id=mapa_indicadores[i], fuenteinformacion_id=f) for i, f in filas],
+        batch_size=LOTE)
+
+
+# ---------- Comparación ----------
+# (etiqueta, modelo, ruta hasta el área, clave natural, campos comparados)
+NIVELES_DIFF = [
+    ("Objetivos", ObjetivoEstrategico, "area_org",
+     ("codigo",), ("descripcion", "area_estrategica__nombre")),
+    ("Acciones", AccionEstrategica, "objetivo__area_org",
+     ("objetivo__codigo", "codigo"), ("descripcion",)),
+    ("Operaciones", Operacion, "accion__objetivo__area_org",
+     ("accion__objetivo__codigo", "accion__codigo", "codigo"), ("descripcion",)),
+    ("Indicadores", Indicador, "operacion__accion__objetivo__area_org",
+     ("operacion__accion__objetivo__codigo", "operacion__accion__codigo", "operacion__codigo", "nombre"),
+     ("tipo", "unidad", "formula_texto", "anio_linea_base", "linea_base", "anio_meta", "meta_valor")),
+    ("Series", SerieIndicador, "indicador__operacion__accion__objetivo__area_org",
+     ("indicador__operacion__accion__objetivo__codigo", "indicador__operacion__accion__codigo",
+      "indicador__operacion__codigo", "indicador__nombre", "anio", "es_programado"),
+     ("valor", "nota")),
+]
+
+
+CAMPOS_ANIO = {"anio", "anio_linea_base", "anio_meta"}
+
+
+def _indexar(modelo, ruta, area, clave, campos, desplazar=0):
+    filas = modelo._default_manager.filter(**{ruta: area.pk}).values_list(*clave, *campos)
+    n = len(clave)
+    if desplazar:
+        pos = [i for i, c in enumerate(clave + campos) if c in CAMPOS_ANIO]
+        filas = (tuple(v + desplazar if i in pos and v is not None else v for i, v in enumerate(fila))
+                 for fila in filas.iterator(chunk_size=LOTE))
+    else:
+        filas = filas.iterator(chunk_size=LOTE)
+    return {fila[:n]: fila[n:] for fila in filas}
+
+
+def desplazamiento(version_a, version_b):
+    """Años a sumar a A para alinearla con B cuando una deriva directamente de la otra."""
+    if version_b.base_id == version_a.pk:
+        return version_b.desplazamiento_anios
+    if version_a.base_id == version_b.pk:
+        return -version_a.desplazamiento_anios
+    return 0
+
+
+def comparar(version_a, version_b, alinear_anios=True):
+    """
+    [{"nivel", "agregados", "quitados", "cambiados", "iguales"}] de A → B.
+    ``cambiados`` es [(clave, [(campo, valor_a, valor_b)])]. Con ``alinear_anios``
+    los años de A se corren según el desplazamiento con que se clonó B.
+    """
+    d = desplazamiento(version_a, version_b) if alinear_anios else 0
+    resultado = []
+    for etiqueta, modelo, ruta, clave, campos in NIVELES_DIFF:
+        a = _indexar(modelo, ruta, version_a.area_org, clave, campos, d)
+        b = _indexar(modelo, ruta, version_b.area_org, clave, campos)
+        cambiados = []
+        for k in a.keys() & b.keys():
+            if a[k] != b[k]:
+                cambiados.append((k, [(c, va, vb) for c, va, vb in zip(campos, a[k], b[k]) if va != vb]))
+        resultado.append({
+            "nivel": etiqueta,
+            "agregados": sorted(b.keys() - a.keys(), key=str),
+            "quitados": sorted(a.keys() - b.keys(), key=str),
+            "cambiados": sorted(cambiados, key=lambda x: str(x[0])),
+            "iguales": len(a.keys() & b.keys()) - len(cambiados),
+        })
+    return resultado
@@ -1,213 +1,136 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
 
-from django.db.models import Avg, Count, F, Q, Sum, Case, When, Value
-from django.db.models.functions import Coalesce
-from django.db.models import FloatField
-from .models import Indicador, SerieIndicador, AreaOrganizacional
+from . import condicional, reportes, sharding
+from .models import AnioCerrado, AreaOrganizacional, Entidad, Indicador, SerieIndicador
 
 
+def _huella_dashboard():
+    return [Indicador.objects.all(), SerieIndicador.objects.all(),
+            AreaOrganizacional.objects.all(), Entidad.objects.all(), AnioCerrado.objects.all()]
+
+
+def _consolidado(request):
+    # shards configurados y ninguno elegido: el panel suma todas las entidades
+    return bool(sharding.shards()) and not getattr(request, "shard", None)
+
 
 def dashboard(request):
-    indicadores = (Indicador.objects
-                   .select_related("operacion", "operacion__accion",
-                                   "operacion__accion__objetivo",
-                                   "operacion__accion__objetivo__area_org"))
-    series = SerieIndicador.objects.all()
-
-    total_indicadores = indicadores.count()
-    con_ejecucion = indicadores.filter(series__es_programado=False, series__valor__isnull=False).distinct().count()
-    sin_programacion = indicadores.exclude(series__es_programado=True).distinct().count()
-
-    # --- Programado vs Ejecutado por año (todo a FloatField) ---
-    por_anio = (
-        series.values("anio")
-        .annotate(
-            programado=Coalesce(
-                Sum(Case(When(es_programado=True, then=F("valor")), default=Value(0), output_field=FloatField())),
-                Value(0.0), output_field=FloatField()
-            ),
-            ejecutado=Coalesce(
-                Sum(Case(When(es_programado=False, then=F("valor")), default=Value(0), output_field=FloatField())),
-                Value(0.0), output_field=FloatField()
-            ),
-        )
-        .order_by("anio")
-    )
-
-    # --- Distribución por tipo ---
-    dist_tipo = (indicadores.values("tipo")
-                 .annotate(total=Count("id"))
-                 .order_by("tipo"))
-
-    # --- Cumplimiento por indicador y año (todo a FloatField) ---
-    ind_anio = (
-        series.values("indicador_id", "anio")
-        .annotate(
-            programado=Coalesce(
-                Sum(Case(When(es_programado=True, then=F("valor")), default=Value(0), output_field=FloatField())),
-                Value(0.0), output_field=FloatField()
-            ),
-            ejecutado=Coalesce(
-                Sum(Case(When(es_programado=False, then=F("valor")), default=Value(0), output_field=FloatField())),
-                Value(0.0), output_field=FloatField()
-            ),
-        )
-        .annotate(
-            cumplimiento=Case(
-                When(programado__gt=0, then=(Value(100.0, output_field=FloatField()) * F("ejecutado") / F("programado"))),
-                default=Value(0.0),
-                output_field=FloatField(),
-            )
-        )
-    )
-
-    # --- Avance promedio global ---
-    tot_prog = sum(x["programado"] for x in ind_anio)
-    tot_ejec = sum(x["ejecutado"] for x in ind_anio)
-    avance_promedio = round((tot_ejec / tot_prog) * 100, 2) if tot_prog > 0 else 0.0
-
-    # --- Cumplimiento por área (último año) ---
-    ultimo = series.order_by("-anio").values_list("anio", flat=True).first()
-    cumplimiento_area = []
-    if ultimo:
-        ind_ultimo = { (r["indicador_id"], r["anio"]): r for r in ind_anio.filter(anio=ultimo) }
-
-        areas = (AreaOrganizacional.objects
-                 .select_related("entidad")
-                 .annotate(total_ind=Count("objetivos__acciones__operaciones__indicadores", distinct=True))
-                 .order_by("entidad__sigla", "nombre"))
-
-        for area in areas:
-            ids_ind_area = (Indicador.objects
-                            .filter(operacion__accion__objetivo__area_org=area)
-                            .values_list("id", flat=True))
-            valores = []
-            for ind_id in ids_ind_area:
-                row = ind_ultimo.get((ind_id, ultimo))
-                if row and row["programado"] > 0:
-                    valores.append(row["cumplimiento"])
-            prom = round(sum(valores)/len(valores), 2) if valores else 0.0
-            cumplimiento_area.append({
-                "area_id": area.id,
-                "area": f"{area.nombre} ({area.entidad.sigla or area.entidad.nombre})",
-                "prom_cumplimiento": prom,
-                "total_indicadores": area.total_ind,
-            })
-
-    context = dict(
-        total_indicadores=total_indicadores,
-        con_ejecucion=con_ejecucion,
-        sin_programacion=sin_programacion,
-        avance_promedio=avance_promedio,
-        por_anio=list(por_anio),
-        dist_tipo=list(dist_tipo),
-        cumplimiento_area=cumplimiento_area,
-        ultimo_anio=ultimo,
-    )
-    return render(request, "dashboard.html", context)
-    
+    if _consolidado(request):  # sin huella barata: los datos están repartidos
+        return render(request, "dashboard.html", reportes.contexto_dashboard_consolidado())
+    resp, etag = condicional.respuesta_condicional(request, _huella_dashboard())
+    if resp is not None:
+        return resp
+    response = render(request, "dashboard.html", reportes.contexto_dashboard())
+    return condicional.marcar(response, etag)
+
+
+async def adashboard(request):
+    """Versión ASGI: las consultas corren en el pool de ``reportes.en_hilo``, fuera del event loop."""
+    if _consolidado(request):  # fan_out ya reparte los shards en hilos
+        context = await reportes.en_hilo(reportes.contexto_dashboard_consolidado)
+        return await sync_to_async(render)(request, "dashboard.html", context)
+    resp, etag = await reportes.en_hilo(
+        condicional.respuesta_condicional, request, _huella_dashboard())
+    if resp is not None:
+        return resp
+    context = await reportes.en_hilo(reportes.contexto_dashboard)
+    response = await sync_to_async(render)(request, "dashboard.html", context)
+    return condicional.marcar(response, etag)
+
 
 from django.views.generic import TemplateView
+from .models import Operacion
 
-class ReporteCumplimientoView(TemplateView):
+class ReporteCumplimientoView(condicional.ConditionalGetMixin, TemplateView):
     template_name = "planificacion/reporte_cumplimiento.html"
 
-    def get_context_data(self, **kwargs):
-        ctx = super().get_context_data(**kwargs)
+    def get_queryset(self, anio_int=None):
+        return reportes.filas_cumplimiento(anio_int)
+
+    def fan_out_activo(self):
+        return bool(sharding.shards()) and not getattr(self.request, "shard", None)
+
+    def get_huella_querysets(self):
+        if self.fan_out_activo():
+            return None  # los datos están repartidos; no hay huella barata
+        anio_int = self.get_anio()
+        if anio_int and AnioCerrado.objects.filter(anio=anio_int).exists():
+            # año cerrado: la instantánea no cambia mientras no se reabra (reabrir y
+            # volver a cerrar crea otra fila de AnioCerrado → otra huella)
+            return [AnioCerrado.objects.filter(anio=anio_int)]
+        series = SerieIndicador.objects.filter(anio=anio_int) if anio_int else SerieIndicador.objects.all()
+        return [series, Indicador.objects.all(), Operacion.objects.all(), AreaOrganizacional.objects.all(),
+                AnioCerrado.objects.all()]
+
+    def get_anio(self):
         anio = self.request.GET.get("anio")
         # Si viene vacío o no es número, lo ignoramos
         try:
-            anio_int = int(anio) if anio else None
+            return int(anio) if anio else None
         except ValueError:
-            anio_int = None
-
-        qs = (
-            SerieIndicador.objects
-            .values(
-                "indicador_id",
-                "indicador__nombre",
-                "anio",
-                "indicador__operacion__codigo",
-                "indicador__operacion__accion__objetivo__area_org__nombre",
-            )
-            .annotate(
-                programado=Coalesce(
-                    Sum(
-                        Case(
-                            When(es_programado=True, then=F("valor")),
-                            default=Value(0),
-                            output_field=FloatField(),   # <- fuerza float
-                        )
-                    ),
-                    Value(0.0),
-                    output_field=FloatField(),       # <- fuerza float
-                ),
-                ejecutado=Coalesce(
-                    Sum(
-                        Case(
-                            When(es_programado=False, then=F("valor")),
-                            default=Value(0),
-                            output_field=FloatField(),   # <- fuerza float
-                        )
-                    ),
-                    Value(0.0),
-                    output_field=FloatField(),       # <- fuerza float
-                ),
-            )
-            .annotate(
-                cumplimiento=Case(
-                    When(
-                        programado__gt=0,
-                        then=Value(100.0, output_field=FloatField()) * F("ejecutado") / F("programado"),
-                    ),
-                    default=Value(0.0),
-                    output_field=FloatField(),       # <- fuerza float
-                )
-            )
-            .order_by("anio", "indicador__operacion__codigo", "indicador__nombre")
-        )
-
-        if anio_int:
-            qs = qs.filter(anio=anio_int)
-
-        ctx["rows"] = list(qs)
+            return None
+
+    def get_rows(self, anio_int):
+        if self.fan_out_activo():
+            # Sin shard elegido: consolidado de todas las entidades
+            rows = []
+            for clave, parte in sharding.fan_out(lambda: list(self.get_queryset(anio_int))):
+                for row in parte:
+                    row["shard"] = clave
+                rows.extend(parte)
+            rows.sort(key=lambda r: (r["anio"], r["indicador__operacion__codigo"], r["indicador__nombre"]))
+            return rows
+        return list(self.get_queryset(anio_int))
+
+    def get_datos(self, anio_int):
+        """Filas del reporte y si el año está cerrado: todo lo que se consulta a la base."""
+        cerrado = bool(anio_int) and AnioCerrado.objects.filter(anio=anio_int).exists()
+        return self.get_rows(anio_int), cerrado
+
+    def get_context_data(self, datos=None, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        anio_int = self.get_anio()
+        ctx["rows"], ctx["anio_cerrado"] = self.get_datos(anio_int) if datos is None else datos
         ctx["anio_selected"] = anio_int or ""
         return ctx
 
+
+class ReporteCumplimientoAsyncView(ReporteCumplimientoView):
+    """Versión ASGI: las consultas (o el fan-out por shards) salen del event loop."""
+
+    async def get(self, request, *args, **kwargs):
+        resp, etag = await reportes.en_hilo(self.respuesta_condicional)
+        if resp is not None:
+            return resp
+        datos = await reportes.en_hilo(self.get_datos, self.get_anio())
+        context = self.get_context_data(datos=datos, **kwargs)
+        response = self.render_to_response(context)
+        await sync_to_async(response.render)()
+        return condicional.marcar(response, etag)
+
 # planificacion/views_area_org.py
 from django.contrib import messages
-from django.db.models import Q
 from django.urls import reverse_lazy
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView
+from django.views.generic import CreateView, UpdateView, DeleteView
 
-from .models import AreaOrganizacional
+from .borrado import BorradoJerarquicoMixin
+from .listados import Filtro, FiltroListView, columnas_truncadas
+from .models import AreaOrganizacional, Entidad
 from .forms import AreaOrganizacionalForm
 
-class AreaOrganizacionalListView(ListView):
+class AreaOrganizacionalListView(FiltroListView):
     model = AreaOrganizacional
     template_name = "planificacion/area_org_list.html"
     context_object_name = "areas"
     paginate_by = 10
+    busqueda = ("nombre", "responsable", "entidad__nombre", "entidad__sigla")
+    select_related = ("entidad",)
+    columnas = ("nombre", "responsable", "entidad__nombre", "entidad__sigla")
+    ordering = ("entidad__sigla", "nombre")
 
-    def get_queryset(self):
-        qs = (AreaOrganizacional.objects
-              .select_related("entidad")
-              .order_by("entidad__sigla", "nombre"))
-        q = self.request.GET.get("q", "").strip()
-        if q:
-            qs = qs.filter(
-                Q(nombre__icontains=q) |
-                Q(responsable__icontains=q) |
-                Q(entidad__nombre__icontains=q) |
-                Q(entidad__sigla__icontains=q)
-            )
-        return qs
-
-    def get_context_data(self, **kwargs):
-        ctx = super().get_context_data(**kwargs)
-        ctx["q"] = self.request.GET.get("q", "").strip()
-        return ctx
-
+    def get_huella_querysets(self):
+        return super().get_huella_querysets() + [Entidad.objects.all()]
 
 class AreaOrganizacionalCreateView(CreateView):
     model = AreaOrganizacional
@@ -231,41 +154,29 @@ class AreaOrganizacionalUpdateView(UpdateView):
         return super().form_valid(form)
 
 
-class AreaOrganizacionalDeleteView(DeleteView):
+class AreaOrganizacionalDeleteView(BorradoJerarquicoMixin, DeleteView):
     model = AreaOrganizacional
     template_name = "planificacion/area_org_confirm_delete.html"
     success_url = reverse_lazy("area_org_list")
-
-    def delete(self, request, *args, **kwargs):
-        messages.success(self.request, "Área organizacional eliminada.")
-        return super().delete(request, *args, **kwargs)
+    mensaje_borrado = "Área organizacional eliminada."
 
 # planificacion/views_area_estrategica.py
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView
+from django.views.generic import CreateView, UpdateView, DeleteView
+from .listados import Filtro, FiltroListView, columnas_truncadas
 from .models import AreaEstrategica
 from .forms import AreaEstrategicaForm
 
-class AreaEstrategicaListView(ListView):
+class AreaEstrategicaListView(FiltroListView):
     model = AreaEstrategica
     template_name = "planificacion/area_estrategica_list.html"
     context_object_name = "areas_estrategicas"
     paginate_by = 10
     ordering = ["nombre"]
-
-    def get_queryset(self):
-        qs = super().get_queryset()
-        q = self.request.GET.get("q", "").strip()
-        if q:
-            qs = qs.filter(nombre__icontains=q)
-        return qs
-
-    def get_context_data(self, **kwargs):
-        ctx = super().get_context_data(**kwargs)
-        ctx["q"] = self.request.GET.get("q", "").strip()
-        return ctx
-
+    busqueda = ("nombre",)
+    columnas = ("nombre",)
+    truncar = {"descripcion": 200}
 
 class AreaEstrategicaCreateView(CreateView):
     model = AreaEstrategica
@@ -302,51 +213,42 @@ class AreaEstrategicaDeleteView(DeleteView):
 
 # planificacion/views_objetivo.py
 from django.contrib import messages
-from django.db.models import Q
 from django.urls import reverse_lazy
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView
+from django.views.generic import CreateView, UpdateView, DeleteView
 
-from .models import ObjetivoEstrategico, AreaOrganizacional, AreaEstrategica
+from .borrado import BorradoJerarquicoMixin
+from .listados import Filtro, FiltroListView, columnas_truncadas
+from .models import ObjetivoEstrategico, AreaOrganizacional, AreaEstrategica, Entidad
 from .forms import ObjetivoEstrategicoForm
 
-class ObjetivoListView(ListView):
+class ObjetivoListView(FiltroListView):
     model = ObjetivoEstrategico
     template_name = "planificacion/objetivo_list.html"
     context_object_name = "objetivos"
     paginate_by = 10
-
-    def get_queryset(self):
-        qs = (ObjetivoEstrategico.objects
-              .select_related("area_org", "area_estrategica")
-              .order_by("area_org__entidad__sigla", "area_org__nombre", "codigo"))
-        q = self.request.GET.get("q", "").strip()
-        area_org = self.request.GET.get("area_org", "").strip()
-        area_est = self.request.GET.get("area_estrategica", "").strip()
-
-        if q:
-            qs = qs.filter(
-                Q(codigo__icontains=q) |
-                Q(descripcion__icontains=q) |
-                Q(area_org__nombre__icontains=q) |
-                Q(area_org__entidad__sigla__icontains=q) |
-                Q(area_org__entidad__nombre__icontains=q)
-            )
-        if area_org:
-            qs = qs.filter(area_org_id=area_org)
-        if area_est:
-            qs = qs.filter(area_estrategica_id=area_est)
-        return qs
+    filtros = [
+        Filtro("area_org", "area_org_id"),
+        Filtro("area_estrategica", "area_estrategica_id", contexto="area_est_selected"),
+    ]
+    busqueda = ("codigo", "descripcion", "area_org__nombre", "area_org__entidad__sigla", "area_org__entidad__nombre")
+    select_related = ("area_org", "area_org__entidad", "area_estrategica")
+    columnas = ("codigo", "area_org__nombre", "area_org__entidad__sigla", "area_org__entidad__nombre",
+                "area_estrategica__nombre")
+    truncar = {"descripcion": 300}
+    ordering = ("area_org__entidad__sigla", "area_org__nombre", "codigo")
+
+    def get_huella_querysets(self):
+        return super().get_huella_querysets() + [
+            AreaOrganizacional.objects.all(), AreaEstrategica.objects.all(), Entidad.objects.all()]
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ctx["q"] = self.request.GET.get("q", "").strip()
-        ctx["area_org_selected"] = self.request.GET.get("area_org", "")
-        ctx["area_est_selected"] = self.request.GET.get("area_estrategica", "")
-        ctx["areas_org"] = AreaOrganizacional.objects.select_related("entidad").order_by("entidad__sigla", "nombre")
-        ctx["areas_est"] = AreaEstrategica.objects.order_by("nombre")
+        ctx["areas_org"] = (AreaOrganizacional.objects.select_related("entidad")
+                            .only("nombre", "entidad__sigla", "entidad__nombre")
+                            .order_by("entidad__sigla", "nombre"))
+        ctx["areas_est"] = AreaEstrategica.objects.only("nombre").order_by("nombre")
         return ctx
 
-
 class ObjetivoCreateView(CreateView):
     model = ObjetivoEstrategico
     form_class = ObjetivoEstrategicoForm
@@ -378,69 +280,55 @@ class ObjetivoUpdateView(UpdateView):
         return super().form_valid(form)
 
 
-class ObjetivoDeleteView(DeleteView):
+class ObjetivoDeleteView(BorradoJerarquicoMixin, DeleteView):
     model = ObjetivoEstrategico
     template_name = "planificacion/objetivo_confirm_delete.html"
     success_url = reverse_lazy("objetivo_list")
-
-    def delete(self, request, *args, **kwargs):
-        messages.success(self.request, "Objetivo estratégico eliminado.")
-        return super().delete(request, *args, **kwargs)
+    mensaje_borrado = "Objetivo estratégico eliminado."
 
 
 
 # planificacion/views_accion.py
 from django.contrib import messages
-from django.db.models import Q
 from django.urls import reverse_lazy
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView
+from django.views.generic import CreateView, UpdateView, DeleteView
 
-from .models import AccionEstrategica, ObjetivoEstrategico, AreaOrganizacional
+from .borrado import BorradoJerarquicoMixin
+from .listados import Filtro, FiltroListView, columnas_truncadas
+from .models import AccionEstrategica, ObjetivoEstrategico, AreaOrganizacional, AreaEstrategica, Entidad
 from .forms import AccionEstrategicaForm
 
-class AccionListView(ListView):
+class AccionListView(FiltroListView):
     model = AccionEstrategica
     template_name = "planificacion/accion_list.html"
     context_object_name = "acciones"
     paginate_by = 10
-
-    def get_queryset(self):
-        qs = (AccionEstrategica.objects
-              .select_related("objetivo",
-                              "objetivo__area_org",
-                              "objetivo__area_org__entidad",
-                              "objetivo__area_estrategica")
-              .order_by("objetivo__area_org__nombre", "objetivo__codigo", "codigo"))
-        q = self.request.GET.get("q", "").strip()
-        obj = self.request.GET.get("objetivo", "").strip()
-        ao = self.request.GET.get("area_org", "").strip()
-
-        if q:
-            qs = qs.filter(
-                Q(codigo__icontains=q) |
-                Q(descripcion__icontains=q) |
-                Q(objetivo__descripcion__icontains=q) |
-                Q(objetivo__codigo__icontains=q) |
-                Q(objetivo__area_org__nombre__icontains=q) |
-                Q(objetivo__area_org__entidad__sigla__icontains=q) |
-                Q(objetivo__area_org__entidad__nombre__icontains=q)
-            )
-        if obj:
-            qs = qs.filter(objetivo_id=obj)
-        if ao:
-            qs = qs.filter(objetivo__area_org_id=ao)
-        return qs
+    filtros = [
+        Filtro("objetivo", "objetivo_id"),
+        Filtro("area_org", "objetivo__area_org_id"),
+    ]
+    busqueda = ("codigo", "descripcion", "objetivo__descripcion", "objetivo__codigo", "objetivo__area_org__nombre",
+                "objetivo__area_org__entidad__sigla", "objetivo__area_org__entidad__nombre")
+    select_related = ("objetivo", "objetivo__area_org", "objetivo__area_org__entidad")
+    columnas = ("codigo", "objetivo__codigo", "objetivo__area_org__nombre",
+                "objetivo__area_org__entidad__sigla", "objetivo__area_org__entidad__nombre")
+    truncar = {"descripcion": 300, "objetivo__descripcion": 80}
+    ordering = ("objetivo__area_org__nombre", "objetivo__codigo", "codigo")
+
+    def get_huella_querysets(self):
+        return super().get_huella_querysets() + [
+            ObjetivoEstrategico.objects.all(), AreaOrganizacional.objects.all(), Entidad.objects.all()]
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ctx["q"] = self.request.GET.get("q", "").strip()
-        ctx["objetivo_selected"] = self.request.GET.get("objetivo", "")
-        ctx["area_org_selected"] = self.request.GET.get("area_org", "")
-        ctx["objetivos"] = ObjetivoEstrategico.objects.select_related("area_org").order_by("area_org__nombre", "codigo")
-        ctx["areas_org"] = AreaOrganizacional.objects.select_related("entidad").order_by("entidad__sigla", "nombre")
+        ctx["objetivos"] = (ObjetivoEstrategico.objects.only("codigo")
+                            .annotate(**columnas_truncadas({"descripcion": 60}))
+                            .order_by("area_org__nombre", "codigo"))
+        ctx["areas_org"] = (AreaOrganizacional.objects.select_related("entidad")
+                            .only("nombre", "entidad__sigla", "entidad__nombre")
+                            .order_by("entidad__sigla", "nombre"))
         return ctx
 
-
 class AccionCreateView(CreateView):
     model = AccionEstrategica
     form_class = AccionEstrategicaForm
@@ -470,50 +358,44 @@ class AccionUpdateView(UpdateView):
         return super().form_valid(form)
 
 
-class AccionDeleteView(DeleteView):
+class AccionDeleteView(BorradoJerarquicoMixin, DeleteView):
     model = AccionEstrategica
     template_name = "planificacion/accion_confirm_delete.html"
     success_url = reverse_lazy("accion_list")
-
-    def delete(self, request, *args, **kwargs):
-        messages.success(self.request, "Acción estratégica eliminada.")
-        return super().delete(request, *args, **kwargs)
+    mensaje_borrado = "Acción estratégica eliminada."
 
 
 # planificacion/views_operacion.py
 from django.contrib import messages
-from django.db.models import Q
 from django.urls import reverse_lazy
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView
+from django.views.generic import CreateView, UpdateView, DeleteView
+from .borrado import BorradoJerarquicoMixin
+from .listados import Filtro, FiltroListView, columnas_truncadas
 from .models import Operacion, AccionEstrategica
 from .forms import OperacionForm
 
-class OperacionListView(ListView):
+class OperacionListView(FiltroListView):
     model = Operacion
     template_name = "planificacion/operacion_list.html"
     context_object_name = "operaciones"
     paginate_by = 10
+    filtros = [Filtro("accion", "accion_id")]
+    busqueda = ("codigo", "descripcion", "accion__descripcion")
+    select_related = ("accion",)
+    columnas = ("codigo", "accion__codigo")
+    truncar = {"descripcion": 300, "accion__descripcion": 60}
+    ordering = ("accion__codigo", "codigo")
 
-    def get_queryset(self):
-        qs = (Operacion.objects
-              .select_related("accion", "accion__objetivo", "accion__objetivo__area_org")
-              .order_by("accion__codigo", "codigo"))
-        q = self.request.GET.get("q", "").strip()
-        accion = self.request.GET.get("accion", "").strip()
-        if q:
-            qs = qs.filter(Q(codigo__icontains=q) | Q(descripcion__icontains=q) | Q(accion__descripcion__icontains=q))
-        if accion:
-            qs = qs.filter(accion_id=accion)
-        return qs
+    def get_huella_querysets(self):
+        return super().get_huella_querysets() + [AccionEstrategica.objects.all()]
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ctx["q"] = self.request.GET.get("q", "")
-        ctx["accion_selected"] = self.request.GET.get("accion", "")
-        ctx["acciones"] = AccionEstrategica.objects.order_by("codigo")
+        ctx["acciones"] = (AccionEstrategica.objects.only("codigo")
+                           .annotate(**columnas_truncadas({"descripcion": 60}))
+                           .order_by("codigo"))
         return ctx
 
-
 class OperacionCreateView(CreateView):
     model = Operacion
     form_class = OperacionForm
@@ -543,28 +425,28 @@ class OperacionUpdateView(UpdateView):
         return super().form_valid(form)
 
 
-class OperacionDeleteView(DeleteView):
+class OperacionDeleteView(BorradoJerarquicoMixin, DeleteView):
     model = Operacion
     template_name = "planificacion/operacion_confirm_delete.html"
     success_url = reverse_lazy("operacion_list")
-
-    def delete(self, request, *args, **kwargs):
-        messages.success(self.request, "Operación eliminada.")
-        return super().delete(request, *args, **kwargs)
+    mensaje_borrado = "Operación eliminada."
 
 
 # planificacion/views_fuente.py
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView
+from django.views.generic import CreateView, UpdateView, DeleteView
+from .listados import Filtro, FiltroListView, columnas_truncadas
 from .models import FuenteInformacion
 from .forms import FuenteInformacionForm
 
-class FuenteListView(ListView):
+class FuenteListView(FiltroListView):
     model = FuenteInformacion
     template_name = "planificacion/fuente_list.html"
     context_object_name = "fuentes"
     ordering = ["nombre"]
+    columnas = ("nombre",)
+    truncar = {"descripcion": 200}
 
 class FuenteCreateView(CreateView):
     model = FuenteInformacion
@@ -598,57 +480,46 @@ class FuenteDeleteView(DeleteView):
 
 # planificacion/views_indicador.py
 from django.contrib import messages
-from django.db.models import Q
+from django.shortcuts import redirect
 from django.urls import reverse_lazy
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView
+from django.views.generic import CreateView, UpdateView, DeleteView
 
+from . import escritura
+from .borrado import BorradoJerarquicoMixin
+from .concurrencia import Conflicto
+from .listados import Filtro, FiltroListView, columnas_truncadas
 from .models import Indicador, Operacion, TipoIndicador, UnidadMedida
 from .forms import IndicadorForm
 
-class IndicadorListView(ListView):
+class IndicadorListView(FiltroListView):
     model = Indicador
     template_name = "planificacion/indicador_list.html"
     context_object_name = "indicadores"
     paginate_by = 10
-
-    def get_queryset(self):
-        qs = (Indicador.objects
-              .select_related("operacion", "operacion__accion", "operacion__accion__objetivo",
-                              "operacion__accion__objetivo__area_org")
-              .prefetch_related("fuentes")
-              .order_by("operacion__codigo", "nombre"))
-        q = self.request.GET.get("q", "").strip()
-        op = self.request.GET.get("op", "").strip()
-        tipo = self.request.GET.get("tipo", "").strip()
-        unidad = self.request.GET.get("unidad", "").strip()
-
-        if q:
-            qs = qs.filter(
-                Q(nombre__icontains=q) |
-                Q(codigo__icontains=q) |
-                Q(operacion__descripcion__icontains=q) |
-                Q(operacion__codigo__icontains=q)
-            )
-        if op:
-            qs = qs.filter(operacion_id=op)
-        if tipo:
-            qs = qs.filter(tipo=tipo)
-        if unidad:
-            qs = qs.filter(unidad=unidad)
-        return qs
+    filtros = [
+        Filtro("op", "operacion_id"),
+        Filtro("tipo", "tipo", valores={v: v for v in TipoIndicador.values}),
+        Filtro("unidad", "unidad", valores={v: v for v in UnidadMedida.values}),
+    ]
+    busqueda = ("nombre", "codigo", "operacion__descripcion", "operacion__codigo")
+    select_related = ("operacion",)
+    # formula_texto, observaciones y descripciones no se muestran en las cards
+    columnas = ("nombre", "tipo", "unidad", "anio_linea_base", "linea_base", "anio_meta", "meta_valor",
+                "actualizado", "operacion__codigo", "operacion__actualizado")
+    ordering = ("operacion__codigo", "nombre")
+
+    def get_huella_querysets(self):
+        return super().get_huella_querysets() + [Operacion.objects.all()]
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ctx["q"] = self.request.GET.get("q", "").strip()
-        ctx["op_selected"] = self.request.GET.get("op", "")
-        ctx["tipo_selected"] = self.request.GET.get("tipo", "")
-        ctx["unidad_selected"] = self.request.GET.get("unidad", "")
-        ctx["operaciones"] = Operacion.objects.all().order_by("codigo")
+        ctx["operaciones"] = (Operacion.objects.only("codigo")
+                              .annotate(**columnas_truncadas({"descripcion": 50}))
+                              .order_by("codigo"))
         ctx["tipos"] = TipoIndicador.choices
         ctx["unidades"] = UnidadMedida.choices
         return ctx
 
-
 class IndicadorCreateView(CreateView):
     model = Indicador
     form_class = IndicadorForm
@@ -667,74 +538,99 @@ class IndicadorUpdateView(UpdateView):
     success_url = reverse_lazy("indicador_list")
 
     def form_valid(self, form):
+        try:
+            self.object = escritura.escribir(form.save, Indicador, [form.instance])
+        except Conflicto as exc:
+            form.conflicto(exc)
+            return self.form_invalid(form)
         messages.success(self.request, "Indicador actualizado.")
-        return super().form_valid(form)
+        return redirect(self.get_success_url())
 
 
-class IndicadorDeleteView(DeleteView):
+class IndicadorDeleteView(BorradoJerarquicoMixin, DeleteView):
     model = Indicador
     template_name = "planificacion/indicador_confirm_delete.html"
     success_url = reverse_lazy("indicador_list")
-
-    def delete(self, request, *args, **kwargs):
-        messages.success(self.request, "Indicador eliminado.")
-        return super().delete(request, *args, **kwargs)
+    mensaje_borrado = "Indicador eliminado."
 
 
 
 
 # planificacion/views_serie.py
 from django.contrib import messages
-from django.db.models import Q
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView, View
+from django.db.models import Case, F, Max, Sum, When
+from django.views.generic import CreateView, UpdateView, DeleteView, View
 
-from .models import SerieIndicador, Indicador
+from . import escritura, formulas, historial
+from .concurrencia import Conflicto
+from .listados import Filtro, FiltroListView, columnas_truncadas
+from .models import SerieIndicador, Indicador, Operacion
 from .forms import SerieIndicadorForm, SerieIndicadorFormSet
 
-class SerieIndicadorListView(ListView):
+class SerieIndicadorListView(FiltroListView):
     model = SerieIndicador
     template_name = "planificacion/serie_list.html"
     context_object_name = "series"
     paginate_by = 12
+    filtros = [
+        Filtro("indicador", "indicador_id"),
+        Filtro("anio", "anio"),
+        Filtro("tipo", "es_programado", valores={"prog": True, "ejec": False}),  # "prog" o "ejec"
+    ]
+    busqueda = ("indicador__nombre", "indicador__codigo", "indicador__operacion__codigo", "nota")
+    select_related = ("indicador", "indicador__operacion")
+    columnas = ("anio", "valor", "es_programado", "actualizado", "indicador__nombre", "indicador__actualizado",
+                "indicador__operacion__codigo", "indicador__operacion__actualizado")
+    truncar = {"nota": 30}
+    ordering = ("indicador__operacion__codigo", "indicador__nombre", "anio", "-es_programado")
+
+    # ?vista=pares: una fila por (indicador, año) con programado y ejecutado
+    # juntos, por agregación condicional en una sola consulta. El filtro de
+    # tipo y la búsqueda por nota no aplican: partirían el par.
+    def en_pares(self):
+        return self.request.GET.get("vista") == "pares"
+
+    def get_filtros(self):
+        if self.en_pares():
+            return [f for f in self.filtros if f.param != "tipo"]
+        return self.filtros
+
+    def get_busqueda(self):
+        if self.en_pares():
+            return tuple(c for c in self.busqueda if c != "nota")
+        return self.busqueda
 
     def get_queryset(self):
-        qs = (SerieIndicador.objects
-              .select_related("indicador", "indicador__operacion")
-              .order_by("indicador__operacion__codigo", "indicador__nombre", "anio", "-es_programado"))
-        q = self.request.GET.get("q", "").strip()
-        ind = self.request.GET.get("indicador", "").strip()
-        anio = self.request.GET.get("anio", "").strip()
-        tipo = self.request.GET.get("tipo", "").strip()  # "prog" o "ejec"
-
-        if q:
-            qs = qs.filter(
-                Q(indicador__nombre__icontains=q) |
-                Q(indicador__codigo__icontains=q) |
-                Q(indicador__operacion__codigo__icontains=q) |
-                Q(nota__icontains=q)
-            )
-        if ind:
-            qs = qs.filter(indicador_id=ind)
-        if anio:
-            qs = qs.filter(anio=anio)
-        if tipo == "prog":
-            qs = qs.filter(es_programado=True)
-        elif tipo == "ejec":
-            qs = qs.filter(es_programado=False)
-        return qs
+        if not self.en_pares():
+            return super().get_queryset()
+        return (self.filtrar(SerieIndicador.objects.all())
+                .values("indicador_id", "anio", "indicador__nombre", "indicador__operacion__codigo",
+                        *formulas.CAMPOS_INDICADOR)
+                .annotate(programado=Sum(Case(When(es_programado=True, then=F("valor")))),
+                          ejecutado=Sum(Case(When(es_programado=False, then=F("valor")))),
+                          prog_id=Max(Case(When(es_programado=True, then=F("id")))),
+                          ejec_id=Max(Case(When(es_programado=False, then=F("id")))))
+                .order_by("indicador__operacion__codigo", "indicador__nombre", "anio"))
+
+    def get_huella_querysets(self):
+        return super().get_huella_querysets() + [Indicador.objects.all(), Operacion.objects.all()]
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ctx["q"] = self.request.GET.get("q", "").strip()
-        ctx["indicador_selected"] = self.request.GET.get("indicador", "")
-        ctx["anio_selected"] = self.request.GET.get("anio", "")
-        ctx["tipo_selected"] = self.request.GET.get("tipo", "")
-        ctx["indicadores"] = Indicador.objects.all().order_by("operacion__codigo", "nombre")
+        if self.en_pares():
+            # solo la página visible: la fórmula de cada indicador, por lotes
+            ctx["series"] = formulas.aplicar(list(ctx["series"]))
+        ctx["vista"] = "pares" if self.en_pares() else ""
+        ctx["indicadores"] = (Indicador.objects.select_related("operacion")
+                              .only("operacion__codigo")
+                              .annotate(**columnas_truncadas({"nombre": 60}))
+                              .order_by("operacion__codigo", "nombre"))
         return ctx
 
-
 class SerieIndicadorCreateView(CreateView):
     model = SerieIndicador
     form_class = SerieIndicadorForm
@@ -749,8 +645,9 @@ class SerieIndicadorCreateView(CreateView):
         return initial
 
     def form_valid(self, form):
+        self.object = escritura.escribir(form.save, SerieIndicador, [form.instance])
         messages.success(self.request, "Serie creada correctamente.")
-        return super().form_valid(form)
+        return redirect(self.get_success_url())
 
 
 class SerieIndicadorUpdateView(UpdateView):
@@ -760,8 +657,13 @@ class SerieIndicadorUpdateView(UpdateView):
     success_url = reverse_lazy("serie_list")
 
     def form_valid(self, form):
+        try:
+            self.object = escritura.escribir(form.save, SerieIndicador, [form.instance])
+        except Conflicto as exc:  # otro usuario guardó la serie mientras se editaba
+            form.conflicto(exc)
+            return self.form_invalid(form)
         messages.success(self.request, "Serie actualizada.")
-        return super().form_valid(form)
+        return redirect(self.get_success_url())
 
 
 class SerieIndicadorDeleteView(DeleteView):
@@ -769,9 +671,14 @@ class SerieIndicadorDeleteView(DeleteView):
     template_name = "planificacion/serie_confirm_delete.html"
     success_url = reverse_lazy("serie_list")
 
-    def delete(self, request, *args, **kwargs):
+    def form_valid(self, form):
+        try:
+            response = super().form_valid(form)
+        except ValidationError as exc:  # año cerrado
+            messages.error(self.request, " ".join(exc.messages))
+            return redirect(self.success_url)
         messages.success(self.request, "Serie eliminada.")
-        return super().delete(request, *args, **kwargs)
+        return response
 
 
 # ---------- Editor masivo por Indicador ----------
@@ -792,16 +699,447 @@ class SerieIndicadorBulkEditView(View):
         if formset.is_valid():
             # aseguramos indicador en cada form guardado (por si el usuario manipula el DOM)
             instances = formset.save(commit=False)
-            ids_a_conservar = []
-            for inst in instances:
-                inst.indicador = indicador
-                inst.save()
-                ids_a_conservar.append(inst.pk)
-            # eliminar los marcados
-            for obj in formset.deleted_objects:
-                obj.delete()
+
+            def guardar():
+                # el alias del shard activo (como versiones.clonar); un solo INSERT de historial
+                with transaction.atomic(using=router.db_for_write(SerieIndicador)), historial.lote():
+                    for inst in instances:
+                        inst.indicador = indicador
+                        inst.save()
+                    # eliminar los marcados
+                    for obj in formset.deleted_objects:
+                        obj.delete()
+
+            try:
+                escritura.escribir(guardar, SerieIndicador, instances)
+            except Conflicto as exc:  # una fila cambió desde que se abrió el editor
+                for form in formset.forms:
+                    if form.instance is exc.instancia:
+                        form.conflicto(exc)
+                messages.error(request, "Otro usuario modificó algunas filas; revisa los avisos y vuelve a guardar.")
+                return render(request, self.template_name, {"indicador": indicador, "formset": formset})
+            except ValidationError as exc:  # p. ej. borrar una fila de un año cerrado
+                messages.error(request, " ".join(exc.messages))
+                return render(request, self.template_name, {"indicador": indicador, "formset": formset})
             messages.success(request, "Series actualizadas correctamente.")
             return redirect("serie_bulk_edit", indicador_id=indicador.pk)
         else:
             messages.error(request, "Hay errores en el formulario.")
             return render(request, self.template_name, {"indicador": indicador, "formset": formset})
+
+
+# planificacion/views_tarea.py
+from django.contrib import messages
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import reverse
+from django.views.generic import DetailView
+from django.views.decorators.http import require_POST
+
+from . import tareas
+from .condicional import marcar, respuesta_condicional
+from .models import Tarea
+
+
+def _tarea_json(t):
+    return {
+        "id": t.pk,
+        "tipo": t.tipo,
+        "estado": t.estado,
+        "estado_display": t.get_estado_display(),
+        "progreso": t.progreso,
+        "total": t.total,
+        "porcentaje": t.porcentaje,
+        "mensaje": t.mensaje,
+        "descarga": reverse("tarea_descarga", args=[t.pk]) if t.archivo else None,
+    }
+
+
+class TareaDetalleView(DetailView):
+    model = Tarea
+    template_name = "planificacion/tarea_detalle.html"
+    context_object_name = "tarea"
+
+
+def tarea_estado(request, pk):
+    """API de progreso (JSON) para sondear desde el navegador."""
+    resp, etag = respuesta_condicional(request, [Tarea.objects.filter(pk=pk)])
+    if resp is not None:
+        return resp
+    return marcar(JsonResponse(_tarea_json(get_object_or_404(Tarea, pk=pk))), etag)
+
+
+def tarea_descarga(request, pk):
+    t = get_object_or_404(Tarea, pk=pk)
+    ruta = tareas.directorio() / t.archivo if t.archivo else None
+    if not ruta or not ruta.is_file():
+        raise Http404("La tarea no tiene archivo de resultado.")
+    return FileResponse(open(ruta, "rb"), as_attachment=True, filename=t.archivo.split("-", 1)[-1])
+
+
+@require_POST
+def reporte_cumplimiento_exportar(request):
+    anio = request.POST.get("anio")
+    t = tareas.encolar("exportar_cumplimiento", anio=int(anio) if anio and anio.isdigit() else None)
+    messages.info(request, "Exportación encolada; se procesará en segundo plano.")
+    return redirect("tarea_detalle", pk=t.pk)
+
+
+# planificacion/views_version.py
+from django.contrib import messages
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import reverse
+from django.views.generic import FormView, TemplateView
+
+from . import versiones
+from .forms import VersionClonarForm
+from .listados import FiltroListView
+from .models import VersionPlan
+
+
+class VersionPlanListView(FiltroListView):
+    model = VersionPlan
+    template_name = "planificacion/version_list.html"
+    context_object_name = "versiones"
+    paginate_by = 20
+    busqueda = ("nombre", "area_org__nombre")
+    select_related = ("area_org__entidad", "base")
+    ordering = ("-id",)
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["todas"] = VersionPlan.objects.select_related("area_org").only("nombre", "area_org__nombre")
+        return ctx
+
+
+class VersionClonarView(FormView):
+    form_class = VersionClonarForm
+    template_name = "planificacion/version_form.html"
+
+    def get_initial(self):
+        initial = super().get_initial()
+        if self.request.GET.get("area", "").isdigit():
+            initial["area"] = int(self.request.GET["area"])
+        return initial
+
+    def form_valid(self, form):
+        d = form.cleaned_data
+        version = versiones.clonar(d["area"], d["nombre"], nombre_area=d["nombre_area"],
+                                   desplazar_anios=d["desplazar_anios"], series=d["series"], notas=d["notas"])
+        messages.success(self.request, f"Versión «{version.nombre}» creada en el área «{version.area_org.nombre}».")
+        return redirect(f"{reverse('version_comparar')}?a={version.base_id}&b={version.pk}")
+
+
+class VersionCompararView(TemplateView):
+    template_name = "planificacion/version_comparar.html"
+    # tope de filas listadas por nivel (los totales siempre son completos)
+    max_filas = 200
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        qs = VersionPlan.objects.select_related("area_org")
+        a = get_object_or_404(qs, pk=self.request.GET.get("a") or 0)
+        b = get_object_or_404(qs, pk=self.request.GET.get("b") or 0)
+        niveles = versiones.comparar(a, b)
+        for n in niveles:
+            n["totales"] = {k: len(n[k]) for k in ("agregados", "quitados", "cambiados")}
+            for k in ("agregados", "quitados", "cambiados"):
+                n[k] = n[k][:self.max_filas]
+        ctx.update(a=a, b=b, niveles=niveles, desplazamiento=versiones.desplazamiento(a, b),
+                   todas=qs.only("nombre", "area_org__nombre"), max_filas=self.max_filas)
+        return ctx
+
+
+# planificacion/views_analitica.py
+from django.http import JsonResponse
+
+from . import analitica
+from .listados import Filtro, FiltroListView
+from .models import AreaOrganizacional, Indicador, SerieIndicador, TipoIndicador, UnidadMedida
+
+
+class AnaliticaView(FiltroListView):
+    """
+    Avance hacia la meta de todos los indicadores filtrados (cis/analitica.py).
+    Las métricas se calculan sobre el conjunto completo y luego se ordena y pagina;
+    con ``formato="json"`` (ruta de la API) devuelve las columnas completas.
+    """
+    model = Indicador
+    template_name = "planificacion/analitica.html"
+    context_object_name = "filas"
+    paginate_by = 50
+    formato = "html"
+    filtros = [
+        Filtro("area", "operacion__accion__objetivo__area_org_id", contexto="area_selected"),
+        Filtro("tipo", "tipo", tipo=str),
+        Filtro("unidad", "unidad", tipo=str),
+    ]
+    busqueda = ("nombre", "codigo", "operacion__codigo")
+    ordenes = {"avance": "avance_pct", "brecha": "brecha", "tendencia": "pendiente",
+               "proyeccion": "proyeccion_pct", "variacion": "variacion_pct"}
+
+    def get_huella_querysets(self):
+        return super().get_huella_querysets() + [SerieIndicador.objects.all()]
+
+    def get_orden(self):
+        orden = self.request.GET.get("orden", "")
+        return orden.lstrip("-"), orden.startswith("-")
+
+    def get_queryset(self):
+        self.resultado = analitica.calcular(self.filtrar(Indicador.objects.all()))
+        orden, desc = self.get_orden()
+        return self.resultado.filas(self.ordenes.get(orden), desc)
+
+    def render_to_response(self, context, **kwargs):
+        if self.formato == "json":
+            r = self.resultado
+            return JsonResponse({"anios": [int(a) for a in r.anios], "total": len(r), "columnas": r.columnas()})
+        return super().render_to_response(context, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        if self.formato == "json":
+            return {}
+        ctx = super().get_context_data(**kwargs)
+        ctx.update(
+            orden=self.request.GET.get("orden", ""),
+            areas=AreaOrganizacional.objects.only("nombre").order_by("nombre"),
+            tipos=TipoIndicador.choices,
+            unidades=UnidadMedida.choices,
+            total=len(self.resultado),
+        )
+        return ctx
+
+
+# planificacion/views_ventanas.py
+from django.http import JsonResponse
+
+from . import reportes, ventanas
+from .listados import Filtro, FiltroListView
+from .models import AnioCerrado, AreaOrganizacional, Indicador, NivelCierre, SerieIndicador, TipoIndicador
+
+
+def _entero(valor, defecto=None):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return defecto
+
+
+class EvolucionView(FiltroListView):
+    """
+    Variación interanual y acumulado frente a la meta por indicador
+    (cis/ventanas.py). ``?anio=`` deja solo ese año, calculado con los previos.
+    Con ``formato="json"`` devuelve la página pedida.
+    """
+    model = Indicador
+    template_name = "planificacion/reporte_evolucion.html"
+    context_object_name = "filas"
+    paginate_by = 50
+    formato = "html"
+    filtros = [
+        Filtro("area", "operacion__accion__objetivo__area_org_id", contexto="area_selected"),
+        Filtro("tipo", "tipo", tipo=str),
+    ]
+    busqueda = ("nombre", "codigo", "operacion__codigo")
+
+    def get_huella_querysets(self):
+        return super().get_huella_querysets() + [SerieIndicador.objects.all()]
+
+    def get_queryset(self):
+        self.anio = _entero(self.request.GET.get("anio"))
+        return ventanas.evolucion(self.filtrar(Indicador.objects.all()), self.anio)
+
+    def render_to_response(self, context, **kwargs):
+        if self.formato == "json":
+            pagina = context["page_obj"]
+            return JsonResponse({"anio": self.anio, "total": pagina.paginator.count, "pagina": pagina.number,
+                                 "paginas": pagina.paginator.num_pages, "filas": list(pagina.object_list)})
+        return super().render_to_response(context, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        if self.formato != "json":
+            ctx.update(anio_selected=self.request.GET.get("anio", ""),
+                       areas=AreaOrganizacional.objects.only("nombre").order_by("nombre"),
+                       tipos=TipoIndicador.choices)
+        return ctx
+
+
+class RankingView(FiltroListView):
+    """
+    Áreas u operaciones con mayor (o menor) cumplimiento en un año, rankeadas
+    en la base (cis/ventanas.py). ``?nivel=area|operacion&n=10&extremo=peores``;
+    sin ``anio`` usa el último año con datos.
+    """
+    model = Indicador
+    template_name = "planificacion/reporte_ranking.html"
+    context_object_name = "filas"
+    formato = "html"
+    filtros = [
+        Filtro("area", "operacion__accion__objetivo__area_org_id", contexto="area_selected"),
+        Filtro("tipo", "tipo", tipo=str),
+    ]
+    niveles = {NivelCierre.AREA.value: NivelCierre.AREA, NivelCierre.OPERACION.value: NivelCierre.OPERACION}
+
+    def get_huella_querysets(self):
+        return super().get_huella_querysets() + [SerieIndicador.objects.all(), AnioCerrado.objects.all()]
+
+    def get_queryset(self):
+        self.anio = _entero(self.request.GET.get("anio")) or reportes.ultimo_anio()
+        self.nivel = self.niveles.get(self.request.GET.get("nivel"), NivelCierre.AREA)
+        self.n = _entero(self.request.GET.get("n"), 10)
+        self.ultimos = self.request.GET.get("extremo") == "peores"
+        if not self.anio:
+            return []
+        filtrados = any(f.valor(self.request) for f in self.filtros)
+        return list(ventanas.ranking(self.anio, self.nivel, self.n, self.ultimos,
+                                     indicadores=self.filtrar(Indicador.objects.all()) if filtrados else None))
+
+    def render_to_response(self, context, **kwargs):
+        if self.formato == "json":
+            return JsonResponse({"anio": self.anio, "nivel": self.nivel.value, "extremo":
+                                 "peores" if self.ultimos else "mejores", "filas": self.object_list})
+        return super().render_to_response(context, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        if self.formato != "json":
+            ctx.update(anio=self.anio, nivel=self.nivel, n=self.n, ultimos=self.ultimos,
+                       cerrado=AnioCerrado.objects.filter(anio=self.anio).exists(),
+                       niveles=[(v, n.label) for v, n in self.niveles.items()],
+                       areas=AreaOrganizacional.objects.only("nombre").order_by("nombre"),
+                       tipos=TipoIndicador.choices)
+        return ctx
+
+
+# planificacion/views_mapa_calor.py
+from django.http import JsonResponse
+from django.views.generic import TemplateView
+
+from . import condicional, mapa_calor
+from .models import AnioCerrado, AreaOrganizacional, Entidad, Indicador, SerieIndicador
+
+
+class MapaCalorView(condicional.ConditionalGetMixin, TemplateView):
+    """
+    Cumplimiento área × año (cis/mapa_calor.py). La página solo trae el
+    esqueleto y pide la matriz a la ruta JSON (``formato="json"``), que va
+    en formato columnar y sin espacios.
+    """
+    template_name = "planificacion/mapa_calor.html"
+    formato = "html"
+
+    def get_huella_querysets(self):
+        return [Indicador.objects.all(), SerieIndicador.objects.all(), AreaOrganizacional.objects.all(),
+                Entidad.objects.all(), AnioCerrado.objects.all()]
+
+    def render_to_response(self, context, **kwargs):
+        if self.formato == "json":
+            return JsonResponse(mapa_calor.matriz(), json_dumps_params={"separators": (",", ":")})
+        return super().render_to_response(context, **kwargs)
+
+
+# planificacion/views_arbol.py
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+from django.views.generic import TemplateView
+
+from . import arbol, reportes
+
+
+def _anio_arbol(request):
+    try:
+        return int(request.GET.get("anio") or 0) or reportes.ultimo_anio()
+    except ValueError:
+        return reportes.ultimo_anio()
+
+
+def _nodos(nivel, filas):
+    for f in filas:
+        f["url"] = reverse(nivel.url, args=[f["id"]]) if nivel.url else None
+    return filas
+
+
+class ArbolView(TemplateView):
+    """Explorador de la jerarquía: la página trae las entidades y el resto se pide a ``arbol_api``."""
+    template_name = "planificacion/arbol.html"
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        anio = _anio_arbol(self.request)
+        nivel, filas, hay_mas = arbol.hijos(None, anio=anio)
+        ctx.update(anio=anio, nivel=nivel.clave, raices=_nodos(nivel, filas), hay_mas=hay_mas)
+        return ctx
+
+
+@require_GET
+def arbol_api(request):
+    """Hijos de un nodo: ``?nivel=area&id=3&anio=2024&desde=0``."""
+    clave = request.GET.get("nivel") or None
+    try:
+        nodo_id = int(request.GET["id"]) if clave else None
+        desde = max(0, int(request.GET.get("desde") or 0))
+    except (KeyError, ValueError):
+        return JsonResponse({"error": "Se esperan 'id' (con 'nivel') y 'desde' enteros."}, status=400)
+    try:
+        nivel, filas, hay_mas = arbol.hijos(clave, nodo_id, _anio_arbol(request), desde)
+    except arbol.NivelInvalido as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({"nivel": nivel.clave, "hoja": nivel.hijos is None, "hijos": _nodos(nivel, filas),
+                         "siguiente": desde + len(filas) if hay_mas else None})
+
+
+# planificacion/views_sincronizacion.py
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from . import sincronizacion
+
+
+@require_GET
+def cambios_api(request):
+    """
+    Feed incremental: ``?cursor=`` (el de la respuesta anterior) o ``?desde=``
+    (ISO 8601), ``?limite=`` y ``?modelos=indicador,serieindicador``.
+    """
+    desde = request.GET.get("desde", "").strip()
+    modelos = [f"cis.{m.strip().lower()}" for m in request.GET.get("modelos", "").split(",") if m.strip()]
+    try:
+        if desde:
+            desde = sincronizacion.parsear_desde(desde)
+        desconocidos = sorted(set(modelos) - set(sincronizacion.ETIQUETAS))
+        if desconocidos:
+            raise ValueError(f"Modelos desconocidos: {', '.join(desconocidos)}.")
+        pagina = sincronizacion.cambios(
+            cursor=request.GET.get("cursor", "").strip() or None, desde=desde or None,
+            limite=int(request.GET.get("limite", sincronizacion.LIMITE)), modelos=modelos or None)
+    except ValueError as exc:  # incluye CursorInvalido
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(pagina)
+
+
+# planificacion/views_api.py
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from . import api, sharding
+
+
+@require_GET
+def api_recurso(request, recurso):
+    if recurso not in api.RECURSOS:
+        raise Http404("Recurso desconocido.")
+    try:
+        consulta = api.Consulta(api.RECURSOS[recurso], request.GET)
+    except api.ErrorApi as exc:
+        return HttpResponse(api.a_json({"error": str(exc)}), status=400, content_type="application/json")
+
+    def url_siguiente(ultimo_id):
+        params = request.GET.copy()
+        params["cursor"] = ultimo_id
+        return request.build_absolute_uri(f"{request.path}?{params.urlencode(safe=',[]')}")
+
+    # el cuerpo se genera al servir la respuesta, ya fuera del shard del middleware
+    cuerpo = sharding.iterar_en_shard(getattr(request, "shard", None), consulta.generar(url_siguiente))
+    return StreamingHttpResponse(cuerpo, content_type="application/json")
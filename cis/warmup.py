@@ -0,0 +1,110 @@
+# planificacion/warmup.py
+"""
+Calentamiento tras un deploy o reinicio del worker.
+
+Cada etapa es independiente y devuelve un resumen corto; ``ejecutar`` mide
+cuánto tardó cada una. Lo usan ``manage.py warmup`` y, si
+``CIS_WARMUP_AL_INICIAR`` está activo, ``CisConfig.ready()`` en un hilo aparte.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.db import connection
+from django.template.loader import get_template
+from django.urls import NoReverseMatch, get_resolver, reverse
+
+from . import reportes
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+
+
+def plantillas():
+    """Compila todas las plantillas de cis/templates (quedan en el loader cacheado)."""
+    n = 0
+    for ruta in sorted(TEMPLATES_DIR.rglob("*.html")):
+        get_template(ruta.relative_to(TEMPLATES_DIR).as_posix())
+        n += 1
+    return f"{n} plantillas"
+
+
+def urls():
+    """Puebla el resolver y resuelve cada URL con nombre (con argumentos de ejemplo)."""
+    resolver = get_resolver()
+    n = 0
+    for nombre in [k for k in resolver.reverse_dict if isinstance(k, str)]:
+        for posibles, *_ in resolver.reverse_dict.getlist(nombre):
+            for _, params in posibles:
+                try:
+                    reverse(nombre, kwargs={p: 1 for p in params})
+                    n += 1
+                except NoReverseMatch:
+                    pass
+    return f"{n} URLs"
+
+
+def referencias():
+    """Catálogos pequeños que alimentan los selects de casi todos los formularios."""
+    from .models import AreaEstrategica, AreaOrganizacional, Entidad, FuenteInformacion
+    total = 0
+    for qs in (Entidad.objects.all(), AreaEstrategica.objects.all(), FuenteInformacion.objects.all(),
+               AreaOrganizacional.objects.select_related("entidad")):
+        total += len(list(qs))
+    return f"{total} filas de catálogos"
+
+
+def agregados():
+    """Agregados del panel y del reporte del último año."""
+    ctx = reportes.contexto_dashboard()
+    if ctx["ultimo_anio"]:
+        len(reportes.filas_cumplimiento(ctx["ultimo_anio"]))
+    return f"panel + reporte {ctx['ultimo_anio'] or '-'}"
+
+
+def indices():
+    """Recorre cada índice de la app para traer sus páginas a la caché de SQLite/SO."""
+    n = 0
+    with connection.cursor() as cursor:
+        for model in apps.get_app_config("cis").get_models():
+            tabla = model._meta.db_table
+            if connection.vendor != "sqlite":
+                cursor.execute(f'SELECT COUNT(*) FROM "{tabla}"')
+                n += 1
+                continue
+            for nombre, info in connection.introspection.get_constraints(cursor, tabla).items():
+                if info["index"]:
+                    cursor.execute(f'SELECT COUNT(*) FROM "{tabla}" INDEXED BY "{nombre}"')
+                    n += 1
+            cursor.execute(f'SELECT COUNT(*) FROM "{tabla}"')
+    return f"{n} índices"
+
+
+ETAPAS = [
+    ("plantillas", plantillas),
+    ("urls", urls),
+    ("referencias", referencias),
+    ("agregados", agregados),
+    ("indices", indices),
+]
+
+
+def ejecutar(etapas=None, reportar=None):
+    """Corre las etapas y devuelve [(nombre, segundos, resumen)]."""
+    resultados = []
+    for nombre, fn in ETAPAS:
+        if etapas and nombre not in etapas:
+            continue
+        t0 = time.perf_counter()
+        try:
+            resumen = fn()
+        except Exception as exc:  # una etapa fallida no impide las demás
+            logger.exception("warmup: falló la etapa %s", nombre)
+            resumen = f"ERROR {exc.__class__.__name__}: {exc}"
+        fila = (nombre, time.perf_counter() - t0, resumen)
+        resultados.append(fila)
+        if reportar:
+            reportar(*fila)
+    return resultados
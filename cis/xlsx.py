@@ -0,0 +1,68 @@
+# planificacion/xlsx.py
+"""
+Escritor mínimo de .xlsx (una hoja, texto y números) con la biblioteca estándar.
+
+Alcanza para exportar tablas de reportes sin agregar openpyxl como
+dependencia: el archivo es un zip con el XML de SpreadsheetML y las celdas
+de texto van como ``inlineStr`` (sin tabla de cadenas compartidas).
+"""
+import zipfile
+from xml.sax.saxutils import escape
+
+_TIPOS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+</Types>"""
+
+_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_LIBRO = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="{hoja}" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_LIBRO_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+</Relationships>"""
+
+
+def _columna(i):
+    letras = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        letras = chr(65 + r) + letras
+    return letras
+
+
+def _celda(ref, valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, bool):
+        return f'<c r="{ref}" t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float)):
+        return f'<c r="{ref}"><v>{valor!r}</v></c>'
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{escape(str(valor))}</t></is></c>'
+
+
+def escribir(ruta, encabezados, filas, hoja="Reporte"):
+    """``filas``: iterable de secuencias; se escribe fila por fila dentro del zip."""
+    with zipfile.ZipFile(ruta, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml", _TIPOS)
+        z.writestr("_rels/.rels", _RELS)
+        z.writestr("xl/workbook.xml", _LIBRO.format(hoja=escape(hoja[:31])))
+        z.writestr("xl/_rels/workbook.xml.rels", _LIBRO_RELS)
+        with z.open("xl/worksheets/sheet1.xml", "w") as fh:
+            fh.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                     b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            for n, fila in enumerate([encabezados, *filas], 1):
+                celdas = "".join(_celda(f"{_columna(i)}{n}", v) for i, v in enumerate(fila))
+                fh.write(f'<row r="{n}">{celdas}</row>'.encode())
+            fh.write(b"</sheetData></worksheet>")
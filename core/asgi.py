@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# el panel y el reporte de cumplimiento usan sus vistas async bajo ASGI
+os.environ.setdefault('CIS_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -23,7 +24,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-)043qdp9f#b2z*0@c4uyp&jb7#e)!c&aldj(xrhi_wotcz_6i('
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = []
 
@@ -48,6 +49,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'cis.sharding.ShardMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -67,8 +69,24 @@ TEMPLATES = [
     },
 ]
 
+# Producción: loader cacheado explícito (cada plantilla se compila una vez por
+# proceso; `manage.py warmup` las precompila todas tras el deploy).
+if not DEBUG:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+# Correr el warmup en segundo plano al arrancar cada proceso (ver cis/apps.py)
+CIS_WARMUP_AL_INICIAR = os.environ.get('CIS_WARMUP_AL_INICIAR') == '1'
+
 WSGI_APPLICATION = 'core.wsgi.application'
 
+# Vistas async del panel/reportes (core/asgi.py lo activa; WSGI usa las síncronas)
+CIS_ASYNC_VIEWS = os.environ.get('CIS_ASYNC_VIEWS') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -80,6 +98,32 @@ DATABASES = {
     }
 }
 
+# Sharding opcional por Entidad: CIS_SHARDS="fcyt,fcs" crea un SQLite por clave
+# (migrar cada uno con `manage.py migrate cis --database shard_<clave>`).
+CIS_SHARDS = [s.strip() for s in os.environ.get("CIS_SHARDS", "").split(",") if s.strip()]
+if CIS_SHARDS:
+    (BASE_DIR / 'shards').mkdir(exist_ok=True)
+for _clave in CIS_SHARDS:
+    DATABASES[f"shard_{_clave}"] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'shards' / f'{_clave}.sqlite3',
+    }
+DATABASE_ROUTERS = ['cis.sharding.EntidadShardRouter']
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # fragmentos de plantilla (cards de indicadores/series), clave = pk + actualizado
+    'fragmentos': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cis-fragmentos',
+        'TIMEOUT': 86400,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -114,7 +158,6 @@ USE_TZ = True
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
-import os
 STATIC_URL = 'static/'
 
 STATIC_URL = '/static/'
@@ -126,6 +169,22 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    # bundles + hash de contenido + variantes .gz/.br (ver cis/estaticos.py)
+    "staticfiles": {"BACKEND": "cis.estaticos.AssetsStorage"},
+}
+# Servir STATIC_ROOT desde Django cuando no hay nginx delante (cache de un año)
+CIS_SERVIR_ESTATICOS = os.environ.get('CIS_SERVIR_ESTATICOS') == '1'
+
+# Archivos generados por las tareas en segundo plano (cis/tareas.py)
+CIS_TAREAS_DIR = BASE_DIR / 'tareas'
+# Una tarea EN_CURSO sin progreso en este plazo (s) se da por perdida (worker caído) y se reencola
+CIS_TAREAS_PLAZO = int(os.environ.get('CIS_TAREAS_PLAZO', 600))
+
+# Guardados de series/indicadores agrupados en transacciones cortas (cis/escritura.py)
+CIS_ESCRITURA_AGRUPADA = os.environ.get('CIS_ESCRITURA_AGRUPADA', '1') == '1'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -1,13 +1,44 @@
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
-from cis import views
+from cis import estaticos, views
+
+# Bajo ASGI (core/asgi.py activa CIS_ASYNC_VIEWS) se sirven las versiones async
+if settings.CIS_ASYNC_VIEWS:
+    dashboard_view = views.adashboard
+    reporte_view = views.ReporteCumplimientoAsyncView.as_view()
+else:
+    dashboard_view = views.dashboard
+    reporte_view = views.ReporteCumplimientoView.as_view()
+
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('', views.dashboard, name='dashboard'),  
-    path("reportes/cumplimiento/", views.ReporteCumplimientoView.as_view(), name="reporte_cumplimiento"),
+    path('', dashboard_view, name='dashboard'),  
+    path("reportes/cumplimiento/", reporte_view, name="reporte_cumplimiento"),
+    path("reportes/cumplimiento/exportar/", views.reporte_cumplimiento_exportar, name="reporte_cumplimiento_exportar"),
+
+    path("tareas/<int:pk>/", views.TareaDetalleView.as_view(), name="tarea_detalle"),
+    path("tareas/<int:pk>/estado/", views.tarea_estado, name="tarea_estado"),
+    path("tareas/<int:pk>/descarga/", views.tarea_descarga, name="tarea_descarga"),
     
+    path("reportes/analitica/", views.AnaliticaView.as_view(), name="analitica"),
+    path("api/analitica/", views.AnaliticaView.as_view(formato="json"), name="analitica_api"),
+    path("reportes/evolucion/", views.EvolucionView.as_view(), name="evolucion"),
+    path("api/evolucion/", views.EvolucionView.as_view(formato="json"), name="evolucion_api"),
+    path("reportes/ranking/", views.RankingView.as_view(), name="ranking"),
+    path("api/ranking/", views.RankingView.as_view(formato="json"), name="ranking_api"),
+    path("reportes/mapa-calor/", views.MapaCalorView.as_view(), name="mapa_calor"),
+    path("api/mapa-calor/", views.MapaCalorView.as_view(formato="json"), name="mapa_calor_api"),
+    path("explorar/", views.ArbolView.as_view(), name="arbol"),
+    path("api/arbol/", views.arbol_api, name="arbol_api"),
+    path("api/cambios/", views.cambios_api, name="cambios_api"),
+    path("api/v1/<slug:recurso>/", views.api_recurso, name="api_recurso"),
+
+    path("versiones/", views.VersionPlanListView.as_view(), name="version_list"),
+    path("versiones/clonar/", views.VersionClonarView.as_view(), name="version_clonar"),
+    path("versiones/comparar/", views.VersionCompararView.as_view(), name="version_comparar"),
+
     path("areas/", views.AreaOrganizacionalListView.as_view(), name="area_org_list"),
     path("areas/nuevo/", views.AreaOrganizacionalCreateView.as_view(), name="area_org_create"),
     path("areas/<int:pk>/editar/", views.AreaOrganizacionalUpdateView.as_view(), name="area_org_update"),
@@ -57,3 +88,5 @@ urlpatterns = [
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+elif settings.CIS_SERVIR_ESTATICOS:
+    urlpatterns += [re_path(r"^%s(?P<path>.*)$" % settings.STATIC_URL.lstrip("/"), estaticos.servir)]